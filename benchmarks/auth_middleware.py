@@ -0,0 +1,162 @@
+"""Overhead of the bearer-auth middleware: requests/s and time to first SSE event.
+
+    uv run python benchmarks/auth_middleware.py --requests 20000 > auth.json
+
+Drives a Starlette app in-process over raw ASGI (no sockets, so only the
+middleware stack is measured) in three configurations: no auth, the raw-ASGI
+`BearerAuthMiddleware`, and an equivalent `BaseHTTPMiddleware` — the shape
+the middleware had before — for comparison. Two numbers per configuration:
+
+- requests/s for a small JSON response, driven `--concurrency` at a time;
+- time from request start to the first body chunk of a streamed
+  `text/event-stream` response whose second event is 20 ms later.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hmac
+import json
+import statistics
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from teslamate_mcp.auth import BearerAuthMiddleware
+
+_TOKEN = "benchmark-token"
+_HEADERS = [(b"authorization", f"Bearer {_TOKEN}".encode()), (b"host", b"bench")]
+
+
+class _LegacyBearerAuth(BaseHTTPMiddleware):
+    def __init__(self, app, *, auth_token: str) -> None:
+        super().__init__(app)
+        self._expected = auth_token.encode("utf-8")
+
+    async def dispatch(self, request, call_next):
+        header = request.headers.get("authorization", "")
+        provided = header.split(" ", 1)[1].encode("utf-8") if " " in header else b""
+        if not hmac.compare_digest(provided, self._expected):
+            return JSONResponse({"error": "Invalid token"}, status_code=401)
+        return await call_next(request)
+
+
+async def _json(_request):
+    return JSONResponse({"jsonrpc": "2.0", "id": 1, "result": {"ok": True}})
+
+
+async def _events():
+    yield b"event: message\ndata: {}\n\n"
+    await asyncio.sleep(0.02)
+    yield b"event: message\ndata: {}\n\n"
+
+
+async def _sse(_request):
+    return StreamingResponse(_events(), media_type="text/event-stream")
+
+
+def _app(variant: str) -> Starlette:
+    app = Starlette(routes=[Route("/mcp", _json, methods=["POST"]), Route("/mcp/sse", _sse)])
+    if variant == "asgi":
+        app.add_middleware(BearerAuthMiddleware, auth_token=_TOKEN)
+    elif variant == "base_http":
+        app.add_middleware(_LegacyBearerAuth, auth_token=_TOKEN)
+    return app
+
+
+def _scope(method: str, path: str) -> dict:
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": _HEADERS,
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+
+def _receiver():
+    """Deliver the request body once, then block like a client that stays connected."""
+    delivered = False
+
+    async def receive():
+        nonlocal delivered
+        if delivered:
+            await asyncio.Event().wait()
+        delivered = True
+        return {"type": "http.request", "body": b"{}", "more_body": False}
+
+    return receive
+
+
+async def _one_request(app: Starlette) -> None:
+    async def send(_message):
+        pass
+
+    await app(_scope("POST", "/mcp"), _receiver(), send)
+
+
+async def _requests_per_s(app: Starlette, total: int, concurrency: int) -> float:
+    start = time.perf_counter()
+    for _ in range(total // concurrency):
+        await asyncio.gather(*(_one_request(app) for _ in range(concurrency)))
+    return round(total / (time.perf_counter() - start), 1)
+
+
+async def _first_event_ms(app: Starlette, samples: int) -> dict[str, float]:
+    timings: list[float] = []
+    for _ in range(samples):
+        first = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+
+        async def send(message, first=first, start=start):
+            if message["type"] == "http.response.body" and message.get("body") and not first.done():
+                first.set_result(time.perf_counter() - start)
+
+        await app(_scope("GET", "/mcp/sse"), _receiver(), send)
+        timings.append(first.result() * 1000)
+    return {
+        "ttfe_p50_ms": round(statistics.median(timings), 3),
+        "ttfe_max_ms": round(max(timings), 3),
+    }
+
+
+async def _main(args: argparse.Namespace) -> list[dict]:
+    results = []
+    for variant in ("none", "asgi", "base_http"):
+        app = _app(variant)
+        # Warm-up: Starlette builds the middleware stack on the first call.
+        await _requests_per_s(app, args.concurrency, args.concurrency)
+        results.append(
+            {
+                "auth": variant,
+                "requests_per_s": await _requests_per_s(app, args.requests, args.concurrency),
+                **(await _first_event_ms(app, args.sse_samples)),
+            }
+        )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--sse-samples", type=int, default=50)
+    args = parser.parse_args()
+    json.dump({"results": asyncio.run(_main(args))}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
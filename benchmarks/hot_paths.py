@@ -0,0 +1,140 @@
+"""Microbenchmarks for the server's pure-Python hot paths.
+
+    uv run python benchmarks/hot_paths.py -o hot_paths.json
+
+No database is needed. Row fixtures are built from the bundled `[[output]]`
+declarations, with the Python types psycopg hands back: integers, `Decimal`
+for the ROUNDed numeric columns, `datetime` for date-like string columns and
+short strings for the rest. Measured:
+
+- `to_jsonable` on one wide row, and `rows_to_jsonable` on a 500-row
+  `search_drives` result and on 50 rows of every tool;
+- `validate_sql` and `enforce_limit` on a short query and a commented CTE;
+- `discover_predefined_tools` over the bundled catalog, and `build_row_model`
+  for every tool;
+- a `search_drives` call dispatched through the SDK (`MCPServer.call_tool`)
+  with the tool's real signature and output model. The handler returns
+  canned rows, so this is argument validation, output-model validation and
+  content conversion without the query.
+
+Each case reports the best per-call time of `--repeat` timeit rounds (loop
+counts from `Timer.autorange`) as JSON, so changes to these paths can come
+with before/after numbers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import timeit
+from collections.abc import Callable
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any
+
+from mcp.server.mcpserver import Context, MCPServer
+
+from teslamate_mcp import __version__
+from teslamate_mcp.serialization import rows_to_jsonable, to_jsonable
+from teslamate_mcp.tools import discover_predefined_tools
+from teslamate_mcp.tools.custom_sql import enforce_limit, validate_sql
+from teslamate_mcp.tools.registry import PredefinedTool, _build_signature, build_row_model
+
+_DATE_HINTS = ("date", "day", "week", "month", "time", "_at")
+_SIMPLE_SQL = "SELECT id, distance FROM drives WHERE car_id = 1 ORDER BY start_date DESC"
+_CTE_SQL = """
+-- monthly distance per car
+WITH monthly AS (
+    /* one row per car and month */
+    SELECT car_id, date_trunc('month', start_date) AS month, SUM(distance) AS km
+    FROM drives
+    WHERE start_date > now() - interval '2 years'
+    GROUP BY 1, 2
+)
+SELECT c.name, m.month, m.km FROM monthly m JOIN cars c ON c.id = m.car_id
+ORDER BY m.month DESC;
+"""
+
+
+def _value(column: Any, i: int) -> Any:
+    if column.type == "integer":
+        return 1000 + i
+    if column.type == "number":
+        return Decimal(f"{i % 400}.{i % 100:02d}")
+    if column.type == "boolean":
+        return i % 2 == 0
+    if any(hint in column.name for hint in _DATE_HINTS):
+        return datetime(2025, 1, 1) + timedelta(minutes=37 * i)
+    return f"{column.name} {i % 17}"
+
+
+def raw_rows(tool: PredefinedTool, n: int) -> list[dict[str, Any]]:
+    """`n` rows shaped like what psycopg returns for `tool`, before conversion."""
+    return [{col.name: _value(col, i) for col in tool.output} for i in range(n)]
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> dict[str, float | int]:
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=loops)) / loops
+    return {"per_call_us": round(best * 1e6, 2), "calls_per_s": round(1 / best), "loops": loops}
+
+
+def _dispatch_case(tool: PredefinedTool, rows: list[dict[str, Any]]) -> Callable[[], Any]:
+    """A `call_tool` round trip through the SDK with the real signature and output model."""
+
+    async def handler(ctx: Context, **params: Any) -> list[dict[str, Any]]:
+        return rows
+
+    handler.__name__ = tool.name
+    handler.__signature__ = _build_signature(tool)  # type: ignore[attr-defined]
+    mcp = MCPServer("bench")
+    mcp.tool(name=tool.name, description=tool.description)(handler)
+    loop = asyncio.new_event_loop()
+    arguments = {"limit": len(rows)}
+    return lambda: loop.run_until_complete(mcp.call_tool(tool.name, arguments))
+
+
+def run(repeat: int) -> dict[str, dict[str, float | int]]:
+    tools = {tool.name: tool for tool in discover_predefined_tools()}
+    drives = tools["search_drives"]
+    widest = max(tools.values(), key=lambda t: len(t.output))
+    wide_row = raw_rows(widest, 1)[0]
+    drives_500 = raw_rows(drives, 500)
+    every_tool = [row for tool in tools.values() for row in raw_rows(tool, 50)]
+
+    cases: dict[str, Callable[[], Any]] = {
+        f"to_jsonable.{widest.name}_row": lambda: to_jsonable(wide_row),
+        "rows_to_jsonable.search_drives_500": lambda: rows_to_jsonable(drives_500),
+        f"rows_to_jsonable.all_tools_{len(every_tool)}": lambda: rows_to_jsonable(every_tool),
+        "validate_sql.simple": lambda: validate_sql(_SIMPLE_SQL),
+        "validate_sql.commented_cte": lambda: validate_sql(_CTE_SQL),
+        "enforce_limit.simple": lambda: enforce_limit(_SIMPLE_SQL, 500),
+        "enforce_limit.commented_cte": lambda: enforce_limit(_CTE_SQL, 500),
+        "discover_predefined_tools": discover_predefined_tools,
+        "build_row_model.all_tools": lambda: [build_row_model(t) for t in tools.values()],
+        "dispatch.search_drives_50": _dispatch_case(drives, rows_to_jsonable(drives_500[:50])),
+    }
+    return {name: _time(fn, repeat) for name, fn in cases.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", "-o", type=argparse.FileType("w"), default=sys.stdout)
+    args = parser.parse_args()
+    report = {
+        "version": __version__,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": run(max(1, args.repeat)),
+    }
+    json.dump(report, args.output, indent=2)
+    args.output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
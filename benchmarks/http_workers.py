@@ -0,0 +1,124 @@
+"""Throughput of `teslamate-mcp http` at 1, 2 and 4 worker processes.
+
+    DATABASE_URL=postgresql://... uv run python benchmarks/http_workers.py \
+        --clients 16 --duration 20 > workers.json
+
+For each worker count the server is started as a subprocess (stateless, JSON
+responses, auth off, bound to localhost), then `--clients` concurrent MCP
+clients call a small mix of bundled tools over streamable HTTP for
+`--duration` seconds. The JSON written to stdout has one entry per worker
+count with calls/s, error count and latency percentiles, so runs can be
+diffed. Point DATABASE_URL at a local copy of the data, never production:
+the run is read-only but it saturates the pool on purpose.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from mcp import Client
+
+_TOOL_MIX = (
+    ("get_current_car_status", {}),
+    ("get_drive_summary_per_day", {"days": 30}),
+    ("search_drives", {"limit": 20}),
+    ("get_charging_costs", {"group_by": "month"}),
+)
+
+
+async def _wait_healthy(url: str, timeout_s: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout_s
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"server at {url} did not become healthy")
+
+
+async def _client_loop(url: str, stop_at: float, latencies: list[float], errors: list[str]) -> None:
+    async with Client(url) as client:
+        i = 0
+        while time.monotonic() < stop_at:
+            name, args = _TOOL_MIX[i % len(_TOOL_MIX)]
+            i += 1
+            start = time.perf_counter()
+            result = await client.call_tool(name, args)
+            latencies.append(time.perf_counter() - start)
+            if result.is_error:
+                errors.append(name)
+
+
+async def _measure(port: int, clients: int, duration_s: float) -> dict[str, float | int]:
+    latencies: list[float] = []
+    errors: list[str] = []
+    stop_at = time.monotonic() + duration_s
+    url = f"http://127.0.0.1:{port}/mcp"
+    await asyncio.gather(*(_client_loop(url, stop_at, latencies, errors) for _ in range(clients)))
+    cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0.0] * 99
+    return {
+        "calls": len(latencies),
+        "errors": len(errors),
+        "calls_per_s": round(len(latencies) / duration_s, 1),
+        "p50_ms": round(cuts[49] * 1000, 1),
+        "p95_ms": round(cuts[94] * 1000, 1),
+        "p99_ms": round(cuts[98] * 1000, 1),
+    }
+
+
+def _run(workers: int, port: int, clients: int, duration_s: float, speedups: bool) -> dict:
+    command = [
+        sys.executable,
+        "-m",
+        "teslamate_mcp",
+        "http",
+        "--host",
+        "127.0.0.1",
+        "--port",
+        str(port),
+        "--stateless",
+        "--json-response",
+        "--workers",
+        str(workers),
+    ]
+    if speedups:
+        command.append("--speedups")
+    env = os.environ | {"AUTH_TOKEN": "", "LOG_LEVEL": "WARNING"}
+    server = subprocess.Popen(command, env=env)
+    try:
+        asyncio.run(_wait_healthy(f"http://127.0.0.1:{port}/health"))
+        return {"workers": workers, **asyncio.run(_measure(port, clients, duration_s))}
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--port", type=int, default=8890)
+    parser.add_argument("--speedups", action="store_true")
+    args = parser.parse_args()
+    if "DATABASE_URL" not in os.environ:
+        parser.error("DATABASE_URL must point at a local TeslaMate database")
+
+    results = [_run(n, args.port, args.clients, args.duration, args.speedups) for n in args.workers]
+    json.dump({"cpu_count": os.cpu_count(), "results": results}, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
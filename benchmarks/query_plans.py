@@ -0,0 +1,182 @@
+"""Plan-shape and latency regression check for every bundled query.
+
+    DATABASE_URL=postgresql://.../scratch uv run python benchmarks/query_plans.py \
+        --generate 1 > plans.json
+
+Each predefined tool runs under `EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`
+with its default params (plus the newest real drive and charging session
+ids for the tools that require one). The report records execution time,
+shared buffers hit/read, and the plan *shape*: the tree of node types and
+the relations and indexes they touch, without costs or row counts. It is
+compared with `benchmarks/baselines/query_plans.json`. A changed shape is
+flagged, and so is an execution time more than `--threshold` above the
+baseline that also exceeds it by at least `--min-ms`. Either flag makes the
+exit status 1. `--update-baseline` writes the new numbers instead.
+
+`--generate SCALE` first replaces the tables with the synthetic dataset
+(`teslamate-mcp generate-data`, two cars, seed 0), so point DATABASE_URL at
+a scratch database. Shapes are comparable across machines; execution times
+only against a baseline from the same machine.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+from pathlib import Path
+from typing import Any
+
+import psycopg
+from psycopg.rows import dict_row
+from psycopg.sql import SQL, Identifier, Literal
+
+from teslamate_mcp.synthetic import DatasetSpec, load
+from teslamate_mcp.tools import discover_predefined_tools
+
+_BASELINE = Path(__file__).parent / "baselines" / "query_plans.json"
+
+# Id params, resolved against the database so every tool gets a real,
+# representative row: the newest drive longer than 10 km, the newest session.
+_ID_QUERIES = {
+    "drive_id": "SELECT MAX(id) FROM drives WHERE distance > 10",
+    "charging_process_id": "SELECT MAX(id) FROM charging_processes",
+}
+
+
+def _shape(node: dict[str, Any]) -> str:
+    label = node["Node Type"]
+    target = node.get("Index Name") or node.get("Relation Name")
+    if target:
+        label += f"[{target}]"
+    children = node.get("Plans") or ()
+    if children:
+        label += "(" + ", ".join(_shape(child) for child in children) + ")"
+    return label
+
+
+def _params(conn: psycopg.Connection, tool: Any, tz: str) -> dict[str, Any] | None:
+    bound = {p.name: p.default for p in tool.params}
+    for param in tool.params:
+        if param.name in _ID_QUERIES:
+            bound[param.name] = conn.execute(_ID_QUERIES[param.name]).fetchone()["max"]
+    if tool.uses_tz:
+        bound["tz"] = tz
+    return bound or None
+
+
+def _explain(
+    conn: psycopg.Connection, sql: str, params: dict[str, Any] | None, settings: dict[str, str]
+) -> dict[str, Any]:
+    with conn.transaction():
+        conn.execute("SET TRANSACTION READ ONLY")
+        for name, value in settings.items():  # the tool's [execution] policy, as served
+            conn.execute(SQL("SET LOCAL {} = {}").format(Identifier(name), Literal(value)))
+        row = conn.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params).fetchone()
+    (result,) = row["QUERY PLAN"]
+    plan = result["Plan"]
+    return {
+        "execution_ms": round(result["Execution Time"], 2),
+        "shared_hit": plan.get("Shared Hit Blocks", 0),
+        "shared_read": plan.get("Shared Read Blocks", 0),
+        "shape": _shape(plan),
+    }
+
+
+def measure(conninfo: str, repeat: int, tz: str) -> dict[str, dict[str, Any]]:
+    """One warm-up run per tool, then the fastest of `repeat` (the least noisy estimate)."""
+    results = {}
+    with psycopg.connect(conninfo, row_factory=dict_row, autocommit=True) as conn:
+        for tool in discover_predefined_tools():
+            params = _params(conn, tool, tz)
+            sql = tool.render(params)
+            settings = tool.execution.settings()
+            _explain(conn, sql, params, settings)
+            results[tool.name] = min(
+                (_explain(conn, sql, params, settings) for _ in range(repeat)),
+                key=lambda r: r["execution_ms"],
+            )
+    return results
+
+
+def compare(
+    current: dict[str, dict[str, Any]],
+    baseline: dict[str, dict[str, Any]],
+    threshold: float,
+    min_ms: float,
+) -> dict[str, list[dict[str, Any]]]:
+    findings: dict[str, list[dict[str, Any]]] = {
+        "plan_changed": [],
+        "slower": [],
+        "new": [],
+        "missing": sorted(set(baseline) - set(current)),
+    }
+    for name, result in current.items():
+        before = baseline.get(name)
+        if before is None:
+            findings["new"].append(name)
+            continue
+        if result["shape"] != before["shape"]:
+            findings["plan_changed"].append(
+                {"tool": name, "baseline": before["shape"], "current": result["shape"]}
+            )
+        delta = result["execution_ms"] - before["execution_ms"]
+        if delta > min_ms and result["execution_ms"] > before["execution_ms"] * (1 + threshold):
+            findings["slower"].append(
+                {
+                    "tool": name,
+                    "baseline_ms": before["execution_ms"],
+                    "current_ms": result["execution_ms"],
+                    "ratio": round(result["execution_ms"] / max(before["execution_ms"], 0.01), 2),
+                }
+            )
+    return findings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--generate", type=float, metavar="SCALE", default=None)
+    parser.add_argument("--baseline", type=Path, default=_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--threshold", type=float, default=0.5, help="0.5 = 50%% slower")
+    parser.add_argument("--min-ms", type=float, default=5.0)
+    parser.add_argument("--tz", default="UTC")
+    args = parser.parse_args()
+    conninfo = os.environ.get("DATABASE_URL")
+    if not conninfo:
+        parser.error("DATABASE_URL must point at a scratch PostgreSQL database")
+
+    if args.generate is not None:
+        load(conninfo, DatasetSpec(seed=0, scale=args.generate, cars=2))
+    with psycopg.connect(conninfo) as conn:
+        server_version = conn.info.server_version
+        positions = conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+    current = measure(conninfo, max(1, args.repeat), args.tz)
+    meta = {"server_version": server_version, "positions": positions}
+
+    if args.update_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"meta": meta, "queries": current}, indent=2) + "\n")
+        findings = None
+    elif args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text())
+        findings = compare(current, baseline["queries"], args.threshold, args.min_ms)
+        meta["baseline"] = baseline["meta"]
+    else:
+        parser.error(f"no baseline at {args.baseline}; run with --update-baseline first")
+
+    total_ms = statistics.fsum(r["execution_ms"] for r in current.values())
+    report = {"meta": meta, "total_ms": round(total_ms, 1), "queries": current}
+    if findings is not None:
+        report["findings"] = findings
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write("\n")
+    if findings and (findings["plan_changed"] or findings["slower"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,34 +3,66 @@
 from __future__ import annotations
 
 import hmac
+from collections.abc import Sequence
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
-from starlette.types import ASGIApp
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 
-class BearerAuthMiddleware(BaseHTTPMiddleware):
-    """Validate `Authorization: Bearer <token>` on /mcp routes using a timing-safe compare."""
+def parse_auth_tokens(value: str) -> tuple[str, ...]:
+    """Split AUTH_TOKEN on commas, so an old and a new token can overlap during rotation."""
+    return tuple(token for token in (part.strip() for part in value.split(",")) if token)
 
-    def __init__(self, app: ASGIApp, *, auth_token: str, protected_prefix: str = "/mcp") -> None:
-        super().__init__(app)
-        self._expected = auth_token.encode("utf-8")
+
+class BearerAuthMiddleware:
+    """Validate `Authorization: Bearer <token>` on /mcp routes using a timing-safe compare.
+
+    A raw ASGI middleware, like NormalizeMcpPathMiddleware: Starlette's
+    BaseHTTPMiddleware ran every request through an extra task and re-wrapped
+    the response body stream, which cost throughput on every call and sat
+    between the transport and the client on streamed SSE responses. Here an
+    accepted request is handed to the app with the original receive/send.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        auth_token: str | Sequence[str],
+        protected_prefix: str = "/mcp",
+    ) -> None:
+        tokens = (auth_token,) if isinstance(auth_token, str) else tuple(auth_token)
+        if not tokens or not all(tokens):
+            raise ValueError("BearerAuthMiddleware needs at least one non-empty token")
+        self._app = app
+        self._expected = tuple(token.encode("utf-8") for token in tokens)
         self._protected_prefix = protected_prefix
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        if not request.url.path.startswith(self._protected_prefix):
-            return await call_next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self._protected_prefix):
+            await self._app(scope, receive, send)
+            return
 
-        header = request.headers.get("authorization", "")
+        header = ""
+        for name, value in scope["headers"]:
+            if name == b"authorization":
+                header = value.decode("latin-1")
+                break
         if not header.lower().startswith("bearer "):
-            return self._unauthorized("Authorization required")
+            await self._unauthorized("Authorization required")(scope, receive, send)
+            return
 
         provided = header.split(" ", 1)[1].encode("utf-8")
-        if not hmac.compare_digest(provided, self._expected):
-            return self._unauthorized("Invalid token")
+        # Compare against every token without short-circuiting, so timing does
+        # not reveal which (if any) configured token a guess was close to.
+        matched = False
+        for expected in self._expected:
+            matched |= hmac.compare_digest(provided, expected)
+        if not matched:
+            await self._unauthorized("Invalid token")(scope, receive, send)
+            return
 
-        return await call_next(request)
+        await self._app(scope, receive, send)
 
     @staticmethod
     def _unauthorized(message: str) -> JSONResponse:
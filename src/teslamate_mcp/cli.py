@@ -3,58 +3,100 @@
 from __future__ import annotations
 
 import asyncio
+import importlib.util
+import json
 import logging
+import os
 import secrets
 import sys
+import time
 from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
 
 import click
+import psycopg
 import uvicorn
+from mcp import Client
 from mcp.server.mcpserver import MCPServer
+from pydantic import SecretStr
+from starlette.applications import Starlette
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.routing import Route
 
 from . import __version__
-from .auth import BearerAuthMiddleware
-from .config import load_settings
+from .auth import BearerAuthMiddleware, parse_auth_tokens
+from .config import Settings, load_settings
+from .doctor import run_doctor
+from .health import CLOSED
+from .loadtest import connect_http, load_mix, run_loadtest
+from .replicas import describe_dsn
 from .server import app_context_for, create_server
+from .synthetic import DatasetSpec
+from .synthetic import load as load_synthetic
 from .telemetry import configure_telemetry
 from .tools import discover_predefined_tools
 from .tools.apps_ui import APP_SPECS
+from .tools.sql_lint import lint_sql
 
-# Kept well under the Dockerfile HEALTHCHECK timeout so the probe answers
-# rather than being killed mid-flight.
-_HEALTH_DB_TIMEOUT_S = 3.0
+# `http --workers N` hands its resolved options to the worker processes
+# through the environment: uvicorn spawns each worker fresh and imports the
+# app factory by name, so nothing else survives the process boundary.
+_HTTP_OPTIONS_ENV = "TESLAMATE_MCP_HTTP_OPTIONS"
 
 
 def _make_health(server: MCPServer) -> Callable[[Request], Awaitable[JSONResponse]]:
-    """Build the /health handler bound to this server's connection pool."""
+    """Build the /health handler bound to this server's health monitor."""
 
     async def _health(_request: Request) -> JSONResponse:
         """Readiness probe for the Docker HEALTHCHECK and any external monitor.
 
-        This checks the database, not just the event loop. A liveness-only
+        This reports the database, not just the event loop. A liveness-only
         probe reported `ok` while every MCP call failed with a 500 because the
         pool could not reach PostgreSQL — the container looked healthy while
-        being entirely unable to serve.
+        being entirely unable to serve. The answer comes from the background
+        monitor's last probe, so a tight probe interval (or a flood of probes)
+        never costs a pool connection (the monitor probes on a dedicated one);
+        only the very first request, before the monitor has run, probes inline.
         """
         body: dict[str, object] = {"status": "ok", "version": __version__, "database": "ok"}
         context = app_context_for(server)
         if context is None or context.pool.closed:
             body |= {"status": "degraded", "database": "unavailable"}
             return JSONResponse(body, status_code=503)
-        try:
-            async with asyncio.timeout(_HEALTH_DB_TIMEOUT_S):
-                async with context.pool.connection() as conn:
-                    await conn.execute("SELECT 1")
-        except Exception as exc:  # any failure here means "not serving"
-            # Some psycopg errors stringify to "", and an empty str has no
-            # lines at all — indexing it would 500 the probe it exists to keep
-            # honest. Fall back to the class name.
-            detail = next(iter(str(exc).strip().splitlines()), None) or type(exc).__name__
-            body |= {"status": "degraded", "database": "unreachable", "detail": detail[:200]}
+        monitor = context.health
+        snapshot = monitor.snapshot or await monitor.probe(context.pool)
+        circuit = monitor.breaker.state
+        body["circuit"] = circuit
+        if monitor.breaker.saturations:
+            # Calls that gave up waiting for a connection: busy, not down.
+            body["saturation"] = {
+                "events": monitor.breaker.saturations,
+                "last": monitor.breaker.last_saturation,
+            }
+        if snapshot is not None:
+            body["checked_s_ago"] = round(max(0.0, time.time() - snapshot.checked_at), 1)
+        if context.sizer is not None and context.sizer.last_window is not None:
+            body["pool"] = context.sizer.last_window.as_dict()
+        if context.replicas.replicas:
+            # Informational: reads fall back to the primary, so a lagging or
+            # unreachable replica does not make the server unhealthy.
+            body["replicas"] = [
+                {
+                    "name": replica.name,
+                    "routable": context.replicas.eligible(replica),
+                    "lag_s": replica.health.snapshot.lag_s if replica.health.snapshot else None,
+                }
+                for replica in context.replicas.replicas
+            ]
+        if snapshot is None or not snapshot.ok or circuit != CLOSED:
+            detail = (snapshot.detail if snapshot else None) or monitor.breaker.last_error
+            body |= {"status": "degraded", "database": "unreachable"}
+            if detail:
+                body["detail"] = detail
             return JSONResponse(body, status_code=503)
+        body["latency_ms"] = snapshot.latency_ms
         return JSONResponse(body)
 
     return _health
@@ -104,6 +146,87 @@ def stdio() -> None:
     mcp.run(transport="stdio")
 
 
+def _build_http_app(settings: Settings, *, json_response: bool, stateless: bool) -> Starlette:
+    """Build the streamable-HTTP ASGI app: MCP transport, /health, and auth."""
+    mcp = create_server(settings)
+
+    # MCPServer exposes a Starlette app for streamable-http; we wrap it for
+    # auth and mount a small /health probe alongside it. The app's lifespan
+    # runs the server lifespan once per process, which opens and closes the
+    # shared pool. Passing the bind host lets the SDK auto-enable DNS-rebinding
+    # protection for localhost binds (it stays off for 0.0.0.0 behind a proxy).
+    app = mcp.streamable_http_app(
+        json_response=json_response,
+        stateless_http=stateless,
+        host=settings.host,
+    )
+    app.router.routes.append(Route("/health", _make_health(mcp), methods=["GET"]))
+    app.state.mcp_server = mcp  # for in-process callers (loadtest) that need the pool
+    app.add_middleware(NormalizeMcpPathMiddleware)
+
+    tokens = parse_auth_tokens(
+        settings.auth_token.get_secret_value() if settings.auth_token else ""
+    )
+    if tokens:
+        app.add_middleware(BearerAuthMiddleware, auth_token=tokens)
+        logging.getLogger(__name__).info(
+            "Bearer token authentication enabled (%d accepted token(s))", len(tokens)
+        )
+    else:
+        logging.getLogger(__name__).warning(
+            "No AUTH_TOKEN set — the HTTP endpoint is unauthenticated"
+        )
+    return app
+
+
+def _apply_http_overrides(settings: Settings, overrides: dict[str, Any]) -> None:
+    for key, value in overrides.items():
+        setattr(settings, key, SecretStr(value) if key == "auth_token" else value)
+
+
+def _worker_pool_budget(settings: Settings, workers: int) -> dict[str, int]:
+    """Split POOL_MAX_SIZE across worker processes so the total stays bounded.
+
+    Each worker owns a private pool, so N workers at the configured size would
+    open N times the connections on a database TeslaMate and Grafana also use.
+    Every worker keeps at least one connection, so the total can exceed
+    POOL_MAX_SIZE only when there are more workers than connections.
+    """
+    per_worker = max(1, settings.pool_max_size // workers)
+    return {"pool_max_size": per_worker, "pool_min_size": min(settings.pool_min_size, per_worker)}
+
+
+# run_sql cursors and spooled results live in the worker that created them,
+# and the next page request may land on any other worker.
+_WORKER_PROCESS_LOCAL_OFF: dict[str, int] = {
+    "custom_sql_max_cursors": 0,
+    "result_spool_threshold_bytes": 0,
+}
+
+
+def http_app_factory() -> Starlette:
+    """uvicorn app factory for `http --workers N`; runs once in every worker process."""
+    options = json.loads(os.environ[_HTTP_OPTIONS_ENV])
+    settings = load_settings()
+    _apply_http_overrides(settings, options["settings"])
+    _configure_logging(settings.log_level)
+    configure_telemetry()
+    return _build_http_app(
+        settings, json_response=options["json_response"], stateless=options["stateless"]
+    )
+
+
+def _speedup_kwargs(speedups: bool) -> dict[str, str]:
+    if not speedups:
+        return {}
+    missing = [m for m in ("uvloop", "httptools") if importlib.util.find_spec(m) is None]
+    if missing:
+        raise click.UsageError(
+            f"--speedups needs {' and '.join(missing)} (both ship with uvicorn[standard])."
+        )
+    return {"loop": "uvloop", "http": "httptools"}
+
+
 @main.command()
 @click.option("--host", default=None, help="HTTP bind host (overrides config).")
 @click.option("--port", default=None, type=int, help="HTTP bind port (overrides config).")
@@ -125,51 +248,69 @@ def stdio() -> None:
     help="Serve legacy-era clients without per-session state (2026-07-28 era "
     "requests are always stateless).",
 )
+@click.option(
+    "--workers",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Worker processes. POOL_MAX_SIZE is split across them. Requires --stateless.",
+)
+@click.option(
+    "--speedups/--no-speedups",
+    default=False,
+    help="Run on uvloop + httptools instead of asyncio + h11.",
+)
 def http(
     host: str | None,
     port: int | None,
     auth_token: str | None,
     json_response: bool,
     stateless: bool,
+    workers: int,
+    speedups: bool,
 ) -> None:
     """Run the MCP server over streamable HTTP (for remote deployments)."""
     settings = load_settings()
+    overrides: dict[str, Any] = {}
     if host is not None:
-        settings.host = host
+        overrides["host"] = host
     if port is not None:
-        settings.port = port
+        overrides["port"] = port
     if auth_token is not None:
-        from pydantic import SecretStr
-
-        settings.auth_token = SecretStr(auth_token)
+        overrides["auth_token"] = auth_token
+    _apply_http_overrides(settings, overrides)
 
     _configure_logging(settings.log_level)
-    configure_telemetry()
-    mcp = create_server(settings)
-
-    # MCPServer exposes a Starlette app for streamable-http; we wrap it for
-    # auth and mount a small /health probe alongside it. The app's lifespan
-    # runs the server lifespan once per process, which opens and closes the
-    # shared pool. Passing the bind host lets the SDK auto-enable DNS-rebinding
-    # protection for localhost binds (it stays off for 0.0.0.0 behind a proxy).
-    app = mcp.streamable_http_app(
-        json_response=json_response,
-        stateless_http=stateless,
-        host=settings.host,
+    server_kwargs = {
+        "host": settings.host,
+        "port": settings.port,
+        "log_level": settings.log_level.lower(),
+        **_speedup_kwargs(speedups),
+    }
+
+    if workers == 1:
+        configure_telemetry()
+        app = _build_http_app(settings, json_response=json_response, stateless=stateless)
+        uvicorn.run(app, **server_kwargs)
+        return
+
+    # Stateful sessions live in one process's memory, and nothing pins a
+    # client to the worker that created its session.
+    if not stateless:
+        raise click.UsageError("--workers > 1 requires --stateless.")
+    overrides |= _worker_pool_budget(settings, workers) | _WORKER_PROCESS_LOCAL_OFF
+    os.environ[_HTTP_OPTIONS_ENV] = json.dumps(
+        {"settings": overrides, "json_response": json_response, "stateless": stateless}
+    )
+    logging.getLogger(__name__).info(
+        "Starting %d workers, each with a pool of at most %d connections; "
+        "run_sql paging and result spooling are off",
+        workers,
+        overrides["pool_max_size"],
+    )
+    uvicorn.run(
+        "teslamate_mcp.cli:http_app_factory", factory=True, workers=workers, **server_kwargs
     )
-    app.router.routes.append(Route("/health", _make_health(mcp), methods=["GET"]))
-    app.add_middleware(NormalizeMcpPathMiddleware)
-
-    token = settings.auth_token.get_secret_value() if settings.auth_token else ""
-    if token:
-        app.add_middleware(BearerAuthMiddleware, auth_token=token)
-        logging.getLogger(__name__).info("Bearer token authentication enabled")
-    else:
-        logging.getLogger(__name__).warning(
-            "No AUTH_TOKEN set — the HTTP endpoint is unauthenticated"
-        )
-
-    uvicorn.run(app, host=settings.host, port=settings.port, log_level=settings.log_level.lower())
 
 
 @main.command("gen-token")
@@ -194,5 +335,225 @@ def list_tools_cmd() -> None:
         click.echo(f"{spec.tool_name:<45} (MCP App)   ({params})")
 
 
+@main.command("lint-sql")
+@click.argument(
+    "directory",
+    required=False,
+    type=click.Path(exists=True, file_okay=False, path_type=Path),
+)
+def lint_sql_cmd(directory: Path | None) -> None:
+    """Check a query directory (default: the bundled one) for slow SQL patterns."""
+    try:
+        tools = discover_predefined_tools(directory)
+    except (OSError, ValueError) as exc:
+        raise click.ClickException(str(exc)) from exc
+    findings = [f for tool in tools for f in lint_sql(tool.sql, tool.source, tool.lint_allow)]
+    for finding in findings:
+        click.echo(str(finding))
+    if findings:
+        raise click.ClickException(
+            f"{len(findings)} finding(s). Fix them, or allow the rule in the file's "
+            "[lint] table with a comment saying why."
+        )
+    click.echo(f"{len(tools)} queries checked, no findings.")
+
+
+async def _loadtest_local_http(settings: Settings, **options: Any) -> dict[str, Any]:
+    """Serve the real HTTP app on an ephemeral localhost port and load-test it."""
+    settings.host = "127.0.0.1"
+    settings.auth_token = None
+    app = _build_http_app(settings, json_response=False, stateless=False)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    try:
+        while not server.started:
+            if serving.done():
+                raise click.ClickException("The in-process HTTP server failed to start.")
+            await asyncio.sleep(0.05)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        mcp = app.state.mcp_server
+        return await run_loadtest(
+            lambda: connect_http(f"http://127.0.0.1:{port}/mcp"),
+            pool=lambda: app_context_for(mcp).pool,
+            **options,
+        )
+    finally:
+        server.should_exit = True
+        await serving
+
+
+@main.command()
+@click.option(
+    "--transport",
+    type=click.Choice(["memory", "http"]),
+    default="memory",
+    show_default=True,
+    help="memory: call the server in-process. http: serve it on a local port and "
+    "call it over streamable HTTP, one session per client.",
+)
+@click.option(
+    "--url",
+    default=None,
+    help="Load-test an already running server at this /mcp URL instead (no pool stats).",
+)
+@click.option("--auth-token", default=None, help="Bearer token for --url.")
+@click.option("--clients", default=8, show_default=True, type=click.IntRange(min=1))
+@click.option(
+    "--duration",
+    default=30.0,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Seconds to run.",
+)
+@click.option(
+    "--mix",
+    type=click.Path(exists=True, dir_okay=False, path_type=Path),
+    default=None,
+    help="JSON scenario mix (default: the workflows named in the bundled prompts).",
+)
+@click.option("--seed", default=0, show_default=True, help="Seed for scenario selection.")
+@click.option(
+    "--output", "-o", type=click.File("w"), default="-", help="Report file (default stdout)."
+)
+def loadtest(
+    transport: str,
+    url: str | None,
+    auth_token: str | None,
+    clients: int,
+    duration: float,
+    mix: Path | None,
+    seed: int,
+    output,
+) -> None:
+    """Replay a weighted tool mix from concurrent clients; print a JSON report.
+
+    Point DATABASE_URL at a copy of the data, never production: the run is
+    read-only but it saturates the pool on purpose.
+    """
+    # Per-call INFO logs would dominate the run (and the report on stdout).
+    _configure_logging("WARNING")
+    try:
+        scenarios = load_mix(mix) if mix is not None else None
+    except ValueError as exc:
+        raise click.BadParameter(str(exc), param_hint="--mix") from exc
+    options: dict[str, Any] = {
+        "clients": clients,
+        "duration_s": duration,
+        "scenarios": scenarios,
+        "seed": seed,
+    }
+
+    if url is not None:
+        transport = "http"
+        report = asyncio.run(run_loadtest(lambda: connect_http(url, auth_token), **options))
+    elif transport == "http":
+        report = asyncio.run(_loadtest_local_http(load_settings(), **options))
+    else:
+        mcp = create_server(load_settings())
+        # One in-memory connection shared by every simulated client: each
+        # connection would otherwise enter (and own) the server lifespan.
+        report = asyncio.run(
+            run_loadtest(
+                lambda: Client(mcp),
+                share_client=True,
+                pool=lambda: app_context_for(mcp).pool,
+                **options,
+            )
+        )
+    json.dump({"transport": transport, **report}, output, indent=2)
+    output.write("\n")
+
+
+@main.command("generate-data")
+@click.option(
+    "--database-url",
+    envvar="DATABASE_URL",
+    required=True,
+    help="Target database (default $DATABASE_URL). Its TeslaMate tables are replaced.",
+)
+@click.option(
+    "--scale",
+    default=1.0,
+    show_default=True,
+    type=click.FloatRange(min=0, min_open=True),
+    help="Years of history per car (about 1.6M positions per car-year).",
+)
+@click.option("--cars", default=2, show_default=True, type=click.IntRange(1, 50))
+@click.option("--seed", default=0, show_default=True, help="Seed for the simulation.")
+@click.option(
+    "--end-date",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=None,
+    help="Last day of history (default today, UTC). Pin it for identical reruns.",
+)
+@click.option("--yes", is_flag=True, help="Do not ask before dropping tables.")
+def generate_data(
+    database_url: str, scale: float, cars: int, seed: int, end_date, yes: bool
+) -> None:
+    """Fill a scratch database with a synthetic TeslaMate dataset for scale testing."""
+    spec = DatasetSpec(seed=seed, scale=scale, cars=cars)
+    if end_date is not None:
+        spec = DatasetSpec(seed=seed, scale=scale, cars=cars, end_date=end_date.date())
+    if not yes:
+        click.confirm(
+            f"Drop and recreate the TeslaMate tables in {describe_dsn(database_url)}?",
+            abort=True,
+        )
+    started = time.perf_counter()
+    try:
+        counts = load_synthetic(
+            database_url,
+            spec,
+            progress=lambda n: click.echo(f"  {n:,} positions", err=True),
+        )
+    except RuntimeError as exc:
+        raise click.ClickException(str(exc)) from exc
+    for table, count in counts.items():
+        click.echo(f"{table:<20} {count:>12,}")
+    click.echo(
+        f"Loaded {spec.days} day(s) for {cars} car(s) in {time.perf_counter() - started:.1f}s"
+    )
+
+
+@main.command()
+@click.option(
+    "--large-table-rows",
+    default=500_000,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="A sequential scan of a table estimated at this many rows fails the tool.",
+)
+def doctor(large_table_rows: int) -> None:
+    """Check indexes, statistics and query plans of the bundled tools (read-only)."""
+    settings = load_settings()
+    try:
+        report = run_doctor(
+            settings.database_url,
+            discover_predefined_tools(),
+            report_timezone=settings.report_timezone,
+            large_table_rows=large_table_rows,
+        )
+    except psycopg.Error as exc:
+        raise click.ClickException(f"Could not audit the database: {exc}") from exc
+
+    click.echo("Tables")
+    for table in sorted(report.tables.values(), key=lambda t: -t.estimated_rows):
+        status = "; ".join(table.problems) or "ok"
+        click.echo(f"  {table.name:<20} {table.estimated_rows:>12,} rows  {status}")
+    click.echo("Tools")
+    for verdict in report.tools:
+        click.echo(
+            f"  {verdict.verdict.upper():<4} {verdict.tool:<42} {verdict.worst_node}"
+            f" (~{verdict.estimated_rows:,} rows)"
+        )
+        for note in verdict.notes:
+            click.echo(f"       {note}")
+    failed = [v.tool for v in report.tools if v.verdict == "fail"]
+    if failed:
+        raise click.ClickException(
+            f"{len(failed)} tool(s) sequentially scan a large table: {', '.join(failed)}"
+        )
+
+
 if __name__ == "__main__":  # pragma: no cover
     sys.exit(main())
@@ -28,7 +28,10 @@ class Settings(BaseSettings):
     )
     auth_token: SecretStr | None = Field(
         default=None,
-        description="Bearer token for HTTP transport. Auth is disabled when empty.",
+        description=(
+            "Bearer token for HTTP transport; several comma-separated tokens are "
+            "all accepted (for rotation). Auth is disabled when empty."
+        ),
     )
 
     host: str = Field(default="0.0.0.0", description="HTTP bind host.")
@@ -36,6 +39,48 @@ class Settings(BaseSettings):
 
     pool_min_size: int = Field(default=1, ge=1)
     pool_max_size: int = Field(default=10, ge=1)
+    pool_adaptive: bool = Field(
+        default=False,
+        description=(
+            "Treat POOL_MIN_SIZE/POOL_MAX_SIZE as bounds: start at the minimum and "
+            "raise the pool's cap only while requests wait for a connection."
+        ),
+    )
+    pool_target_wait_ms: int = Field(
+        default=100,
+        ge=1,
+        description="Mean wait for a connection above which an adaptive pool grows.",
+    )
+    pool_stats_interval_s: int = Field(
+        default=60,
+        ge=1,
+        description=(
+            "Seconds per pool statistics window: logged, shown on /health, and "
+            "used by an adaptive pool to decide when to shrink."
+        ),
+    )
+    pool_max_lifetime_s: float = Field(
+        default=3600,
+        gt=0,
+        description="Connections older than this are replaced when returned to the pool.",
+    )
+    pool_max_idle_s: float = Field(
+        default=600,
+        gt=0,
+        description="Connections idle this long are closed, down to POOL_MIN_SIZE.",
+    )
+    pool_reconnect_timeout_s: float = Field(
+        default=300,
+        gt=0,
+        description=(
+            "How long the pool keeps retrying (with exponential backoff) a "
+            "connection it failed to open before giving up on it."
+        ),
+    )
+    pool_prewarm: bool = Field(
+        default=False,
+        description="Wait at startup until POOL_MIN_SIZE connections are open.",
+    )
 
     query_timeout_ms: int = Field(
         default=5000,
@@ -55,6 +100,138 @@ class Settings(BaseSettings):
         ge=1,
         description="Default LIMIT injected into custom SQL queries when absent.",
     )
+    custom_sql_max_cursors: int = Field(
+        default=2,
+        ge=0,
+        description=(
+            "Paged run_sql results held open at once. Each holds one pool "
+            "connection; 0 disables paging and restores the plain row cap."
+        ),
+    )
+    custom_sql_cursor_idle_s: int = Field(
+        default=60,
+        ge=1,
+        description="Seconds an unread run_sql cursor is kept before it is closed.",
+    )
+    custom_sql_cursor_max_age_s: int = Field(
+        default=300,
+        ge=1,
+        description="Upper bound on a run_sql cursor's lifetime, however actively it is read.",
+    )
+
+    result_spool_threshold_bytes: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Predefined-tool results larger than this (as JSON) are spooled to a "
+            "local file and returned as a paged teslamate://results/ resource. "
+            "0 (the default) disables spooling: only clients whose model can read "
+            "resources should turn it on."
+        ),
+    )
+    result_spool_max_bytes: int = Field(
+        default=268_435_456,
+        ge=1,
+        description="Total size of spooled results; the least recently read are evicted first.",
+    )
+    result_spool_ttl_s: int = Field(
+        default=3600,
+        ge=1,
+        description="Seconds a spooled result stays readable after it was written.",
+    )
+    result_spool_page_rows: int = Field(
+        default=500,
+        ge=1,
+        description="Rows per page of a spooled result resource.",
+    )
+
+    entity_cache_path: str = Field(
+        default="",
+        description=(
+            "SQLite file caching the rows of finished drives and charging sessions "
+            "for tools with a [cache] table (routes, charging curves). Empty disables it."
+        ),
+    )
+    entity_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        ge=1024,
+        description="Size bound of the entity cache; least recently read entries go first.",
+    )
+    approximate_target_rows: int = Field(
+        default=50_000,
+        ge=100,
+        description=(
+            "Window rows an approximate=true call aims to sample: the TABLESAMPLE "
+            "rate is this over the planner's estimate of the rows in the window."
+        ),
+    )
+    shared_scan_window_ms: int = Field(
+        default=0,
+        ge=0,
+        le=1000,
+        description=(
+            "How long a tool with a [scan] table waits for other such calls to "
+            "share one read of positions with. 0 (the default) disables shared "
+            "scans; every call pays the wait, even when nothing else arrives."
+        ),
+    )
+    address_index_rebuild_s: int = Field(
+        default=900,
+        ge=0,
+        description=(
+            "Seconds between full rebuilds of the in-memory address index that "
+            "resolves search location filters (new addresses are added on every "
+            "lookup). 0 disables it: locations are then matched with ILIKE in SQL."
+        ),
+    )
+    month_memo_max_entries: int = Field(
+        default=4096,
+        ge=0,
+        description=(
+            "Closed (car, month) result groups the monthly report tools keep in "
+            "memory between calls, least recently read evicted first. 0 disables it."
+        ),
+    )
+
+    replica_database_urls: str = Field(
+        default="",
+        description=(
+            "Whitespace-separated connection strings of read replicas. Read-only "
+            "tools are routed to them; writes always use DATABASE_URL."
+        ),
+    )
+    replica_max_lag_s: int = Field(
+        default=30,
+        ge=0,
+        description="Replicas further behind the primary than this are not routed to.",
+    )
+
+    health_check_interval_s: int = Field(
+        default=5,
+        ge=1,
+        description="Seconds between background database probes (served by /health).",
+    )
+    live_poll_interval_s: int = Field(
+        default=5,
+        ge=1,
+        description=(
+            "Seconds between change-feed polls behind the live teslamate://cars/ "
+            "and teslamate://charging/ resources (only while a client listens)."
+        ),
+    )
+    circuit_failure_threshold: int = Field(
+        default=3,
+        ge=1,
+        description="Consecutive connectivity failures that open the database circuit.",
+    )
+    circuit_reset_timeout_s: int = Field(
+        default=15,
+        ge=1,
+        description=(
+            "Seconds tool calls fail fast once the circuit opens, before one "
+            "trial call is let through to test the database again."
+        ),
+    )
 
     enable_charging_writes: bool = Field(
         default=False,
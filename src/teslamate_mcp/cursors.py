@@ -0,0 +1,244 @@
+"""Server-side cursors that let `run_sql` page through large results.
+
+Before this, a result larger than the row cap was cut off and the assistant
+re-issued OFFSET queries: each one re-ran the full plan, and rows inserted by
+TeslaMate in between shifted the pages. A paged query now runs once, as a
+`DECLARE ... CURSOR` inside a READ ONLY transaction, and every later page is
+a `FETCH` from that same cursor — so all pages come from the snapshot the
+query started on.
+
+A held cursor pins a pool connection and an open transaction, so the store
+is capped in count, idle time, and total age. Expired cursors are closed at
+the start of the next `run_sql` call and by a background reaper, started
+from the server lifespan, so their pool connections come back even if no
+further call ever arrives. The transaction's own
+`idle_in_transaction_session_timeout` only ends the server backend; the
+psycopg connection stays checked out until the store returns it.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import secrets
+import time
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+
+from psycopg import AsyncConnection, AsyncServerCursor
+from psycopg_pool import AsyncConnectionPool
+
+from .db import cancel_backend_on_cancel, run_cancellable, set_readonly_guards
+from .serialization import rows_to_jsonable
+
+logger = logging.getLogger(__name__)
+
+
+class CursorError(ValueError):
+    """Raised when a continuation token is unknown, expired, or reused with another query."""
+
+
+@dataclass(frozen=True)
+class Page:
+    """One page of a `run_sql` result; `next_cursor` is None on the last page."""
+
+    rows: list[dict[str, Any]]
+    next_cursor: str | None = None
+
+
+@dataclass
+class _HeldCursor:
+    pool: AsyncConnectionPool
+    conn: AsyncConnection[Any]
+    cursor: AsyncServerCursor[Any]
+    digest: str
+    opened_at: float
+    last_used: float
+    lookahead: list[dict[str, Any]]
+
+
+def _digest(query: str) -> str:
+    return hashlib.sha256(query.strip().rstrip(";").rstrip().encode("utf-8")).hexdigest()
+
+
+class CursorStore:
+    """Bounded registry of open `run_sql` cursors, keyed by single-use tokens."""
+
+    def __init__(
+        self,
+        *,
+        page_size: int,
+        max_open: int,
+        idle_timeout_s: float,
+        max_age_s: float,
+        statement_timeout_ms: int,
+    ) -> None:
+        self._page_size = page_size
+        self._max_open = max_open
+        self._idle_timeout_s = idle_timeout_s
+        self._max_age_s = max_age_s
+        self._statement_timeout_ms = statement_timeout_ms
+        self._held: dict[str, _HeldCursor] = {}
+        # Connections checked out but not in `_held`: a cursor being opened,
+        # or a held one whose next page is being fetched.
+        self._reserved = 0
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self) -> None:
+        """Begin closing expired cursors in the background; called from the server lifespan."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._reap(), name="teslamate-cursor-reaper")
+
+    async def stop(self) -> None:
+        """Stop the reaper and release every held connection."""
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.close_all()
+
+    @property
+    def open_count(self) -> int:
+        return len(self._held)
+
+    async def first_page(
+        self, pool: AsyncConnectionPool, query: str, *, statement_timeout_ms: int | None = None
+    ) -> Page | None:
+        """Run `query` under a server-side cursor and return its first page.
+
+        Returns None when the store is full, so the caller can fall back to a
+        plain capped query. A result that fits in one page never holds a
+        connection past this call. `statement_timeout_ms` tightens the
+        store's timeout for this query.
+        """
+        return await run_cancellable(
+            self._first_page(pool, query, statement_timeout_ms or self._statement_timeout_ms)
+        )
+
+    async def _first_page(
+        self, pool: AsyncConnectionPool, query: str, statement_timeout_ms: int
+    ) -> Page | None:
+        await self.sweep()
+        if len(self._held) + self._reserved >= self._max_open:
+            return None
+        # Reserve the slot before awaiting a connection so concurrent calls
+        # cannot overshoot the cap.
+        self._reserved += 1
+        try:
+            conn = await pool.getconn()
+            try:
+                async with cancel_backend_on_cancel(conn), conn.cursor() as cur:
+                    await conn.set_autocommit(False)
+                    # The transaction sits idle between pages by design, so
+                    # its idle bound is the cursor's, not the statement's.
+                    await set_readonly_guards(
+                        cur,
+                        statement_timeout_ms,
+                        idle_timeout_ms=int(self._idle_timeout_s * 1000),
+                    )
+                    cursor = conn.cursor(name=f"run_sql_{secrets.token_hex(8)}")
+                    await cursor.execute(query.strip().rstrip(";"))
+                    rows = await cursor.fetchmany(self._page_size + 1)
+            except BaseException:
+                await _release(pool, conn)
+                raise
+        finally:
+            self._reserved -= 1
+
+        if len(rows) <= self._page_size:
+            await _release(pool, conn)
+            return Page(rows_to_jsonable(rows))
+
+        now = time.monotonic()
+        held = _HeldCursor(
+            pool=pool,
+            conn=conn,
+            cursor=cursor,
+            digest=_digest(query),
+            opened_at=now,
+            last_used=now,
+            lookahead=rows[self._page_size :],
+        )
+        return Page(rows_to_jsonable(rows[: self._page_size]), self._register(held))
+
+    async def next_page(self, token: str, query: str) -> Page:
+        """Fetch the page after the one `token` was issued with. Tokens are single-use."""
+        return await run_cancellable(self._next_page(token, query))
+
+    async def _next_page(self, token: str, query: str) -> Page:
+        await self.sweep()
+        held = self._held.pop(token, None)
+        if held is None:
+            raise CursorError(
+                "Unknown or expired cursor. Run the query again without `cursor` to start over."
+            )
+        if held.digest != _digest(query):
+            self._held[token] = held
+            raise CursorError("This cursor belongs to a different query; pass the original query.")
+
+        # Out of `_held` while it fetches, the cursor still holds its slot.
+        self._reserved += 1
+        try:
+            async with cancel_backend_on_cancel(held.conn):
+                fetched = await held.cursor.fetchmany(self._page_size)
+        except BaseException:
+            await self._close(held)
+            raise
+        finally:
+            self._reserved -= 1
+        rows = held.lookahead + fetched
+        if len(rows) <= self._page_size:
+            await self._close(held)
+            return Page(rows_to_jsonable(rows))
+
+        held.lookahead = rows[self._page_size :]
+        held.last_used = time.monotonic()
+        return Page(rows_to_jsonable(rows[: self._page_size]), self._register(held))
+
+    async def sweep(self) -> None:
+        """Close every cursor past its idle or age limit."""
+        now = time.monotonic()
+        expired = [
+            token
+            for token, held in self._held.items()
+            if now - held.last_used > self._idle_timeout_s or now - held.opened_at > self._max_age_s
+        ]
+        for token in expired:
+            logger.info("Closing expired run_sql cursor")
+            await self._close(self._held.pop(token))
+
+    async def _reap(self) -> None:
+        # A cursor outlives its limits by at most half the shorter of them.
+        interval_s = min(self._idle_timeout_s, self._max_age_s) / 2
+        while True:
+            await asyncio.sleep(interval_s)
+            try:
+                await self.sweep()
+            except Exception:  # keep reaping; a failed release is the pool's to recover
+                logger.warning("Closing expired run_sql cursors failed", exc_info=True)
+
+    async def close_all(self) -> None:
+        """Release every held connection; called from the server lifespan on exit."""
+        held, self._held = list(self._held.values()), {}
+        for entry in held:
+            await self._close(entry)
+
+    def _register(self, held: _HeldCursor) -> str:
+        token = secrets.token_urlsafe(12)
+        self._held[token] = held
+        return token
+
+    async def _close(self, held: _HeldCursor) -> None:
+        await _release(held.pool, held.conn)
+
+
+async def _release(pool: AsyncConnectionPool, conn: AsyncConnection[Any]) -> None:
+    """Roll back and return a connection; a backend already killed is discarded by the pool."""
+    try:
+        await conn.rollback()
+    except Exception:  # idle timeout fired, network gone, ...: nothing left to undo
+        logger.debug("Rollback of a held run_sql connection failed", exc_info=True)
+    await pool.putconn(conn)
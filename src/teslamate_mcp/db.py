@@ -2,56 +2,177 @@
 
 from __future__ import annotations
 
-from typing import Any
-
-from psycopg import sql
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Coroutine
+from contextlib import asynccontextmanager
+from typing import Any, TypeVar
+
+import anyio
+from psycopg import AsyncConnection, AsyncCursor, pq, sql
 from psycopg.rows import dict_row
 from psycopg_pool import AsyncConnectionPool
 
 from .config import Settings
 from .serialization import rows_to_jsonable
 
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# How long a cancelled call waits for PostgreSQL to acknowledge the cancel.
+_CANCEL_TIMEOUT_S = 5.0
 
-def build_pool(settings: Settings) -> AsyncConnectionPool:
+
+def build_pool(settings: Settings, conninfo: str | None = None) -> AsyncConnectionPool:
     """Construct an async connection pool. Caller is responsible for `open()` and `close()`.
 
+    `conninfo` overrides `settings.database_url` (read replicas reuse every
+    other pool setting).
+
     A libpq-level `statement_timeout` bounds every query the pool runs. The
-    bundled reports go through `fetch_all`, which sets no timeout of its own,
-    so before this a pathological query pinned a backend indefinitely: the MCP
-    client hung with no error while PostgreSQL kept burning CPU, and killing
-    the client did not cancel the server-side query. `fetch_readonly` still
-    narrows the bound further with SET LOCAL for untrusted SQL.
+    bundled reports go through `fetch_all`, which sets no timeout of its own
+    unless the tool's [execution] table declares one. Before this bound, a
+    pathological query pinned a backend indefinitely: the MCP client hung
+    with no error while PostgreSQL kept burning CPU, and killing the client
+    did not cancel the server-side query. An [execution] `max_rows` is no
+    substitute: it only caps the rows fetched, not what the server scans or
+    sorts. `fetch_readonly` still narrows the bound further with SET LOCAL
+    for untrusted SQL.
+
+    An adaptive pool (`POOL_ADAPTIVE`) starts capped at `pool_min_size`; its
+    `PoolSizer` raises the cap toward `pool_max_size` as requests queue.
     """
+    conninfo = settings.database_url if conninfo is None else conninfo
     kwargs: dict[str, Any] = {"row_factory": dict_row}
     # kwargs win over conninfo, so only inject when the operator has not set
     # their own libpq options in DATABASE_URL.
-    if "options=" not in settings.database_url:
+    if "options=" not in conninfo:
         kwargs["options"] = f"-c statement_timeout={int(settings.statement_timeout_ms)}"
     return AsyncConnectionPool(
-        conninfo=settings.database_url,
+        conninfo=conninfo,
         min_size=settings.pool_min_size,
-        max_size=settings.pool_max_size,
+        max_size=settings.pool_min_size if settings.pool_adaptive else settings.pool_max_size,
         kwargs=kwargs,
+        max_lifetime=settings.pool_max_lifetime_s,
+        max_idle=settings.pool_max_idle_s,
+        reconnect_timeout=settings.pool_reconnect_timeout_s,
+        reconnect_failed=_log_reconnect_failed,
         open=False,
     )
 
 
+def _log_reconnect_failed(pool: AsyncConnectionPool) -> None:
+    # psycopg retries a failed connection with exponential backoff for
+    # `reconnect_timeout`, then gives up on that slot; say so once.
+    logger.warning(
+        "Pool %s gave up reconnecting after POOL_RECONNECT_TIMEOUT_S; it will try again "
+        "when a request needs a connection",
+        pool.name,
+    )
+
+
 async def fetch_all(
     pool: AsyncConnectionPool,
     query: str,
     params: tuple[Any, ...] | dict[str, Any] | None = None,
+    *,
+    settings: dict[str, str] | None = None,
+    max_rows: int | None = None,
 ) -> list[dict[str, Any]]:
     """Run a trusted query and return JSON-safe rows. Used for predefined SQL files.
 
     Dict params bind to `%(name)s` placeholders. When params is not None, literal
     percent signs in the SQL must be escaped as `%%`.
+
+    Cancelling the caller cancels the statement on the server too; see
+    `run_cancellable`.
+
+    `settings` (GUC name to value) are applied with SET LOCAL in a transaction
+    around the query. The SETs, the query and the COMMIT go out in one
+    pipeline, so a per-tool policy costs no extra round trips and cannot leak
+    into the pooled connection's next checkout. `max_rows` caps the rows
+    fetched (with `fetchmany`) and returned; the server still runs the whole
+    query, scans and sorts included.
     """
-    async with pool.connection() as conn, conn.cursor() as cur:
-        await cur.execute(query, params)
-        rows = await cur.fetchall()
+    return await run_cancellable(_fetch_all(pool, query, params, settings, max_rows))
+
+
+async def _fetch_all(
+    pool: AsyncConnectionPool,
+    query: str,
+    params: tuple[Any, ...] | dict[str, Any] | None,
+    settings: dict[str, str] | None,
+    max_rows: int | None,
+) -> list[dict[str, Any]]:
+    async with pool.connection() as conn, cancel_backend_on_cancel(conn):
+        if not settings:
+            async with conn.cursor() as cur:
+                await cur.execute(query, params)
+                rows = await _fetch(cur, max_rows)
+        else:
+            async with conn.pipeline(), conn.transaction(), conn.cursor() as cur:
+                for name, value in settings.items():
+                    await cur.execute(
+                        sql.SQL("SET LOCAL {name} = {value}").format(
+                            name=sql.Identifier(name), value=sql.Literal(value)
+                        )
+                    )
+                await cur.execute(query, params)
+                rows = await _fetch(cur, max_rows)
     return rows_to_jsonable(rows)
 
 
+async def run_cancellable(coro: Coroutine[Any, Any, T]) -> T:
+    """Await database work so that cancelling the caller also stops it on the server.
+
+    The MCP SDK cancels a handler through an anyio cancel scope, which
+    re-raises CancelledError at every await until the scope exits. psycopg
+    answers a cancellation mid-query by sending PostgreSQL a cancel request
+    and draining the aborted result, but under a level-triggered scope those
+    awaits are cancelled too: the statement kept running until
+    `statement_timeout`, and the pool discarded the connection, still busy.
+    Running the work in its own task gives psycopg one plain cancellation
+    to handle; the caller waits, shielded, for it to finish cleaning up.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        return await asyncio.shield(task)
+    except asyncio.CancelledError:
+        task.cancel()
+        with anyio.CancelScope(shield=True):
+            await asyncio.wait([task])
+        raise
+
+
+@asynccontextmanager
+async def cancel_backend_on_cancel(conn: AsyncConnection[Any]) -> AsyncIterator[None]:
+    """Send a protocol-level cancel if the task is cancelled mid-statement.
+
+    Recent psycopg versions already do this while waiting on the socket; this
+    covers the gaps (and older versions), so no cancelled call leaves a
+    statement running on a backend TeslaMate also needs.
+    """
+    try:
+        yield
+    except asyncio.CancelledError:
+        if conn.pgconn.transaction_status == pq.TransactionStatus.ACTIVE:
+            try:
+                await conn.cancel_safe(timeout=_CANCEL_TIMEOUT_S)
+            except Exception as exc:
+                logger.warning("Query cancellation failed: %s", exc)
+        raise
+
+
+async def _fetch(cur: AsyncCursor[Any], max_rows: int | None) -> list[Any]:
+    if max_rows is None:
+        return await cur.fetchall()
+    rows = await cur.fetchmany(max_rows)
+    if cur.rowcount > max_rows:
+        logger.warning("Result capped at %d of %d row(s)", max_rows, cur.rowcount)
+    return rows
+
+
 async def execute_write(
     pool: AsyncConnectionPool,
     query: str,
@@ -80,28 +201,46 @@ async def fetch_readonly(
     The PostgreSQL transaction is opened with READ ONLY, and `statement_timeout`,
     `lock_timeout`, and `idle_in_transaction_session_timeout` are set as session-
     local guards. The transaction is always rolled back, so even a query that
-    bypasses Python-side checks cannot mutate the database.
+    bypasses Python-side checks cannot mutate the database. Cancelling the
+    caller cancels the statement on the server too.
     """
-    # SET LOCAL refuses parameter binding, so the timeout must be inlined as a
-    # literal. int() casts make any non-integer fail loudly before reaching PG.
-    stmt_ms = int(statement_timeout_ms)
-    lock_ms = 2000
+    return await run_cancellable(_fetch_readonly(pool, query, statement_timeout_ms))
+
 
-    async with pool.connection() as conn:
+async def _fetch_readonly(
+    pool: AsyncConnectionPool, query: str, statement_timeout_ms: int
+) -> list[dict[str, Any]]:
+    async with pool.connection() as conn, cancel_backend_on_cancel(conn):
         await conn.set_autocommit(False)
         async with conn.transaction(force_rollback=True), conn.cursor() as cur:
-            await cur.execute("SET TRANSACTION READ ONLY")
-            await cur.execute(
-                sql.SQL("SET LOCAL statement_timeout = {ms}").format(ms=sql.Literal(stmt_ms))
-            )
-            await cur.execute(
-                sql.SQL("SET LOCAL lock_timeout = {ms}").format(ms=sql.Literal(lock_ms))
-            )
-            await cur.execute(
-                sql.SQL("SET LOCAL idle_in_transaction_session_timeout = {ms}").format(
-                    ms=sql.Literal(stmt_ms)
-                )
-            )
+            await set_readonly_guards(cur, statement_timeout_ms)
             await cur.execute(query)
             rows = await cur.fetchall()
     return rows_to_jsonable(rows)
+
+
+async def set_readonly_guards(
+    cur: AsyncCursor[Any],
+    statement_timeout_ms: int,
+    idle_timeout_ms: int | None = None,
+) -> None:
+    """Make the open transaction READ ONLY and apply the untrusted-SQL timeouts.
+
+    Must be the first thing executed in the transaction. `idle_timeout_ms`
+    defaults to the statement timeout; callers that deliberately leave the
+    transaction idle between statements (paged `run_sql` cursors) widen it.
+    """
+    # SET LOCAL refuses parameter binding, so the timeout must be inlined as a
+    # literal. int() casts make any non-integer fail loudly before reaching PG.
+    stmt_ms = int(statement_timeout_ms)
+    idle_ms = stmt_ms if idle_timeout_ms is None else int(idle_timeout_ms)
+    lock_ms = 2000
+
+    await cur.execute("SET TRANSACTION READ ONLY")
+    await cur.execute(sql.SQL("SET LOCAL statement_timeout = {ms}").format(ms=sql.Literal(stmt_ms)))
+    await cur.execute(sql.SQL("SET LOCAL lock_timeout = {ms}").format(ms=sql.Literal(lock_ms)))
+    await cur.execute(
+        sql.SQL("SET LOCAL idle_in_transaction_session_timeout = {ms}").format(
+            ms=sql.Literal(idle_ms)
+        )
+    )
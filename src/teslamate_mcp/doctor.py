@@ -0,0 +1,213 @@
+"""`teslamate-mcp doctor`: audit an install's indexes and plans for the bundled queries.
+
+TeslaMate installs drift from the schema the queries were written against:
+migrations applied by hand, backups restored without their indexes, tables
+that were never analyzed. Any of these quietly turns a tool into a full scan
+of `positions`. The doctor connects read-only, checks the indexes and
+planner statistics the catalog relies on, and EXPLAINs (without ANALYZE, so
+nothing is executed) every predefined tool with its default params. A tool
+whose plan sequentially scans a table estimated at `large_table_rows` rows or
+more fails.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+import psycopg
+from psycopg.rows import dict_row
+
+from .tools.registry import PredefinedTool
+
+# Leading index columns the catalog depends on, per table. Any index whose
+# leading columns match counts, whatever it is called.
+EXPECTED_INDEXES: dict[str, tuple[tuple[str, ...], ...]] = {
+    "positions": (("car_id", "date"),),
+    "charges": (("charging_process_id",),),
+    "drives": (("car_id",),),
+    "charging_processes": (("car_id",),),
+}
+
+# Id params get a real id, so the plan is the one a real call gets.
+_ID_QUERIES = {
+    "drive_id": "SELECT MAX(id) AS id FROM drives",
+    "charging_process_id": "SELECT MAX(id) AS id FROM charging_processes",
+}
+
+_SCAN_NODES = frozenset(
+    {"Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan", "Tid Scan"}
+)
+
+# Statistics older than this share of modified rows mislead the planner.
+_STALE_FRACTION = 0.2
+
+
+@dataclass
+class TableHealth:
+    name: str
+    estimated_rows: int
+    analyzed: bool
+    modified_fraction: float
+    missing_indexes: list[tuple[str, ...]] = field(default_factory=list)
+
+    @property
+    def problems(self) -> list[str]:
+        problems = [f"no index on ({', '.join(cols)})" for cols in self.missing_indexes]
+        if not self.analyzed:
+            problems.append("never analyzed")
+        elif self.modified_fraction > _STALE_FRACTION:
+            problems.append(f"{self.modified_fraction:.0%} of rows changed since last ANALYZE")
+        return problems
+
+
+@dataclass
+class ToolVerdict:
+    tool: str
+    verdict: str  # "ok", "warn" or "fail"
+    worst_node: str
+    estimated_rows: int
+    notes: list[str] = field(default_factory=list)
+
+
+@dataclass
+class DoctorReport:
+    tables: dict[str, TableHealth]
+    tools: list[ToolVerdict]
+
+    @property
+    def failed(self) -> bool:
+        return any(v.verdict == "fail" for v in self.tools)
+
+
+def table_health(conn: psycopg.Connection[Any], tables: set[str]) -> dict[str, TableHealth]:
+    """Row estimates, ANALYZE freshness and expected-index coverage for `tables`."""
+    rows = conn.execute(
+        """
+        SELECT c.relname AS name,
+            -- reltuples is -1 until the first ANALYZE/VACUUM; fall back to the
+            -- live-tuple counter so an unanalyzed table still has a size.
+            CASE WHEN c.reltuples < 0 THEN COALESCE(s.n_live_tup, 0)
+                ELSE c.reltuples END::bigint AS estimated_rows,
+            (s.last_analyze IS NOT NULL OR s.last_autoanalyze IS NOT NULL) AS analyzed,
+            COALESCE(s.n_mod_since_analyze::float8 / NULLIF(s.n_live_tup, 0), 0)
+                AS modified_fraction
+        FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+        WHERE n.nspname = current_schema() AND c.relkind = 'r' AND c.relname = ANY(%s)
+        """,
+        (sorted(tables),),
+    ).fetchall()
+    indexes: dict[str, list[tuple[str, ...]]] = {}
+    for index in conn.execute(
+        """
+        SELECT t.relname AS name, array_agg(a.attname::text ORDER BY k.n) AS columns
+        FROM pg_index i
+            JOIN pg_class t ON t.oid = i.indrelid
+            JOIN pg_namespace n ON n.oid = t.relnamespace
+            CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, n)
+            JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = k.attnum
+        WHERE n.nspname = current_schema() AND t.relname = ANY(%s)
+        GROUP BY t.relname, i.indexrelid
+        """,
+        (sorted(tables),),
+    ):
+        indexes.setdefault(index["name"], []).append(tuple(index["columns"]))
+    health = {}
+    for row in rows:
+        missing = [
+            expected
+            for expected in EXPECTED_INDEXES.get(row["name"], ())
+            if not any(cols[: len(expected)] == expected for cols in indexes.get(row["name"], ()))
+        ]
+        health[row["name"]] = TableHealth(
+            name=row["name"],
+            estimated_rows=max(row["estimated_rows"], 0),
+            analyzed=row["analyzed"],
+            modified_fraction=row["modified_fraction"],
+            missing_indexes=missing,
+        )
+    return health
+
+
+def _scan_nodes(node: dict[str, Any]) -> list[dict[str, Any]]:
+    found = [node] if node["Node Type"] in _SCAN_NODES and "Relation Name" in node else []
+    for child in node.get("Plans") or ():
+        found.extend(_scan_nodes(child))
+    return found
+
+
+def _describe(node: dict[str, Any]) -> str:
+    text = f"{node['Node Type']} on {node['Relation Name']}"
+    if "Index Name" in node:
+        text += f" using {node['Index Name']}"
+    return text
+
+
+def judge(
+    tool: str,
+    plan: dict[str, Any],
+    tables: dict[str, TableHealth],
+    large_table_rows: int,
+) -> ToolVerdict:
+    """Pick the plan's worst scan and grade the tool from it and its tables' health."""
+    scans = _scan_nodes(plan)
+    if not scans:
+        return ToolVerdict(tool, "ok", plan["Node Type"], int(plan["Plan Rows"]))
+
+    def table_rows(node: dict[str, Any]) -> int:
+        health = tables.get(node["Relation Name"])
+        return health.estimated_rows if health else 0
+
+    def is_large_seq_scan(node: dict[str, Any]) -> bool:
+        return node["Node Type"] == "Seq Scan" and table_rows(node) >= large_table_rows
+
+    # Worst: a sequential scan of a large table, else whatever reads the biggest table.
+    worst = max(scans, key=lambda n: (is_large_seq_scan(n), table_rows(n)))
+    notes = [
+        f"{name}: {problem}"
+        for name in sorted({n["Relation Name"] for n in scans})
+        if name in tables
+        for problem in tables[name].problems
+    ]
+    verdict = "warn" if notes else "ok"
+    if is_large_seq_scan(worst):
+        verdict = "fail"
+        notes.insert(0, f"sequential scan of ~{table_rows(worst):,} rows")
+    return ToolVerdict(tool, verdict, _describe(worst), int(worst["Plan Rows"]), notes)
+
+
+def _params(conn: psycopg.Connection[Any], tool: PredefinedTool, tz: str) -> dict[str, Any]:
+    bound: dict[str, Any] = {p.name: p.default for p in tool.params}
+    for param in tool.params:
+        if param.name in _ID_QUERIES:
+            bound[param.name] = conn.execute(_ID_QUERIES[param.name]).fetchone()["id"]
+    if tool.uses_tz:
+        bound["tz"] = tz
+    return bound
+
+
+def run_doctor(
+    conninfo: str,
+    tools: list[PredefinedTool],
+    *,
+    report_timezone: str,
+    large_table_rows: int,
+) -> DoctorReport:
+    """Audit `tools` against the database at `conninfo`. Nothing is written or executed."""
+    with psycopg.connect(conninfo, row_factory=dict_row) as conn:
+        conn.read_only = True
+        conn.execute("SET statement_timeout = 10000")
+        plans = {}
+        for tool in tools:
+            params = _params(conn, tool, report_timezone)
+            row = conn.execute(
+                "EXPLAIN (FORMAT JSON) " + tool.render(params), params or None
+            ).fetchone()
+            plans[tool.name] = row["QUERY PLAN"][0]["Plan"]
+        used = {n["Relation Name"] for plan in plans.values() for n in _scan_nodes(plan)}
+        tables = table_health(conn, used | set(EXPECTED_INDEXES))
+        conn.rollback()
+    verdicts = [judge(name, plan, tables, large_table_rows) for name, plan in plans.items()]
+    return DoctorReport(tables=tables, tools=verdicts)
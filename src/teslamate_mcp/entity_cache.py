@@ -0,0 +1,194 @@
+"""Disk-backed cache of query results for finished drives and charging sessions.
+
+A drive's route and a charging session's curve are downsampled from raw
+`positions` / `charges` rows on every call, yet once TeslaMate has set the
+drive's or session's `end_date` those rows never change. Tools that opt in
+with a [cache] table in their sidecar store each finished entity's rows in a
+SQLite file (`ENTITY_CACHE_PATH`), so reopening a route or a curve, even
+after a restart, is a local read instead of a scan.
+
+Entries are keyed by tool, query version (a digest of the tool's SQL, so
+editing a query invalidates its entries), entity id and a digest of the
+other arguments (`max_points`, the report timezone). Only entities whose
+`end_date` was set before the query ran are admitted, so an in-progress
+drive is never frozen half-way. The file is bounded by `ENTITY_CACHE_MAX_BYTES`:
+the least recently read entries are evicted first. The cache never fails a
+call; a SQLite error is logged and the call goes to the database.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Mapping
+from typing import Any
+
+import pydantic_core
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    tool TEXT NOT NULL,
+    version TEXT NOT NULL,
+    entity_id INTEGER NOT NULL,
+    variant TEXT NOT NULL,
+    body BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (tool, version, entity_id, variant)
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+"""
+
+
+def variant_digest(args: Mapping[str, Any]) -> str:
+    """A stable digest of the call's other arguments: entries differ per variant."""
+    return hashlib.sha256(pydantic_core.to_json(dict(sorted(args.items())))).hexdigest()[:16]
+
+
+class EntityCache:
+    """Size-bounded, least-recently-read SQLite store of per-entity result rows."""
+
+    def __init__(self, path: str, *, max_bytes: int) -> None:
+        self.path = path
+        self._max_bytes = max_bytes
+        self._db: sqlite3.Connection | None = None
+        self._bytes = 0
+        # SQLite work runs in worker threads; one connection, one at a time.
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def open(self, versions: Mapping[str, str]) -> None:
+        """Open (or create) the file and drop entries of queries that have changed.
+
+        `versions` maps each caching tool to its current query version.
+        """
+        if self._db is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_SCHEMA)
+        stale = [
+            (tool, version)
+            for tool, version in db.execute("SELECT DISTINCT tool, version FROM entries")
+            if versions.get(tool) != version
+        ]
+        db.executemany("DELETE FROM entries WHERE tool = ? AND version = ?", stale)
+        (self._bytes,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        self._db = db
+        logger.info(
+            "Entity cache %s opened (%d bytes; dropped %d stale query version(s))",
+            self.path,
+            self._bytes,
+            len(stale),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    async def get_many(
+        self, tool: str, version: str, ids: Iterable[int], variant: str
+    ) -> dict[int, list[dict[str, Any]]]:
+        """The cached rows of each of `ids` that has an entry; misses are absent."""
+        try:
+            return await asyncio.to_thread(self._get_many, tool, version, list(ids), variant)
+        except sqlite3.Error as exc:
+            logger.warning("Entity cache read failed: %s", exc)
+            return {}
+
+    def _get_many(
+        self, tool: str, version: str, ids: list[int], variant: str
+    ) -> dict[int, list[dict[str, Any]]]:
+        with self._lock:
+            if self._db is None or not ids:
+                return {}
+            marks = ",".join("?" * len(ids))
+            found = self._db.execute(
+                f"SELECT entity_id, body FROM entries WHERE tool = ? AND version = ? "
+                f"AND variant = ? AND entity_id IN ({marks})",
+                (tool, version, variant, *ids),
+            ).fetchall()
+            if found:
+                self._db.execute(
+                    f"UPDATE entries SET last_used = ? WHERE tool = ? AND version = ? "
+                    f"AND variant = ? AND entity_id IN ({','.join('?' * len(found))})",
+                    (time.time(), tool, version, variant, *(entity_id for entity_id, _ in found)),
+                )
+        return {entity_id: pydantic_core.from_json(body) for entity_id, body in found}
+
+    async def put_many(
+        self, tool: str, version: str, rows_by_id: Mapping[int, list[dict[str, Any]]], variant: str
+    ) -> None:
+        """Store each finished entity's rows, evicting the least recently read to fit."""
+        if not rows_by_id:
+            return
+        try:
+            await asyncio.to_thread(self._put_many, tool, version, rows_by_id, variant)
+        except sqlite3.Error as exc:
+            logger.warning("Entity cache write failed: %s", exc)
+
+    def _put_many(
+        self, tool: str, version: str, rows_by_id: Mapping[int, list[dict[str, Any]]], variant: str
+    ) -> None:
+        bodies = {entity_id: pydantic_core.to_json(rows) for entity_id, rows in rows_by_id.items()}
+        # Whatever does not fit in the whole cache is simply not admitted.
+        needed = 0
+        for entity_id, body in list(bodies.items()):
+            if needed + len(body) > self._max_bytes:
+                del bodies[entity_id]
+            else:
+                needed += len(body)
+        with self._lock:
+            db = self._db
+            if db is None or not bodies:
+                return
+            # IMMEDIATE takes the write lock up front: `http --workers N`
+            # processes share the file, so the size is re-read under it.
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                db.execute(
+                    f"DELETE FROM entries WHERE tool = ? AND version = ? AND variant = ? "
+                    f"AND entity_id IN ({','.join('?' * len(bodies))})",
+                    (tool, version, variant, *bodies),
+                )
+                (total,) = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+                evicted = 0
+                for rowid, size in db.execute(
+                    "SELECT rowid, size FROM entries ORDER BY last_used"
+                ).fetchall():
+                    if total + needed <= self._max_bytes:
+                        break
+                    db.execute("DELETE FROM entries WHERE rowid = ?", (rowid,))
+                    total -= size
+                    evicted += 1
+                now = time.time()
+                db.executemany(
+                    "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (tool, version, entity_id, variant, body, len(body), now)
+                        for entity_id, body in bodies.items()
+                    ],
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._bytes = total + needed
+        if evicted:
+            logger.info("Entity cache evicted %d entr(ies) to stay within its size", evicted)
@@ -0,0 +1,286 @@
+"""Background database health monitor and the circuit breaker it drives.
+
+Before this, `/health` borrowed a pool connection and ran `SELECT 1` on every
+probe, and during an outage each tool call waited out the pool's connection
+timeout (30s by default) before failing — so an assistant retrying a few
+tools stacked up minutes of hanging calls. Now one background task probes the
+database on an interval, `/health` answers from its cached result, and a
+circuit breaker turns "the database is known to be down" into an immediate
+tool error.
+
+The breaker is the usual three-state machine. *Closed*: calls run; N
+consecutive connectivity failures (from probes or tool calls) open it.
+*Open*: calls fail fast with `DatabaseUnavailableError`. After the reset
+timeout it is *half-open*: exactly one trial call (the monitor's next probe or
+whichever tool call comes first) is let through, and its outcome closes the
+circuit or re-opens it for another reset period. Only connectivity failures
+count — a syntax error or a statement timeout proves the database answered.
+
+Waiting too long for a pool connection (`PoolTimeout`) or hitting a caller's
+own deadline (`TimeoutError`) says the server is busy, not that PostgreSQL
+is down, so those are counted as *saturation* and never open the circuit.
+The monitor probes on a dedicated connection of its own, outside the shared
+pool, so a saturated pool cannot fail its probes either.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass
+from typing import Any
+
+import psycopg
+from mcp.server.mcpserver.exceptions import ToolError
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class DatabaseUnavailableError(ToolError):
+    """Raised instead of running a call while the circuit is open.
+
+    A ToolError, so the SDK shows the client this message instead of its
+    generic "Error executing tool" text: the reason is the useful part.
+    """
+
+
+class ProbeTimeoutError(ConnectionError):
+    """The monitor's own connection attempt or probe query got no answer in time."""
+
+
+def is_saturation_error(exc: BaseException) -> bool:
+    """Whether `exc` means "busy": no pool connection in time, or the caller's deadline."""
+    # PoolTimeout is a psycopg OperationalError and TimeoutError an OSError:
+    # check them before either broader class.
+    return isinstance(exc, (PoolTimeout, TimeoutError))
+
+
+def is_connectivity_error(exc: BaseException) -> bool:
+    """Whether `exc` means "could not reach the database", as opposed to a query error."""
+    if isinstance(exc, ProbeTimeoutError):
+        return True
+    if is_saturation_error(exc):
+        return False
+    if isinstance(exc, OSError):
+        return True
+    if isinstance(exc, (psycopg.OperationalError, psycopg.InterfaceError)):
+        # Connection-level failures carry no SQLSTATE (the server never
+        # answered) or class 08 / 57P (connection exception, admin shutdown,
+        # cannot connect now). QueryCanceled (57014) is a timeout, not an outage.
+        sqlstate = getattr(exc, "sqlstate", None)
+        return sqlstate is None or sqlstate.startswith(("08", "57P"))
+    return False
+
+
+def describe_error(exc: BaseException) -> str:
+    # Some psycopg errors and asyncio.timeout's TimeoutError stringify to "",
+    # which has no lines at all; fall back to the class name.
+    detail = next(iter(str(exc).strip().splitlines()), None) or type(exc).__name__
+    return detail[:200]
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker over database connectivity."""
+
+    def __init__(
+        self,
+        *,
+        failure_threshold: int,
+        reset_timeout_s: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_s = reset_timeout_s
+        self._clock = clock
+        self._opened = False
+        self._opened_at = 0.0
+        self._failures = 0
+        self._trial_in_flight = False
+        self.last_error: str | None = None
+        self.saturations = 0
+        self.last_saturation: str | None = None
+
+    @property
+    def state(self) -> str:
+        if not self._opened:
+            return CLOSED
+        if self._clock() - self._opened_at >= self._reset_timeout_s:
+            return HALF_OPEN
+        return OPEN
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Run the enclosed database work under the breaker, or fail fast."""
+        trial = self._admit()
+        try:
+            yield
+        except Exception as exc:
+            if is_saturation_error(exc):
+                self.record_saturation(describe_error(exc))
+                if trial:
+                    self._trial_in_flight = False
+            elif is_connectivity_error(exc):
+                self.record_failure(describe_error(exc))
+            elif isinstance(exc, psycopg.Error):
+                self.record_success()  # an SQL error still proves the server answered
+            elif trial:
+                self._trial_in_flight = False
+            raise
+        except BaseException:
+            # Cancelled mid-call: no verdict, but free the trial slot.
+            if trial:
+                self._trial_in_flight = False
+            raise
+        else:
+            self.record_success()
+
+    def record_success(self) -> None:
+        if self._opened:
+            logger.info("Database reachable again; circuit closed")
+        self._opened = False
+        self._failures = 0
+        self._trial_in_flight = False
+        self.last_error = None
+
+    def record_saturation(self, detail: str) -> None:
+        """A call gave up waiting while the database itself may be fine: no verdict."""
+        self.saturations += 1
+        self.last_saturation = detail
+        logger.warning("Database call timed out waiting (pool saturated?): %s", detail)
+
+    def record_failure(self, detail: str) -> None:
+        self._failures += 1
+        self.last_error = detail
+        if self._opened or self._failures >= self._failure_threshold:
+            if not self._opened:
+                logger.warning(
+                    "Circuit opened after %d consecutive database failures: %s",
+                    self._failures,
+                    detail,
+                )
+            self._opened = True
+            self._opened_at = self._clock()
+        self._trial_in_flight = False
+
+    def _admit(self) -> bool:
+        """Return whether this call is the half-open trial; raise if it may not run."""
+        state = self.state
+        if state == CLOSED:
+            return False
+        if state == HALF_OPEN and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        retry_in = max(0.0, self._reset_timeout_s - (self._clock() - self._opened_at))
+        raise DatabaseUnavailableError(
+            f"The TeslaMate database is unreachable ({self.last_error}); failing fast "
+            f"instead of waiting for a connection. Retry in about {retry_in:.0f}s."
+        )
+
+
+@dataclass(frozen=True)
+class HealthSnapshot:
+    """Result of the most recent probe."""
+
+    ok: bool
+    latency_ms: float | None
+    detail: str | None
+    checked_at: float
+    lag_s: float | None = None
+
+
+class HealthMonitor:
+    """Probe the database every `interval_s` and feed the breaker; /health reads `snapshot`.
+
+    Probes run on one dedicated connection, opened with the pool's conninfo
+    and connection options but not taken from the pool, and reopened after
+    any failure. It is one connection beyond `POOL_MAX_SIZE`.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        *,
+        interval_s: float,
+        probe_timeout_s: float = 3.0,
+        probe_sql: str = "SELECT 1",
+    ) -> None:
+        self.breaker = breaker
+        self.snapshot: HealthSnapshot | None = None
+        self._interval_s = interval_s
+        self._probe_timeout_s = probe_timeout_s
+        # A probe query may return a `lag_s` column (replicas do); it is
+        # recorded on the snapshot.
+        self._probe_sql = probe_sql
+        self._pool: AsyncConnectionPool | None = None
+        self._conn: psycopg.AsyncConnection[Any] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    def start(self, pool: AsyncConnectionPool) -> None:
+        """Begin probing `pool` in the background; called from the server lifespan."""
+        self._pool = pool
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="teslamate-db-health")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self._discard()
+
+    async def probe(self, pool: AsyncConnectionPool | None = None) -> HealthSnapshot | None:
+        """Probe once through the breaker. While the circuit is open, keep the last snapshot."""
+        pool = pool or self._pool
+        if pool is None:
+            return self.snapshot
+        start = time.perf_counter()
+        try:
+            async with self.breaker.guard():
+                row = await self._probe_once(pool)
+        except DatabaseUnavailableError:
+            return self.snapshot
+        except Exception as exc:  # any failure here means "not serving"
+            self.snapshot = HealthSnapshot(False, None, describe_error(exc), time.time())
+        else:
+            latency_ms = round((time.perf_counter() - start) * 1000, 1)
+            lag = row.get("lag_s") if isinstance(row, dict) else None
+            self.snapshot = HealthSnapshot(
+                True, latency_ms, None, time.time(), None if lag is None else float(lag)
+            )
+        return self.snapshot
+
+    async def _probe_once(self, pool: AsyncConnectionPool) -> Any:
+        try:
+            async with asyncio.timeout(self._probe_timeout_s):
+                if self._conn is None or self._conn.closed:
+                    self._conn = await psycopg.AsyncConnection.connect(
+                        pool.conninfo, autocommit=True, **pool.kwargs
+                    )
+                return await (await self._conn.execute(self._probe_sql)).fetchone()
+        except TimeoutError as exc:
+            await self._discard()
+            # Our own bound, not a caller's: this one does mean unreachable.
+            raise ProbeTimeoutError(f"no answer within {self._probe_timeout_s:g}s") from exc
+        except Exception:
+            await self._discard()
+            raise
+
+    async def _discard(self) -> None:
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            with suppress(Exception):
+                await conn.close()
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe()
+            await asyncio.sleep(self._interval_s)
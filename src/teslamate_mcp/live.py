@@ -0,0 +1,206 @@
+"""Shared change-feed poller behind the live car-state resources.
+
+Clients that wanted live status polled `get_current_car_status`, each poll
+running the LATERAL latest-position lookup, so N clients meant N pollers.
+Now one background task watches cheap high-water marks (the newest
+`positions`, `charges`, `charging_processes` and `addresses` ids, how many
+charging sessions are still open, and the row versions of the small `cars`
+and `geofences` tables) and only re-runs the status and active-charging
+queries when a mark moves. Edits to existing rows of the other tables, such
+as a corrected `positions` sample or a renamed address, are not watched;
+they show up with the next mark that moves. The rows are then diffed per resource, and a
+`ResourceUpdated` event is published for each URI whose contents changed:
+
+    teslamate://cars/{name}/status
+    teslamate://charging/active
+
+Clients subscribe with `subscriptions/listen`. The poller only runs while at
+least one listen stream is open, and reads are served from its snapshot
+(refreshed on demand when older than one interval), so database load is
+constant in the number of subscribers and readers.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections.abc import Callable
+from contextlib import suppress
+from typing import Any
+from urllib.parse import quote
+
+from mcp.server.subscriptions import InMemorySubscriptionBus, ResourceUpdated, ServerEvent
+from psycopg_pool import AsyncConnectionPool
+
+from .db import fetch_all
+from .health import CircuitBreaker, describe_error
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_CHARGING_URI = "teslamate://charging/active"
+
+# Each is a backward index scan on a primary key, or a scan of a small table
+# (charging_processes, cars, geofences): far cheaper than the status query
+# itself. A row's xmin changes with every update, so the digests move when a
+# car or geofence is edited, added or removed.
+_HIGH_WATER_SQL = """SELECT
+    (SELECT max(id) FROM positions) AS positions,
+    (SELECT max(id) FROM charges) AS charges,
+    (SELECT max(id) FROM charging_processes) AS charging_processes,
+    (SELECT count(*) FROM charging_processes WHERE end_date IS NULL) AS open_charging_processes,
+    (SELECT max(id) FROM addresses) AS addresses,
+    (SELECT md5(string_agg(id || ':' || xmin::text, ',' ORDER BY id)) FROM cars) AS cars,
+    (SELECT md5(string_agg(id || ':' || xmin::text, ',' ORDER BY id)) FROM geofences)
+        AS geofences"""
+
+_ACTIVE_CHARGING_SQL = """SELECT c.name AS car_name,
+    cp.id AS charging_process_id,
+    cp.start_date,
+    cp.start_battery_level,
+    ch.battery_level,
+    ch.charger_power,
+    ch.charger_voltage,
+    ch.charger_actual_current,
+    ch.rated_battery_range_km,
+    COALESCE(g.name, a.display_name) AS location,
+    ch.date AS last_update
+FROM charging_processes cp
+    JOIN cars c ON c.id = cp.car_id
+    LEFT JOIN LATERAL (
+        SELECT *
+        FROM charges ch
+        WHERE ch.charging_process_id = cp.id
+        ORDER BY ch.date DESC
+        LIMIT 1
+    ) ch ON true
+    LEFT JOIN geofences g ON g.id = cp.geofence_id
+    LEFT JOIN addresses a ON a.id = cp.address_id
+WHERE cp.end_date IS NULL
+ORDER BY cp.start_date"""
+
+
+def car_status_uri(name: str) -> str:
+    return f"teslamate://cars/{quote(name, safe='')}/status"
+
+
+class ListenerCountingBus(InMemorySubscriptionBus):
+    """The in-process subscription bus, plus how many listen streams are open."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.listeners = 0
+
+    def subscribe(self, listener: Callable[[ServerEvent], None]) -> Callable[[], None]:
+        unsubscribe = super().subscribe(listener)
+        self.listeners += 1
+        done = False
+
+        def counted_unsubscribe() -> None:
+            nonlocal done
+            if not done:
+                done = True
+                self.listeners -= 1
+            unsubscribe()
+
+        return counted_unsubscribe
+
+
+class ChangeFeed:
+    """Poll high-water marks every `interval_s`; diff and publish on change."""
+
+    def __init__(
+        self,
+        bus: ListenerCountingBus,
+        breaker: CircuitBreaker,
+        *,
+        status_sql: str,
+        interval_s: float,
+    ) -> None:
+        self._bus = bus
+        self._breaker = breaker
+        self._status_sql = status_sql
+        self._interval_s = interval_s
+        self._pool: AsyncConnectionPool | None = None
+        self._task: asyncio.Task[None] | None = None
+        # One poll at a time: concurrent readers of a stale snapshot share it.
+        self._lock = asyncio.Lock()
+        self._marks: dict[str, Any] | None = None
+        self._statuses: dict[str, dict[str, Any]] = {}
+        self._charging: list[dict[str, Any]] = []
+        self._checked_at = float("-inf")
+
+    def start(self, pool: AsyncConnectionPool) -> None:
+        """Begin polling `pool` in the background; called from the server lifespan."""
+        self._pool = pool
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="teslamate-change-feed")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def car_status(self, name: str) -> dict[str, Any] | None:
+        """The latest status row of the car called `name` (exact, else case-insensitive)."""
+        await self._fresh()
+        if name in self._statuses:
+            return self._statuses[name]
+        folded = name.casefold()
+        return next((r for n, r in self._statuses.items() if n.casefold() == folded), None)
+
+    async def active_charging(self) -> list[dict[str, Any]]:
+        """One row per charging session that has not ended, with its latest sample."""
+        await self._fresh()
+        return self._charging
+
+    async def _fresh(self) -> None:
+        if time.monotonic() - self._checked_at >= self._interval_s:
+            await self.poll()
+
+    async def poll(self) -> set[str]:
+        """Check the marks once; return (and publish) the URIs whose contents changed."""
+        if self._pool is None:
+            raise RuntimeError("ChangeFeed.start() has not been called")
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self._interval_s / 2:
+                return set()  # a concurrent caller just polled
+            async with self._breaker.guard():
+                (marks,) = await fetch_all(self._pool, _HIGH_WATER_SQL)
+                changed: set[str] = set()
+                if marks != self._marks:
+                    changed = await self._reload(first=self._marks is None)
+            self._marks = marks
+            self._checked_at = time.monotonic()
+        for uri in sorted(changed):
+            await self._bus.publish(ResourceUpdated(uri=uri))
+        if changed:
+            logger.info("Change feed published %d update(s)", len(changed))
+        return changed
+
+    async def _reload(self, *, first: bool) -> set[str]:
+        assert self._pool is not None
+        rows = await fetch_all(self._pool, self._status_sql, {"car_name": None})
+        statuses = {row["car_name"]: row for row in rows}
+        charging = await fetch_all(self._pool, _ACTIVE_CHARGING_SQL)
+        changed = {
+            car_status_uri(name)
+            for name in statuses.keys() | self._statuses.keys()
+            if statuses.get(name) != self._statuses.get(name)
+        }
+        if charging != self._charging:
+            changed.add(ACTIVE_CHARGING_URI)
+        self._statuses, self._charging = statuses, charging
+        # The first load has nothing to differ from.
+        return set() if first else changed
+
+    async def _run(self) -> None:
+        while True:
+            if self._bus.listeners:
+                try:
+                    await self.poll()
+                except Exception as exc:  # keep polling; the breaker and /health report outages
+                    logger.warning("Change feed poll failed: %s", describe_error(exc))
+            await asyncio.sleep(self._interval_s)
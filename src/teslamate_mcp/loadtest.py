@@ -0,0 +1,296 @@
+"""Load-test harness behind `teslamate-mcp loadtest`.
+
+N simulated assistant sessions replay weighted *scenarios* — ordered lists of
+tool calls — against a server for a fixed duration, and the run is reduced to
+a JSON report: throughput, per-tool latency percentiles and error rates, and
+(when the pool is in-process) how saturated the connection pool got. By
+default the scenarios are the workflows the bundled prompts already describe:
+each prompt becomes one scenario calling, in order, the read-only tools it
+names that need no arguments.
+
+A mix file replaces the defaults:
+
+    [{"name": "drives", "weight": 3,
+      "calls": [{"tool": "search_drives", "arguments": {"limit": 20}}]}]
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections.abc import AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, AsyncExitStack, asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from mcp import Client
+from mcp.client.streamable_http import create_mcp_http_client, streamable_http_client
+from mcp.types import Tool
+from psycopg_pool import AsyncConnectionPool
+
+from .tools.registry import ONE_OF_META_KEY
+
+# Prompts reference tools as backticked names (tests/test_prompts.py checks
+# that every reference resolves).
+_TOOL_REF_RE = re.compile(r"`([a-z][a-z0-9_]+)`")
+
+_POOL_SAMPLE_INTERVAL_S = 0.05
+
+
+@dataclass(frozen=True)
+class Call:
+    tool: str
+    arguments: dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    calls: tuple[Call, ...]
+    weight: float = 1.0
+
+
+def scenarios_from_prompts(prompt_texts: dict[str, str], tools: list[Tool]) -> list[Scenario]:
+    """One scenario per prompt: the read-only, argument-free tools it names, in order."""
+    callable_without_args = {
+        tool.name
+        for tool in tools
+        if not tool.input_schema.get("required")
+        and ONE_OF_META_KEY not in (tool.meta or {})
+        and tool.annotations is not None
+        and tool.annotations.read_only_hint
+    }
+    scenarios = []
+    for name, text in prompt_texts.items():
+        steps = dict.fromkeys(t for t in _TOOL_REF_RE.findall(text) if t in callable_without_args)
+        if steps:
+            scenarios.append(Scenario(name, tuple(Call(tool) for tool in steps)))
+    return scenarios
+
+
+async def default_scenarios(client: Client) -> list[Scenario]:
+    """Render every prompt that takes no required arguments and derive its scenario."""
+    tools = (await client.list_tools()).tools
+    texts = {}
+    for prompt in (await client.list_prompts()).prompts:
+        if any(arg.required for arg in prompt.arguments or ()):
+            continue
+        result = await client.get_prompt(prompt.name)
+        texts[prompt.name] = " ".join(
+            getattr(message.content, "text", "") for message in result.messages
+        )
+    return scenarios_from_prompts(texts, tools)
+
+
+def load_mix(path: Path) -> list[Scenario]:
+    """Parse a mix file (see the module docstring). Raises ValueError on a malformed one."""
+    try:
+        entries = json.loads(path.read_text(encoding="utf-8"))
+        scenarios = [
+            Scenario(
+                name=str(entry.get("name", f"scenario_{i}")),
+                weight=float(entry.get("weight", 1.0)),
+                calls=tuple(
+                    Call(str(call["tool"]), dict(call.get("arguments") or {}))
+                    for call in entry["calls"]
+                ),
+            )
+            for i, entry in enumerate(entries)
+        ]
+    except (json.JSONDecodeError, AttributeError, KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Malformed mix file {path}: {exc}") from exc
+    if not scenarios or any(not s.calls or s.weight <= 0 for s in scenarios):
+        raise ValueError(
+            f"Mix file {path} needs at least one scenario, each with calls and a positive weight"
+        )
+    return scenarios
+
+
+@asynccontextmanager
+async def connect_http(url: str, auth_token: str | None = None) -> AsyncIterator[Client]:
+    """One streamable-HTTP client session, with a bearer token when given."""
+    headers = {"Authorization": f"Bearer {auth_token}"} if auth_token else None
+    # The SDK builds the HTTP client, with its own default timeouts, so the
+    # HTTP library stays the SDK's dependency rather than ours.
+    async with (
+        create_mcp_http_client(headers=headers) as http,
+        Client(streamable_http_client(url, http_client=http)) as client,
+    ):
+        yield client
+
+
+@dataclass
+class _Sample:
+    tool: str
+    latency_s: float
+    error: bool
+
+
+class _PoolSampler:
+    """Polls `get_stats()` during the run; counters are reported as deltas."""
+
+    _COUNTERS = ("requests_num", "requests_queued", "requests_wait_ms", "requests_errors")
+
+    def __init__(self, pool: AsyncConnectionPool) -> None:
+        self._pool = pool
+        self._start = self._counters()
+        self._samples = 0
+        self._exhausted = 0
+        self._peak_busy = 0
+        self._peak_waiting = 0
+
+    def _counters(self) -> dict[str, int]:
+        stats = self._pool.get_stats()
+        return {name: stats.get(name, 0) for name in self._COUNTERS}
+
+    async def run(self) -> None:
+        while True:
+            stats = self._pool.get_stats()
+            busy = stats["pool_size"] - stats["pool_available"]
+            self._samples += 1
+            self._exhausted += busy >= stats["pool_max"]
+            self._peak_busy = max(self._peak_busy, busy)
+            self._peak_waiting = max(self._peak_waiting, stats.get("requests_waiting", 0))
+            await asyncio.sleep(_POOL_SAMPLE_INTERVAL_S)
+
+    def report(self) -> dict[str, Any]:
+        end = self._counters()
+        deltas = {name: end[name] - self._start[name] for name in self._COUNTERS}
+        return {
+            "max_size": self._pool.get_stats()["pool_max"],
+            "peak_busy": self._peak_busy,
+            "peak_waiting": self._peak_waiting,
+            # Share of samples with every connection checked out.
+            "saturated_fraction": round(self._exhausted / self._samples, 3)
+            if self._samples
+            else 0.0,
+            "requests": deltas["requests_num"],
+            "requests_queued": deltas["requests_queued"],
+            "wait_ms_total": deltas["requests_wait_ms"],
+            "errors": deltas["requests_errors"],
+        }
+
+
+def _percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list, in milliseconds."""
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return round(ordered[rank] * 1000, 1)
+
+
+def summarize(samples: list[_Sample], elapsed_s: float) -> dict[str, Any]:
+    by_tool: dict[str, list[_Sample]] = {}
+    for sample in samples:
+        by_tool.setdefault(sample.tool, []).append(sample)
+    tools = {}
+    for name in sorted(by_tool):
+        entries = by_tool[name]
+        ordered = sorted(s.latency_s for s in entries)
+        errors = sum(s.error for s in entries)
+        tools[name] = {
+            "calls": len(entries),
+            "errors": errors,
+            "error_rate": round(errors / len(entries), 4),
+            "p50_ms": _percentile(ordered, 50),
+            "p95_ms": _percentile(ordered, 95),
+            "p99_ms": _percentile(ordered, 99),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+    errors = sum(s.error for s in samples)
+    return {
+        "elapsed_s": round(elapsed_s, 2),
+        "calls": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "calls_per_s": round(len(samples) / elapsed_s, 1) if elapsed_s else 0.0,
+        "tools": tools,
+    }
+
+
+async def _simulate(
+    client: Client,
+    scenarios: list[Scenario],
+    rng: random.Random,
+    stop_at: float,
+    samples: list[_Sample],
+) -> None:
+    weights = [s.weight for s in scenarios]
+    while time.monotonic() < stop_at:
+        scenario = rng.choices(scenarios, weights)[0]
+        for call in scenario.calls:
+            if time.monotonic() >= stop_at:
+                return
+            start = time.perf_counter()
+            try:
+                error = (await client.call_tool(call.tool, call.arguments)).is_error
+            except Exception:  # transport failures count against the tool too
+                error = True
+            samples.append(_Sample(call.tool, time.perf_counter() - start, error))
+
+
+async def run_loadtest(
+    connect: Callable[[], AbstractAsyncContextManager[Client]],
+    *,
+    clients: int,
+    duration_s: float,
+    scenarios: list[Scenario] | None = None,
+    seed: int = 0,
+    share_client: bool = False,
+    pool: Callable[[], AsyncConnectionPool] | None = None,
+) -> dict[str, Any]:
+    """Run `clients` simulated sessions for `duration_s` and return the report.
+
+    `connect()` opens one MCP client. With `share_client`, every simulated
+    session multiplexes over a single connection — required for the in-memory
+    transport, where each connection enters the server lifespan (and so owns
+    the pool) on its own. `pool`, when given, returns the server's pool once
+    connected (the lifespan may rebuild it), which is sampled for saturation.
+    """
+    async with AsyncExitStack() as stack:
+        first = await stack.enter_async_context(connect())
+        if scenarios is None:
+            scenarios = await default_scenarios(first)
+        if not scenarios:
+            raise ValueError("No scenarios to run: no prompt names an argument-free read tool")
+        sessions = [first]
+        while not share_client and len(sessions) < clients:
+            sessions.append(await stack.enter_async_context(connect()))
+
+        sampler = _PoolSampler(pool()) if pool is not None else None
+        sampling = asyncio.create_task(sampler.run()) if sampler else None
+        samples: list[_Sample] = []
+        start = time.monotonic()
+        try:
+            await asyncio.gather(
+                *(
+                    _simulate(
+                        sessions[i % len(sessions)],
+                        scenarios,
+                        random.Random(seed + i),
+                        start + duration_s,
+                        samples,
+                    )
+                    for i in range(clients)
+                )
+            )
+        finally:
+            if sampling is not None:
+                sampling.cancel()
+        elapsed = time.monotonic() - start
+        pool_report = sampler.report() if sampler else None
+
+    return {
+        "clients": clients,
+        "duration_s": duration_s,
+        "seed": seed,
+        "scenarios": [
+            {"name": s.name, "weight": s.weight, "tools": [c.tool for c in s.calls]}
+            for s in scenarios
+        ],
+        **summarize(samples, elapsed),
+        "pool": pool_report,
+    }
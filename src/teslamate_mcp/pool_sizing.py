@@ -0,0 +1,215 @@
+"""Pool statistics reporting and adaptive pool sizing.
+
+With fixed sizing the pool had to be provisioned for the peak, on a database
+TeslaMate and Grafana also connect to. With `POOL_ADAPTIVE=true`,
+`POOL_MIN_SIZE` and `POOL_MAX_SIZE` become bounds instead: the pool starts
+capped at the minimum and a background task raises the cap only while
+requests actually wait for a connection, then lowers it again once the extra
+connections have gone unused for a while.
+
+Every second the task reads the pool's counters. The cap grows by half
+(at least one connection) when the requests that queued since the last
+sample waited `POOL_TARGET_WAIT_MS` on average, or when requests have been
+queued at two samples in a row. Every `POOL_STATS_INTERVAL_S` it closes a
+window: the window's statistics are logged and kept for /health, and after
+three consecutive windows in which nothing queued and at most half the cap
+was ever in use, the cap shrinks by one. Idle connections above the cap are
+closed by the pool itself after `POOL_MAX_IDLE_S`.
+
+Without adaptive sizing the same task only reports the statistics, so the
+bounds can be tuned from real traffic.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from contextlib import suppress
+from dataclasses import dataclass
+from typing import Any
+
+from psycopg_pool import AsyncConnectionPool
+
+from .config import Settings
+
+logger = logging.getLogger(__name__)
+
+_SAMPLE_S = 1.0
+# Quiet windows in a row before the cap is lowered by one connection.
+_SHRINK_AFTER_WINDOWS = 3
+
+
+@dataclass(frozen=True)
+class PoolWindow:
+    """Pool statistics over one reporting window."""
+
+    min_size: int
+    max_size: int
+    size: int
+    peak_in_use: int
+    requests: int
+    queued: int
+    mean_wait_ms: float | None  # over the requests that queued
+    errors: int
+    connections_lost: int
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "min": self.min_size,
+            "max": self.max_size,
+            "size": self.size,
+            "peak_in_use": self.peak_in_use,
+            "requests": self.requests,
+            "queued": self.queued,
+            "mean_wait_ms": self.mean_wait_ms,
+            "errors": self.errors,
+            "connections_lost": self.connections_lost,
+        }
+
+
+class PoolSizer:
+    """Sample a pool every second; report per window and, if adaptive, resize it."""
+
+    def __init__(
+        self,
+        *,
+        floor: int,
+        ceiling: int,
+        adaptive: bool,
+        target_wait_ms: int,
+        window_s: float,
+        name: str = "primary",
+    ) -> None:
+        self._floor = floor
+        self._ceiling = max(floor, ceiling)
+        self._adaptive = adaptive
+        self._target_wait_ms = target_wait_ms
+        self._samples_per_window = max(1, round(window_s / _SAMPLE_S))
+        self._name = name
+        self._pool: AsyncConnectionPool | None = None
+        self._task: asyncio.Task[None] | None = None
+        self.last_window: PoolWindow | None = None
+        self._reset_window()
+        self._waiting_before = False
+        self._quiet_windows = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings, *, name: str = "primary") -> PoolSizer:
+        return cls(
+            floor=settings.pool_min_size,
+            ceiling=settings.pool_max_size,
+            adaptive=settings.pool_adaptive,
+            target_wait_ms=settings.pool_target_wait_ms,
+            window_s=settings.pool_stats_interval_s,
+            name=name,
+        )
+
+    def _reset_window(self) -> None:
+        self._samples = 0
+        self._peak_in_use = 0
+        self._totals = {
+            "requests_num": 0,
+            "requests_queued": 0,
+            "requests_wait_ms": 0,
+            "requests_errors": 0,
+            "connections_lost": 0,
+        }
+
+    def start(self, pool: AsyncConnectionPool) -> None:
+        """Begin sampling `pool` in the background; called from the server lifespan."""
+        self._pool = pool
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"teslamate-pool-{self._name}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def sample(self) -> None:
+        """Read (and reset) the pool's counters once; grow the cap if requests wait."""
+        assert self._pool is not None
+        stats = self._pool.pop_stats()
+        for key in self._totals:
+            self._totals[key] += stats.get(key, 0)
+        in_use = stats["pool_size"] - stats["pool_available"]
+        self._peak_in_use = max(self._peak_in_use, in_use)
+        self._samples += 1
+
+        waiting = stats.get("requests_waiting", 0) > 0
+        queued = stats.get("requests_queued", 0)
+        slow = bool(queued) and stats.get("requests_wait_ms", 0) / queued >= self._target_wait_ms
+        if self._adaptive and (slow or (waiting and self._waiting_before)):
+            await self._resize(stats["pool_max"] + max(1, stats["pool_max"] // 2), "requests wait")
+        self._waiting_before = waiting
+
+        if self._samples >= self._samples_per_window:
+            await self._close_window(stats)
+
+    async def _close_window(self, stats: dict[str, int]) -> None:
+        totals = self._totals
+        queued = totals["requests_queued"]
+        window = PoolWindow(
+            min_size=stats["pool_min"],
+            max_size=stats["pool_max"],
+            size=stats["pool_size"],
+            peak_in_use=self._peak_in_use,
+            requests=totals["requests_num"],
+            queued=queued,
+            mean_wait_ms=round(totals["requests_wait_ms"] / queued, 1) if queued else None,
+            errors=totals["requests_errors"],
+            connections_lost=totals["connections_lost"],
+        )
+        self.last_window = window
+        self._reset_window()
+        # Routine windows go to DEBUG; contention, errors and lost connections
+        # are worth seeing at the default level.
+        level = (
+            logging.INFO
+            if window.queued or window.errors or window.connections_lost
+            else logging.DEBUG
+        )
+        logger.log(
+            level,
+            "Pool %s: %d request(s), %d queued (mean wait %s ms), peak %d/%d in use, "
+            "%d open, %d error(s), %d connection(s) lost",
+            self._name,
+            window.requests,
+            window.queued,
+            window.mean_wait_ms if window.mean_wait_ms is not None else "-",
+            window.peak_in_use,
+            window.max_size,
+            window.size,
+            window.errors,
+            window.connections_lost,
+        )
+        if not self._adaptive:
+            return
+        if window.queued or window.peak_in_use * 2 > window.max_size:
+            self._quiet_windows = 0
+            return
+        self._quiet_windows += 1
+        if self._quiet_windows >= _SHRINK_AFTER_WINDOWS:
+            self._quiet_windows = 0
+            await self._resize(window.max_size - 1, "connections unused")
+
+    async def _resize(self, max_size: int, reason: str) -> None:
+        assert self._pool is not None
+        max_size = min(self._ceiling, max(self._floor, max_size))
+        current = self._pool.get_stats()["pool_max"]
+        if max_size == current:
+            return
+        await self._pool.resize(self._floor, max_size)
+        logger.info("Pool %s cap %d -> %d (%s)", self._name, current, max_size, reason)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(_SAMPLE_S)
+            if self._pool is None or self._pool.closed:
+                continue
+            try:
+                await self.sample()
+            except Exception:  # keep sampling; a failed resize is retried next time
+                logger.exception("Pool %s sampling failed", self._name)
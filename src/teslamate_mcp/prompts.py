@@ -23,7 +23,10 @@ def register_prompts(mcp: MCPServer) -> None:
             "Analyze the battery health of this Tesla:\n"
             "1. Call `get_battery_health_summary` for the current state of health.\n"
             "2. Call `get_battery_degradation_over_time` to see the historical "
-            "capacity curve.\n"
+            "capacity curve, together with `get_soc_hygiene` and "
+            "`get_daily_battery_usage_patterns` for charging habits (call them "
+            "in parallel: the server can answer them from one read of the "
+            "position history).\n"
             "3. Call `get_basic_car_information` to know the model, original "
             "rated range, and total odometer.\n"
             "4. Estimate expected degradation for this model/age and flag any "
@@ -17,6 +17,8 @@ WHERE cp.end_battery_level - cp.start_battery_level >= %(min_soc_delta)s::int
     AND cp.charge_energy_added > 0
     AND cp.start_date >= CURRENT_DATE - make_interval(days => %(days)s::int)
     AND (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
+    /*[if memo_skip]*/AND TO_CHAR(DATE_TRUNC('month', (cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text),
+        'YYYY-MM') <> ALL(%(memo_skip)s::text[])/*[end]*/
 GROUP BY TO_CHAR(DATE_TRUNC('month', (cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s),
         'YYYY-MM'),
     c.name
@@ -16,10 +16,13 @@ SELECT CASE %(group_by)s::text
 FROM charging_processes cp
     JOIN cars c ON cp.car_id = c.id
     LEFT JOIN addresses a ON cp.address_id = a.id
-WHERE (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
-    AND (%(start_date)s::date IS NULL
-        OR ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date >= %(start_date)s::date)
-    AND (%(end_date)s::date IS NULL
-        OR ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date <= %(end_date)s::date)
+WHERE TRUE
+    /*[if car_name]*/AND c.name ILIKE '%%' || %(car_name)s::text || '%%'/*[end]*/
+    /*[if start_date]*/AND ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date
+        >= %(start_date)s::date/*[end]*/
+    /*[if end_date]*/AND ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date
+        <= %(end_date)s::date/*[end]*/
+    /*[if memo_skip]*/AND TO_CHAR(DATE_TRUNC('month', (cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text),
+        'YYYY-MM') <> ALL(%(memo_skip)s::text[])/*[end]*/
 GROUP BY 1
 ORDER BY 1;
@@ -1,16 +1,20 @@
 WITH curve AS (
-    SELECT date,
+    SELECT charging_process_id,
+        date,
         battery_level,
         charger_power,
         charger_voltage,
         charger_actual_current,
         rated_battery_range_km,
         outside_temp,
-        NTILE(%(max_points)s::int) OVER (ORDER BY date) AS bucket
+        NTILE(%(max_points)s::int) OVER (PARTITION BY charging_process_id ORDER BY date) AS bucket
     FROM charges
-    WHERE charging_process_id = %(charging_process_id)s::int
+    WHERE charging_process_id = ANY(
+        COALESCE(%(charging_process_ids)s::int[], ARRAY[%(charging_process_id)s::int])
+    )
 )
-SELECT MIN(date) AS bucket_start,
+SELECT charging_process_id,
+    MIN(date) AS bucket_start,
     MIN(battery_level) AS battery_level_start,
     MAX(battery_level) AS battery_level_end,
     ROUND(AVG(charger_power)::numeric, 1) AS avg_power_kw,
@@ -20,5 +24,5 @@ SELECT MIN(date) AS bucket_start,
     ROUND(AVG(rated_battery_range_km)::numeric, 1) AS avg_rated_range_km,
     ROUND(AVG(outside_temp)::numeric, 1) AS avg_outside_temp
 FROM curve
-GROUP BY bucket
-ORDER BY bucket_start;
+GROUP BY charging_process_id, bucket
+ORDER BY charging_process_id, bucket_start;
@@ -27,4 +27,5 @@ FROM drives d
     JOIN cars c ON d.car_id = c.id
     LEFT JOIN addresses start_addr ON d.start_address_id = start_addr.id
     LEFT JOIN addresses end_addr ON d.end_address_id = end_addr.id
-WHERE d.id = %(drive_id)s::int;
+WHERE d.id = ANY(COALESCE(%(drive_ids)s::int[], ARRAY[%(drive_id)s::int]))
+ORDER BY d.start_date;
@@ -1,20 +1,22 @@
 WITH route AS (
-    SELECT p.date,
+    SELECT d.id AS drive_id,
+        p.date,
         p.latitude,
         p.longitude,
         p.battery_level,
         p.speed,
         p.power,
         p.odometer,
-        NTILE(%(max_points)s::int) OVER (ORDER BY p.date) AS bucket
+        NTILE(%(max_points)s::int) OVER (PARTITION BY d.id ORDER BY p.date) AS bucket
     FROM drives d
         JOIN positions p ON p.car_id = d.car_id
             AND p.date BETWEEN d.start_date AND d.end_date
-    WHERE d.id = %(drive_id)s::int
+    WHERE d.id = ANY(COALESCE(%(drive_ids)s::int[], ARRAY[%(drive_id)s::int]))
         AND p.latitude IS NOT NULL
         AND p.longitude IS NOT NULL
 )
-SELECT bucket AS point_order,
+SELECT drive_id,
+    bucket AS point_order,
     MIN(date) AS ts,
     ROUND(AVG(latitude)::numeric, 6) AS latitude,
     ROUND(AVG(longitude)::numeric, 6) AS longitude,
@@ -23,5 +25,5 @@ SELECT bucket AS point_order,
     ROUND(AVG(power)::numeric, 1) AS avg_power_kw,
     MAX(odometer) AS odometer_km
 FROM route
-GROUP BY bucket
-ORDER BY point_order;
+GROUP BY drive_id, bucket
+ORDER BY drive_id, point_order;
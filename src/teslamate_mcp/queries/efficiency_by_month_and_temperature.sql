@@ -8,6 +8,8 @@ WITH monthly_stats AS (
         JOIN cars c ON d.car_id = c.id
     WHERE d.start_date >= CURRENT_DATE - make_interval(days => %(days)s::int)
         AND (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
+        /*[if memo_skip]*/AND TO_CHAR(DATE_TRUNC('month', (d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text),
+            'YYYY-MM') <> ALL(%(memo_skip)s::text[])/*[end]*/
     GROUP BY c.id,
         c.name,
         DATE_TRUNC('month', (d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)
@@ -10,8 +10,9 @@ FROM drives d
     JOIN cars c ON d.car_id = c.id
     LEFT JOIN addresses start_addr ON d.start_address_id = start_addr.id
     LEFT JOIN addresses end_addr ON d.end_address_id = end_addr.id
-WHERE (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
-    AND (%(days)s::int IS NULL OR d.start_date >= CURRENT_DATE - make_interval(days => %(days)s))
-    AND (%(min_distance_km)s::float8 IS NULL OR d.distance >= %(min_distance_km)s)
+WHERE TRUE
+    /*[if car_name]*/AND c.name ILIKE '%%' || %(car_name)s::text || '%%'/*[end]*/
+    /*[if days]*/AND d.start_date >= CURRENT_DATE - make_interval(days => %(days)s::int)/*[end]*/
+    /*[if min_distance_km]*/AND d.distance >= %(min_distance_km)s::float8/*[end]*/
 ORDER BY d.distance DESC
 LIMIT %(limit)s::int;
\ No newline at end of file
@@ -10,6 +10,8 @@ FROM drives d
     JOIN cars c ON d.car_id = c.id
 WHERE (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
     AND (%(days)s::int IS NULL OR d.start_date >= CURRENT_DATE - make_interval(days => %(days)s))
+    /*[if memo_skip]*/AND TO_CHAR(DATE_TRUNC('month', (d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text),
+        'YYYY-MM') <> ALL(%(memo_skip)s::text[])/*[end]*/
 GROUP BY c.id,
     c.name,
     DATE_TRUNC('month', (d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)
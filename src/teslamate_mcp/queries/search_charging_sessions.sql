@@ -10,14 +10,16 @@ SELECT cp.id AS charging_process_id,
 FROM charging_processes cp
     JOIN cars c ON cp.car_id = c.id
     LEFT JOIN addresses a ON cp.address_id = a.id
-WHERE (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
-    AND (%(start_date)s::date IS NULL
-        OR ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date >= %(start_date)s::date)
-    AND (%(end_date)s::date IS NULL
-        OR ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date <= %(end_date)s::date)
-    AND (%(location)s::text IS NULL
-        OR a.display_name ILIKE '%%' || %(location)s || '%%'
-        OR a.city ILIKE '%%' || %(location)s || '%%')
-    AND (%(min_energy_kwh)s::float8 IS NULL OR cp.charge_energy_added >= %(min_energy_kwh)s)
-ORDER BY cp.start_date DESC
+WHERE TRUE
+    /*[if car_name]*/AND c.name ILIKE '%%' || %(car_name)s::text || '%%'/*[end]*/
+    /*[if start_date]*/AND ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date
+        >= %(start_date)s::date/*[end]*/
+    /*[if end_date]*/AND ((cp.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date
+        <= %(end_date)s::date/*[end]*/
+    /*[if location]*/AND (a.display_name ILIKE '%%' || %(location)s::text || '%%'
+        OR a.city ILIKE '%%' || %(location)s::text || '%%')/*[end]*/
+    /*[if address_ids]*/AND cp.address_id = ANY(%(address_ids)s::bigint[])/*[end]*/
+    /*[if min_energy_kwh]*/AND cp.charge_energy_added >= %(min_energy_kwh)s::float8/*[end]*/
+    /*[keyset]*/
+ORDER BY /*[keyset_order]*/
 LIMIT %(limit)s::int;
@@ -15,21 +15,21 @@ FROM drives d
     JOIN cars c ON d.car_id = c.id
     LEFT JOIN addresses start_addr ON d.start_address_id = start_addr.id
     LEFT JOIN addresses end_addr ON d.end_address_id = end_addr.id
-WHERE (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
-    AND (%(start_date)s::date IS NULL
-        OR ((d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date >= %(start_date)s::date)
-    AND (%(end_date)s::date IS NULL
-        OR ((d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date <= %(end_date)s::date)
-    AND (%(min_distance_km)s::float8 IS NULL OR d.distance >= %(min_distance_km)s)
-    AND (%(max_distance_km)s::float8 IS NULL OR d.distance <= %(max_distance_km)s)
-    AND (%(location)s::text IS NULL
-        OR start_addr.display_name ILIKE '%%' || %(location)s || '%%'
-        OR start_addr.city ILIKE '%%' || %(location)s || '%%'
-        OR end_addr.display_name ILIKE '%%' || %(location)s || '%%'
-        OR end_addr.city ILIKE '%%' || %(location)s || '%%')
-ORDER BY CASE
-        WHEN %(order_by)s::text = 'distance' THEN d.distance
-        WHEN %(order_by)s::text = 'duration' THEN d.duration_min
-    END DESC NULLS LAST,
-    d.start_date DESC
+WHERE TRUE
+    /*[if car_name]*/AND c.name ILIKE '%%' || %(car_name)s::text || '%%'/*[end]*/
+    /*[if start_date]*/AND ((d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date
+        >= %(start_date)s::date/*[end]*/
+    /*[if end_date]*/AND ((d.start_date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)::date
+        <= %(end_date)s::date/*[end]*/
+    /*[if min_distance_km]*/AND d.distance >= %(min_distance_km)s::float8/*[end]*/
+    /*[if max_distance_km]*/AND d.distance <= %(max_distance_km)s::float8/*[end]*/
+    /*[if location]*/AND (start_addr.display_name ILIKE '%%' || %(location)s::text || '%%'
+        OR start_addr.city ILIKE '%%' || %(location)s::text || '%%'
+        OR end_addr.display_name ILIKE '%%' || %(location)s::text || '%%'
+        OR end_addr.city ILIKE '%%' || %(location)s::text || '%%')/*[end]*/
+    /*[if address_ids]*/AND (d.start_address_id = ANY(%(address_ids)s::bigint[])
+        OR d.end_address_id = ANY(%(address_ids)s::bigint[]))/*[end]*/
+    /*[keyset]*/
+-- The registry orders by the key `order_by` selects (see [pagination]).
+ORDER BY /*[keyset_order]*/
 LIMIT %(limit)s::int;
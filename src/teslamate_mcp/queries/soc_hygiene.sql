@@ -7,10 +7,18 @@ SELECT c.name AS car_name,
         AS pct_below_20,
     MIN(p.battery_level) AS min_soc,
     MAX(p.battery_level) AS max_soc
+    /*[if chunk_start]*/,
+    SUM(p.battery_level) AS soc_sum,
+    COUNT(*) FILTER (WHERE p.battery_level > 80) AS samples_above_80,
+    COUNT(*) FILTER (WHERE p.battery_level < 20) AS samples_below_20/*[end]*/
 FROM positions p
+    /*[if sample_percent]*/TABLESAMPLE SYSTEM (%(sample_percent)s::real)
+        REPEATABLE (%(sample_seed)s::int)/*[end]*/
     JOIN cars c ON p.car_id = c.id
 WHERE p.battery_level IS NOT NULL
     AND p.date >= CURRENT_DATE - make_interval(days => %(days)s::int)
     AND (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
+    /*[if chunk_start]*/AND p.date >= %(chunk_start)s::timestamp
+        AND p.date < %(chunk_end)s::timestamp/*[end]*/
 GROUP BY c.name
 ORDER BY c.name;
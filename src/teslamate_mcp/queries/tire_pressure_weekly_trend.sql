@@ -11,6 +11,8 @@ SELECT c.name as car_name,
     ) as weekly_avg_pressure,
     COUNT(*) as readings_count
 FROM positions p
+    /*[if sample_percent]*/TABLESAMPLE SYSTEM (%(sample_percent)s::real)
+        REPEATABLE (%(sample_seed)s::int)/*[end]*/
     JOIN cars c ON p.car_id = c.id
 WHERE p.tpms_pressure_fl IS NOT NULL
     AND p.tpms_pressure_fr IS NOT NULL
@@ -18,6 +20,8 @@ WHERE p.tpms_pressure_fl IS NOT NULL
     AND p.tpms_pressure_rr IS NOT NULL
     AND p.date >= CURRENT_DATE - make_interval(days => %(days)s::int)
     AND (%(car_name)s::text IS NULL OR c.name ILIKE '%%' || %(car_name)s || '%%')
+    /*[if chunk_start]*/AND p.date >= %(chunk_start)s::timestamp
+        AND p.date < %(chunk_end)s::timestamp/*[end]*/
 GROUP BY c.id,
     c.name,
     DATE_TRUNC('week', (p.date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text)
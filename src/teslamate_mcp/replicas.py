@@ -0,0 +1,139 @@
+"""Read-replica routing for the read-only tools.
+
+TeslaMate writes a position row into its database every second while a car
+is awake, and every report scan used to run on that same primary. With
+`REPLICA_DATABASE_URLS` set, each replica gets its own pool and its own
+`HealthMonitor` (whose probe also measures replication lag), and read-only
+work goes to the least-loaded replica that is healthy, has a closed circuit,
+and is within `REPLICA_MAX_LAG_S` of the primary. With no such replica, reads
+fall back to the primary. Writes (`execute_write`) never come through here.
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+
+from psycopg.conninfo import conninfo_to_dict
+from psycopg_pool import AsyncConnectionPool
+
+from .config import Settings
+from .db import build_pool
+from .health import CLOSED, CircuitBreaker, HealthMonitor
+from .pool_sizing import PoolSizer
+
+logger = logging.getLogger(__name__)
+
+# A replica that has replayed everything it received is current even when the
+# primary has been idle for an hour (replay timestamp an hour old), so lag is
+# only measured from the replay timestamp while WAL is still outstanding. A
+# server that is not in recovery is its own primary: zero lag. NULL (nothing
+# replayed yet) leaves the lag unknown, and an unknown lag is never routed to.
+LAG_PROBE_SQL = """
+SELECT CASE
+    WHEN NOT pg_is_in_recovery() THEN 0
+    WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+    ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+END AS lag_s
+"""
+
+
+def parse_replica_urls(value: str) -> tuple[str, ...]:
+    """Split REPLICA_DATABASE_URLS on whitespace (libpq multi-host URLs use commas)."""
+    return tuple(value.split())
+
+
+def describe_dsn(dsn: str) -> str:
+    """host:port/dbname, for logs and /health — never the password."""
+    try:
+        parts = conninfo_to_dict(dsn)
+    except Exception:  # malformed DSN: psycopg reports it properly on connect
+        return "replica"
+    return f"{parts.get('host', 'localhost')}:{parts.get('port', 5432)}/{parts.get('dbname', '')}"
+
+
+@dataclass
+class Replica:
+    name: str
+    dsn: str
+    pool: AsyncConnectionPool
+    health: HealthMonitor
+    sizer: PoolSizer | None = field(default=None)
+
+    def load(self) -> float:
+        """Busy plus queued connections, as a fraction of the pool's maximum."""
+        stats = self.pool.get_stats()
+        busy = stats["pool_size"] - stats["pool_available"]
+        return (busy + stats.get("requests_waiting", 0)) / stats["pool_max"]
+
+
+class ReplicaSet:
+    """The configured replicas and the policy for picking one."""
+
+    def __init__(self, settings: Settings) -> None:
+        self._settings = settings
+        self._max_lag_s = settings.replica_max_lag_s
+        self.replicas = [
+            Replica(
+                name=describe_dsn(dsn),
+                dsn=dsn,
+                pool=build_pool(settings, dsn),
+                health=_replica_monitor(settings),
+                sizer=PoolSizer.from_settings(settings, name=describe_dsn(dsn)),
+            )
+            for dsn in parse_replica_urls(settings.replica_database_urls)
+        ]
+
+    def eligible(self, replica: Replica) -> bool:
+        snapshot = replica.health.snapshot
+        return (
+            not replica.pool.closed
+            and replica.health.breaker.state == CLOSED
+            and snapshot is not None
+            and snapshot.ok
+            and snapshot.lag_s is not None
+            and snapshot.lag_s <= self._max_lag_s
+        )
+
+    def pick(self) -> Replica | None:
+        """The least-loaded eligible replica, or None to use the primary."""
+        candidates = [r for r in self.replicas if self.eligible(r)]
+        return min(candidates, key=Replica.load, default=None)
+
+    async def open(self) -> None:
+        """Open every pool and start its monitor. Like the primary, never raises."""
+        for replica in self.replicas:
+            if replica.pool.closed:
+                replica.pool = build_pool(self._settings, replica.dsn)
+            try:
+                await replica.pool.open(wait=self._settings.pool_prewarm)
+            except Exception:
+                logger.exception("Replica %s pool failed to open", replica.name)
+            replica.health.start(replica.pool)
+            if replica.sizer is not None:
+                replica.sizer.start(replica.pool)
+        if self.replicas:
+            logger.info(
+                "Routing reads across %d replica(s) (max lag %ds): %s",
+                len(self.replicas),
+                self._max_lag_s,
+                ", ".join(r.name for r in self.replicas),
+            )
+
+    async def close(self) -> None:
+        for replica in self.replicas:
+            await replica.health.stop()
+            if replica.sizer is not None:
+                await replica.sizer.stop()
+            await replica.pool.close()
+
+
+def _replica_monitor(settings: Settings) -> HealthMonitor:
+    return HealthMonitor(
+        CircuitBreaker(
+            failure_threshold=settings.circuit_failure_threshold,
+            reset_timeout_s=settings.circuit_reset_timeout_s,
+        ),
+        interval_s=settings.health_check_interval_s,
+        probe_sql=LAG_PROBE_SQL,
+    )
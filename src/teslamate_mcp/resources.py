@@ -1,9 +1,12 @@
 """MCP resources: predefined-query metadata exposed by URI.
 
 Resource handlers in the SDK cannot receive a Context, so anything that needs
-runtime database access (like the live schema) stays in tool form. The
-resources here are derived purely from the bundled SQL + TOML files, so they
-are safe to serve as static-content URIs.
+runtime database access (like the live schema) stays in tool form. The query
+resources are derived purely from the bundled SQL + TOML files, so they are
+safe to serve as static-content URIs; spooled results are read from the
+ResultSpool passed in at registration, never from the database. The live
+car-state resources are served from the ChangeFeed's shared snapshot, which
+is what lets `subscriptions/listen` streams follow them.
 """
 
 from __future__ import annotations
@@ -11,13 +14,21 @@ from __future__ import annotations
 import json
 
 from mcp.server.mcpserver import MCPServer
-from mcp.server.mcpserver.exceptions import ResourceNotFoundError
+from mcp.server.mcpserver.exceptions import ResourceError, ResourceNotFoundError, ToolError
 
+from .live import ACTIVE_CHARGING_URI, ChangeFeed
+from .spool import RESULT_URI_PREFIX, ResultSpool, SpoolError
 from .tools.registry import PredefinedTool
 
 
-def register_resources(mcp: MCPServer, tools: list[PredefinedTool]) -> None:
-    """Expose the list of predefined queries and each query's raw SQL."""
+def register_resources(
+    mcp: MCPServer,
+    tools: list[PredefinedTool],
+    *,
+    spool: ResultSpool | None = None,
+    live: ChangeFeed | None = None,
+) -> None:
+    """Expose the predefined queries and their SQL, spooled results, and live car state."""
 
     by_name: dict[str, PredefinedTool] = {t.name: t for t in tools}
 
@@ -50,3 +61,60 @@ def register_resources(mcp: MCPServer, tools: list[PredefinedTool]) -> None:
             return by_name[name].sql
         except KeyError as exc:
             raise ResourceNotFoundError(f"Unknown query: {name}") from exc
+
+    if live is not None:
+        _register_live_resources(mcp, live)
+    if spool is None:
+        return
+
+    @mcp.resource(
+        uri=RESULT_URI_PREFIX + "{result_id}{?page}",
+        name="Spooled tool result",
+        description=(
+            "One page of a predefined-tool result too large to return inline. The "
+            "tool's reply names the URI and the page count; pages count from 1."
+        ),
+        mime_type="application/json",
+    )
+    async def spooled_result(result_id: str, page: int = 1) -> str:
+        try:
+            return spool.read_page(result_id, page)
+        except SpoolError as exc:
+            raise ResourceNotFoundError(str(exc)) from exc
+
+
+def _register_live_resources(mcp: MCPServer, live: ChangeFeed) -> None:
+    @mcp.resource(
+        uri="teslamate://cars/{name}/status",
+        name="Live car status",
+        description=(
+            "Latest recorded state of one car (battery, range, odometer, climate, "
+            "position, nearest address), as get_current_car_status returns it. "
+            "Subscribe to be notified when it changes."
+        ),
+        mime_type="application/json",
+    )
+    async def car_status(name: str) -> str:
+        try:
+            row = await live.car_status(name)
+        except ToolError as exc:  # the circuit is open
+            raise ResourceError(str(exc)) from exc
+        if row is None:
+            raise ResourceNotFoundError(f"No car named {name!r} has recorded positions")
+        return json.dumps(row, indent=2)
+
+    @mcp.resource(
+        uri=ACTIVE_CHARGING_URI,
+        name="Active charging sessions",
+        description=(
+            "Charging sessions that have not ended, each with its latest charger "
+            "sample. Subscribe to be notified when a session starts, ends or reports."
+        ),
+        mime_type="application/json",
+    )
+    async def active_charging() -> str:
+        try:
+            rows = await live.active_charging()
+        except ToolError as exc:
+            raise ResourceError(str(exc)) from exc
+        return json.dumps(rows, indent=2)
@@ -14,10 +14,17 @@ from psycopg_pool import AsyncConnectionPool
 
 from . import __version__
 from .config import Settings
+from .cursors import CursorStore
 from .db import build_pool
+from .entity_cache import EntityCache
+from .health import CircuitBreaker, HealthMonitor
+from .live import ChangeFeed, ListenerCountingBus
+from .pool_sizing import PoolSizer
 from .prompts import register_prompts
+from .replicas import ReplicaSet
 from .resources import register_resources
 from .schema import load_schema
+from .spool import ResultSpool
 from .tools import (
     discover_predefined_tools,
     register_charging_write_tools,
@@ -25,7 +32,10 @@ from .tools import (
     register_predefined_tools,
     register_schema_tool,
 )
+from .tools.address_index import AddressIndex
 from .tools.apps_ui import APP_SPECS, build_apps_extension
+from .tools.month_memo import MonthMemo
+from .tools.shared_scan import SharedScans
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +49,6 @@ _CACHE_HINTS = {
     "prompts/list": _LIST_CACHE_HINT,
     "resources/list": _LIST_CACHE_HINT,
     "resources/templates/list": _LIST_CACHE_HINT,
-    "resources/read": _LIST_CACHE_HINT,
 }
 
 
@@ -48,14 +57,33 @@ class AppContext:
     """Per-process state exposed to tools via the request context."""
 
     pool: AsyncConnectionPool
+    cursors: CursorStore
+    health: HealthMonitor
+    replicas: ReplicaSet
+    statement_timeout_ms: int = 0  # the pool's bound; 0 means none
+    approximate_target_rows: int = 50_000
+    sizer: PoolSizer | None = field(default=None)
+    spool: ResultSpool | None = field(default=None)
+    entities: EntityCache | None = field(default=None)
+    month_memo: MonthMemo | None = field(default=None)
+    shared_scans: SharedScans | None = field(default=None)
+    addresses: AddressIndex | None = field(default=None)
+    live: ChangeFeed | None = field(default=None)
     schema: list[dict[str, Any]] | None = field(default=None)
 
+    def read_target(self) -> tuple[AsyncConnectionPool, CircuitBreaker]:
+        """Pool and breaker for read-only work: the best replica, else the primary."""
+        replica = self.replicas.pick()
+        if replica is None:
+            return self.pool, self.health.breaker
+        return replica.pool, replica.health.breaker
+
 
 def app_context_for(server: MCPServer) -> AppContext | None:
     """The lifespan state of `server`, typed, for callers outside the request path.
 
     Tools reach their AppContext through the MCP request context; the /health
-    route runs outside any MCP request and still needs the pool.
+    route runs outside any MCP request and still needs the health monitor.
     """
     return getattr(server, "teslamate_app_context", None)
 
@@ -63,7 +91,54 @@ def app_context_for(server: MCPServer) -> AppContext | None:
 def create_server(settings: Settings) -> MCPServer:
     """Build the MCPServer, wire up the lifespan, and register all tools."""
 
-    app_context = AppContext(pool=build_pool(settings))
+    app_context = AppContext(
+        pool=build_pool(settings),
+        cursors=CursorStore(
+            page_size=settings.custom_sql_row_limit,
+            # Always leave one connection for everything that is not a held cursor.
+            max_open=min(settings.custom_sql_max_cursors, settings.pool_max_size - 1),
+            idle_timeout_s=settings.custom_sql_cursor_idle_s,
+            max_age_s=settings.custom_sql_cursor_max_age_s,
+            statement_timeout_ms=settings.query_timeout_ms,
+        ),
+        health=HealthMonitor(
+            CircuitBreaker(
+                failure_threshold=settings.circuit_failure_threshold,
+                reset_timeout_s=settings.circuit_reset_timeout_s,
+            ),
+            interval_s=settings.health_check_interval_s,
+        ),
+        replicas=ReplicaSet(settings),
+        statement_timeout_ms=settings.statement_timeout_ms,
+        approximate_target_rows=settings.approximate_target_rows,
+        sizer=PoolSizer.from_settings(settings),
+        spool=(
+            ResultSpool(
+                threshold_bytes=settings.result_spool_threshold_bytes,
+                max_bytes=settings.result_spool_max_bytes,
+                ttl_s=settings.result_spool_ttl_s,
+                page_rows=settings.result_spool_page_rows,
+            )
+            if settings.result_spool_threshold_bytes
+            else None
+        ),
+        entities=(
+            EntityCache(settings.entity_cache_path, max_bytes=settings.entity_cache_max_bytes)
+            if settings.entity_cache_path
+            else None
+        ),
+        month_memo=(
+            MonthMemo(settings.month_memo_max_entries) if settings.month_memo_max_entries else None
+        ),
+        shared_scans=(
+            SharedScans(settings.shared_scan_window_ms) if settings.shared_scan_window_ms else None
+        ),
+        addresses=(
+            AddressIndex(settings.address_index_rebuild_s)
+            if settings.address_index_rebuild_s
+            else None
+        ),
+    )
 
     @asynccontextmanager
     async def lifespan(_server: MCPServer) -> AsyncIterator[AppContext]:
@@ -76,36 +151,82 @@ def create_server(settings: Settings) -> MCPServer:
         if app_context.pool.closed:
             app_context.pool = build_pool(settings)
         try:
-            await app_context.pool.open()
+            await app_context.pool.open(wait=settings.pool_prewarm)
             app_context.schema = await load_schema(app_context.pool)
             logger.info(
-                "Database pool opened (min=%d, max=%d); schema cached (%d columns)",
+                "Database pool opened (min=%d, max=%d%s); schema cached (%d columns)",
                 settings.pool_min_size,
                 settings.pool_max_size,
+                ", adaptive" if settings.pool_adaptive else "",
                 len(app_context.schema),
             )
         except Exception:
             logger.exception("DB init failed; tool calls will error until the DB is reachable")
+        if app_context.entities is not None:
+            try:
+                app_context.entities.open({t.name: t.version for t in tools if t.cache})
+            except Exception:
+                logger.exception("Entity cache unavailable; finished entities are not cached")
+        app_context.health.start(app_context.pool)
+        app_context.cursors.start()
+        if app_context.sizer is not None:
+            app_context.sizer.start(app_context.pool)
+        if app_context.live is not None:
+            app_context.live.start(app_context.pool)
+        await app_context.replicas.open()
         try:
             yield app_context
         finally:
+            if app_context.live is not None:
+                await app_context.live.stop()
+            await app_context.replicas.close()
+            await app_context.health.stop()
+            if app_context.sizer is not None:
+                await app_context.sizer.stop()
+            await app_context.cursors.stop()
+            if app_context.spool is not None:
+                app_context.spool.close()
+            if app_context.entities is not None:
+                app_context.entities.close()
             await app_context.pool.close()
 
     tools = discover_predefined_tools()
+    # Live-state resources read the primary: a replica may lag by seconds.
+    bus = ListenerCountingBus()
+    status_tool = next(t for t in tools if t.name == "get_current_car_status")
+    app_context.live = ChangeFeed(
+        bus,
+        app_context.health.breaker,
+        status_sql=status_tool.render({"car_name": None}),
+        interval_s=settings.live_poll_interval_s,
+    )
 
     mcp = MCPServer(
         "teslamate",
         version=__version__,
         lifespan=lifespan,
         debug=settings.debug,
-        cache_hints=_CACHE_HINTS,
+        # Reads include the live car-state resources, which are only as
+        # fresh as the change feed's last poll.
+        cache_hints={
+            **_CACHE_HINTS,
+            "resources/read": CacheHint(
+                ttl_ms=settings.live_poll_interval_s * 1000, scope="private"
+            ),
+        },
+        subscriptions=bus,
         # MCP Apps (io.modelcontextprotocol/ui): one show_* tool + ui://
         # resource per APP_SPECS entry. Each degrades to a plain data tool
         # on clients that did not negotiate the extension.
         extensions=[build_apps_extension(tools, report_timezone=settings.report_timezone)],
     )
 
-    register_predefined_tools(mcp, tools, report_timezone=settings.report_timezone)
+    register_predefined_tools(
+        mcp,
+        tools,
+        report_timezone=settings.report_timezone,
+        spool_results=app_context.spool is not None,
+    )
     register_schema_tool(mcp)
     register_custom_sql(
         mcp,
@@ -114,7 +235,7 @@ def create_server(settings: Settings) -> MCPServer:
     )
     if settings.enable_charging_writes:
         register_charging_write_tools(mcp)
-    register_resources(mcp, tools)
+    register_resources(mcp, tools, spool=app_context.spool, live=app_context.live)
     register_prompts(mcp)
     logger.info(
         "Registered %d predefined tools + run_sql + get_database_schema + "
@@ -0,0 +1,246 @@
+"""Local spool for predefined-tool results too large to return inline.
+
+A multi-year report can run to megabytes of JSON. Returned inline, all of it
+lands in the model's context at once, most of it unread. Above a size
+threshold the tool instead writes the rows to a spool file and returns a
+short summary plus a `teslamate://results/{id}` resource URI; the client then
+reads the pages it needs.
+
+Each result is one JSON Lines file (one row per line) with the byte offset of
+every page recorded at write time. Files are memory-mapped, so serving a page
+is a slice of the mapping, never a parse of the whole result. The store is
+bounded in total bytes (least recently read results are evicted first) and
+every result expires a fixed time after it was written. Expired entries are
+dropped lazily, on the next write or read, like `run_sql` cursors.
+
+Most results are far below the threshold, so `store_if_large` first sizes a
+result from an evenly spaced sample of its rows and returns small ones
+untouched. Only a result that may be over is encoded in full, off the event
+loop, and those encoded lines are what gets written.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import mmap
+import os
+import secrets
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import pydantic_core
+
+logger = logging.getLogger(__name__)
+
+RESULT_URI_PREFIX = "teslamate://results/"
+# Rows encoded to estimate a result's size before any of it is encoded in full.
+_SAMPLE_ROWS = 16
+
+
+class SpoolError(LookupError):
+    """Raised when a spooled result is unknown, evicted, or past its TTL."""
+
+
+def _encode(rows: list[dict[str, Any]]) -> list[bytes]:
+    return [pydantic_core.to_json(row) + b"\n" for row in rows]
+
+
+def _estimated_size(rows: list[dict[str, Any]]) -> int:
+    """The row count times the largest encoded row of an evenly spaced sample."""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // _SAMPLE_ROWS)
+    return len(rows) * max(len(pydantic_core.to_json(row)) + 1 for row in rows[::step])
+
+
+@dataclass
+class _Spooled:
+    path: str
+    mapping: mmap.mmap
+    offsets: list[int]  # start of each page, plus the end of the file
+    total_rows: int
+    tool: str
+    expires_at: float
+
+    @property
+    def size(self) -> int:
+        return self.offsets[-1]
+
+    @property
+    def pages(self) -> int:
+        return len(self.offsets) - 1
+
+    def close(self) -> None:
+        self.mapping.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.path)
+
+
+@dataclass(frozen=True)
+class SpooledResult:
+    """What a tool tells the client about a result it spooled."""
+
+    result_id: str
+    tool: str
+    total_rows: int
+    size_bytes: int
+    pages: int
+    page_rows: int
+    ttl_s: int
+
+    @property
+    def uri(self) -> str:
+        return f"{RESULT_URI_PREFIX}{self.result_id}"
+
+
+class ResultSpool:
+    """Bounded, expiring store of memory-mapped result files."""
+
+    def __init__(self, *, threshold_bytes: int, max_bytes: int, ttl_s: int, page_rows: int) -> None:
+        self.threshold_bytes = threshold_bytes
+        self._max_bytes = max_bytes
+        self._ttl_s = ttl_s
+        self._page_rows = page_rows
+        self._directory: str | None = None
+        self._entries: OrderedDict[str, _Spooled] = OrderedDict()  # least recently read first
+        self._bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _dir(self) -> str:
+        # Created on first use: most sessions never spool anything.
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="teslamate-mcp-spool-")
+        return self._directory
+
+    async def store_if_large(self, tool: str, rows: list[dict[str, Any]]) -> SpooledResult | None:
+        """Spool `rows` if their JSON is over the threshold; None to return them inline.
+
+        The sampled estimate must reach half the threshold before the result
+        is encoded in full; a few rows far larger than the sampled ones can
+        leave a result just over it inline. Raises SpoolError like `store`.
+        """
+        if _estimated_size(rows) * 2 <= self.threshold_bytes:
+            return None
+        lines = await asyncio.to_thread(_encode, rows)
+        if sum(map(len, lines)) <= self.threshold_bytes:
+            return None
+        return await self._store(tool, lines)
+
+    async def store(self, tool: str, rows: list[dict[str, Any]]) -> SpooledResult:
+        """Write `rows` to a new spool file, evicting older results to make room.
+
+        Raises SpoolError if the result alone is larger than the whole store.
+        """
+        return await self._store(tool, await asyncio.to_thread(_encode, rows))
+
+    async def _store(self, tool: str, lines: list[bytes]) -> SpooledResult:
+        result_id = secrets.token_urlsafe(12)
+        # Encoding and writing megabytes is blocking work; the bookkeeping
+        # stays on the event loop so reads never see a half-registered entry.
+        mapping, offsets = await asyncio.to_thread(self._write, result_id, tool, lines)
+        size = offsets[-1]
+        self._expire()
+        while self._entries and self._bytes + size > self._max_bytes:
+            evicted_id, evicted = self._entries.popitem(last=False)
+            self._drop(evicted_id, evicted, "evicted")
+        self._entries[result_id] = _Spooled(
+            path=self._path(result_id),
+            mapping=mapping,
+            offsets=offsets,
+            total_rows=len(lines),
+            tool=tool,
+            expires_at=time.monotonic() + self._ttl_s,
+        )
+        self._bytes += size
+        logger.info("Spooled %d row(s) of %s as %s (%d bytes)", len(lines), tool, result_id, size)
+        return SpooledResult(
+            result_id=result_id,
+            tool=tool,
+            total_rows=len(lines),
+            size_bytes=size,
+            pages=len(offsets) - 1,
+            page_rows=self._page_rows,
+            ttl_s=self._ttl_s,
+        )
+
+    def _path(self, result_id: str) -> str:
+        return os.path.join(self._dir(), f"{result_id}.jsonl")
+
+    def _write(self, result_id: str, tool: str, lines: list[bytes]) -> tuple[mmap.mmap, list[int]]:
+        offsets = [0]
+        size = 0
+        for i, line in enumerate(lines, start=1):
+            size += len(line)
+            if i % self._page_rows == 0 and i < len(lines):
+                offsets.append(size)
+        offsets.append(size)
+        if size > self._max_bytes:
+            raise SpoolError(
+                f"{tool} returned {size} bytes, more than the whole result spool "
+                f"({self._max_bytes} bytes); narrow the filters"
+            )
+        with open(self._path(result_id), "w+b") as f:
+            f.writelines(lines)
+            f.flush()
+            # mmap cannot map an empty file; an anonymous page stands in.
+            mapping = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else mmap.mmap(-1, 1)
+            )
+        return mapping, offsets
+
+    def read_page(self, result_id: str, page: int) -> str:
+        """One page of a spooled result as a JSON object; pages count from 1."""
+        self._expire()
+        entry = self._entries.get(result_id)
+        if entry is None:
+            raise SpoolError(
+                f"Unknown or expired result {result_id!r}; call the tool again to regenerate it"
+            )
+        if not 1 <= page <= entry.pages:
+            raise SpoolError(f"Result {result_id!r} has pages 1 to {entry.pages}, not {page}")
+        self._entries.move_to_end(result_id)
+        body = entry.mapping[entry.offsets[page - 1] : entry.offsets[page]]
+        rows = b"[" + body.rstrip(b"\n").replace(b"\n", b",") + b"]"
+        header = pydantic_core.to_json(
+            {
+                "result_id": result_id,
+                "tool": entry.tool,
+                "page": page,
+                "pages": entry.pages,
+                "total_rows": entry.total_rows,
+            }
+        )
+        # Splice the rows in as raw bytes: they are already JSON.
+        return (header[:-1] + b',"rows":' + rows + b"}").decode("utf-8")
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for result_id in [k for k, e in self._entries.items() if e.expires_at <= now]:
+            self._drop(result_id, self._entries.pop(result_id), "expired")
+
+    def _drop(self, result_id: str, entry: _Spooled, why: str) -> None:
+        self._bytes -= entry.size
+        entry.close()
+        logger.info("Spooled result %s %s", result_id, why)
+
+    def close(self) -> None:
+        """Unmap and delete every spooled result."""
+        for entry in self._entries.values():
+            entry.close()
+        self._entries.clear()
+        self._bytes = 0
+        if self._directory is not None:
+            shutil.rmtree(self._directory, ignore_errors=True)
+            self._directory = None
@@ -0,0 +1,718 @@
+"""Synthetic TeslaMate-shaped dataset for scale testing.
+
+`tests/conftest.py` seeds a few dozen rows, which says nothing about how the
+bundled queries behave on a real install: years of 1 Hz `positions` while
+driving. This module simulates cars day by day — commutes, errands, the odd
+road trip with a supercharger stop, overnight home charging, slow battery
+degradation, seasonal temperatures — and streams the rows into PostgreSQL
+with COPY.
+
+The output is a pure function of `DatasetSpec`: the same seed, scale, car
+count and end date produce the same rows. `scale` is the history length in
+years; one car-year is roughly 1.6M positions, so `--scale 3 --cars 2` lands
+around 10M. Indexes are built after the load, then the tables are analyzed.
+
+`load` drops and recreates the TeslaMate tables in the target database, and
+refuses to touch one that has TeslaMate's `schema_migrations` table.
+"""
+
+from __future__ import annotations
+
+import itertools
+import math
+import random
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, date, datetime, time, timedelta
+from typing import Any
+
+import psycopg
+
+SCHEMA_SQL = """
+DROP TABLE IF EXISTS charges, charging_processes, drives, positions, updates,
+    addresses, geofences, car_settings, cars CASCADE;
+CREATE TABLE car_settings (id BIGSERIAL PRIMARY KEY, enabled BOOLEAN DEFAULT TRUE,
+    free_supercharging BOOLEAN DEFAULT FALSE);
+CREATE TABLE cars (id SMALLSERIAL PRIMARY KEY, name TEXT, model TEXT, trim_badging TEXT,
+    exterior_color TEXT, marketing_name TEXT, efficiency DOUBLE PRECISION, settings_id BIGINT);
+CREATE TABLE addresses (id BIGSERIAL PRIMARY KEY, display_name TEXT, city TEXT, state TEXT,
+    latitude DOUBLE PRECISION, longitude DOUBLE PRECISION);
+CREATE TABLE geofences (id BIGSERIAL PRIMARY KEY, name TEXT, latitude DOUBLE PRECISION,
+    longitude DOUBLE PRECISION, radius SMALLINT, cost_per_unit NUMERIC,
+    session_fee NUMERIC, billing_type TEXT);
+CREATE TABLE drives (id SERIAL PRIMARY KEY, car_id SMALLINT, start_date TIMESTAMP,
+    end_date TIMESTAMP, distance DOUBLE PRECISION, duration_min SMALLINT, speed_max SMALLINT,
+    power_max SMALLINT, power_min SMALLINT, start_km DOUBLE PRECISION, end_km DOUBLE PRECISION,
+    inside_temp_avg DOUBLE PRECISION, outside_temp_avg DOUBLE PRECISION,
+    start_address_id BIGINT, end_address_id BIGINT,
+    start_rated_range_km DOUBLE PRECISION, end_rated_range_km DOUBLE PRECISION,
+    start_position_id BIGINT, end_position_id BIGINT);
+CREATE TABLE charging_processes (id SERIAL PRIMARY KEY, car_id SMALLINT, start_date TIMESTAMP,
+    end_date TIMESTAMP, charge_energy_added DOUBLE PRECISION, charge_energy_used DOUBLE PRECISION,
+    duration_min INTEGER, cost NUMERIC(10,2), address_id BIGINT, geofence_id BIGINT,
+    start_battery_level SMALLINT, end_battery_level SMALLINT,
+    start_rated_range_km DOUBLE PRECISION, end_rated_range_km DOUBLE PRECISION,
+    outside_temp_avg DOUBLE PRECISION, position_id BIGINT);
+CREATE TABLE charges (id BIGSERIAL PRIMARY KEY, charging_process_id INTEGER, date TIMESTAMP,
+    battery_level SMALLINT, charge_energy_added DOUBLE PRECISION, charger_power SMALLINT,
+    charger_voltage INTEGER, charger_actual_current SMALLINT, charger_phases SMALLINT,
+    rated_battery_range_km DOUBLE PRECISION, outside_temp DOUBLE PRECISION);
+CREATE TABLE positions (id BIGSERIAL PRIMARY KEY, car_id SMALLINT, drive_id INTEGER,
+    date TIMESTAMP, latitude DOUBLE PRECISION, longitude DOUBLE PRECISION, speed SMALLINT,
+    power SMALLINT, odometer DOUBLE PRECISION, battery_level SMALLINT,
+    usable_battery_level SMALLINT, rated_battery_range_km DOUBLE PRECISION,
+    ideal_battery_range_km DOUBLE PRECISION, est_battery_range_km DOUBLE PRECISION,
+    outside_temp DOUBLE PRECISION, is_climate_on BOOLEAN,
+    tpms_pressure_fl DOUBLE PRECISION, tpms_pressure_fr DOUBLE PRECISION,
+    tpms_pressure_rl DOUBLE PRECISION, tpms_pressure_rr DOUBLE PRECISION);
+CREATE TABLE updates (id SERIAL PRIMARY KEY, car_id SMALLINT, version TEXT,
+    start_date TIMESTAMP, end_date TIMESTAMP);
+"""
+
+INDEX_SQL = """
+CREATE INDEX positions_car_id_date_index ON positions (car_id, date);
+CREATE INDEX positions_drive_id_date_index ON positions (drive_id, date);
+CREATE INDEX drives_car_id_start_date_index ON drives (car_id, start_date);
+CREATE INDEX charging_processes_car_id_start_date_index
+    ON charging_processes (car_id, start_date);
+CREATE INDEX charges_charging_process_id_date_index ON charges (charging_process_id, date);
+CREATE INDEX updates_car_id_index ON updates (car_id);
+"""
+
+COLUMNS: dict[str, tuple[str, ...]] = {
+    "car_settings": ("id", "enabled", "free_supercharging"),
+    "cars": (
+        "id",
+        "name",
+        "model",
+        "trim_badging",
+        "exterior_color",
+        "marketing_name",
+        "efficiency",
+        "settings_id",
+    ),
+    "addresses": ("id", "display_name", "city", "state", "latitude", "longitude"),
+    "geofences": (
+        "id",
+        "name",
+        "latitude",
+        "longitude",
+        "radius",
+        "cost_per_unit",
+        "session_fee",
+        "billing_type",
+    ),
+    "drives": (
+        "id",
+        "car_id",
+        "start_date",
+        "end_date",
+        "distance",
+        "duration_min",
+        "speed_max",
+        "power_max",
+        "power_min",
+        "start_km",
+        "end_km",
+        "inside_temp_avg",
+        "outside_temp_avg",
+        "start_address_id",
+        "end_address_id",
+        "start_rated_range_km",
+        "end_rated_range_km",
+        "start_position_id",
+        "end_position_id",
+    ),
+    "charging_processes": (
+        "id",
+        "car_id",
+        "start_date",
+        "end_date",
+        "charge_energy_added",
+        "charge_energy_used",
+        "duration_min",
+        "cost",
+        "address_id",
+        "geofence_id",
+        "start_battery_level",
+        "end_battery_level",
+        "start_rated_range_km",
+        "end_rated_range_km",
+        "outside_temp_avg",
+        "position_id",
+    ),
+    "charges": (
+        "id",
+        "charging_process_id",
+        "date",
+        "battery_level",
+        "charge_energy_added",
+        "charger_power",
+        "charger_voltage",
+        "charger_actual_current",
+        "charger_phases",
+        "rated_battery_range_km",
+        "outside_temp",
+    ),
+    "positions": (
+        "id",
+        "car_id",
+        "drive_id",
+        "date",
+        "latitude",
+        "longitude",
+        "speed",
+        "power",
+        "odometer",
+        "battery_level",
+        "usable_battery_level",
+        "rated_battery_range_km",
+        "ideal_battery_range_km",
+        "est_battery_range_km",
+        "outside_temp",
+        "is_climate_on",
+        "tpms_pressure_fl",
+        "tpms_pressure_fr",
+        "tpms_pressure_rl",
+        "tpms_pressure_rr",
+    ),
+    "updates": ("id", "car_id", "version", "start_date", "end_date"),
+}
+
+# The two tables that grow with history length are streamed; the rest are
+# small enough to buffer and COPY at the end.
+_STREAMED = ("positions", "charges")
+
+# (city, state, latitude, longitude, mean °C, seasonal amplitude °C)
+_METROS = (
+    ("Istanbul", "TR-34", 41.015, 28.979, 15.0, 9.0),
+    ("Berlin", "BE", 52.520, 13.405, 10.0, 10.0),
+    ("Austin", "TX", 30.267, -97.743, 21.0, 8.5),
+    ("Oslo", "03", 59.914, 10.752, 6.5, 10.5),
+    ("Lyon", "ARA", 45.764, 4.836, 12.5, 9.5),
+)
+# (model, trim, marketing name, usable kWh, rated km at 100%, colour)
+_MODELS = (
+    ("3", "LR", "Model 3 Long Range", 75.0, 560.0, "DeepBlue"),
+    ("Y", "P", "Model Y Performance", 78.0, 514.0, "RedMulticoat"),
+    ("S", "100D", "Model S 100D", 95.0, 632.0, "SolidBlack"),
+    ("3", "SR", "Model 3 Standard Range", 57.5, 430.0, "PearlWhite"),
+)
+_CAR_NAMES = ("Blue Thunder", "Red Rocket", "Night Owl", "Snowflake", "Silver Arrow")
+_STREETS = ("Oak", "Maple", "Harbor", "Station", "Mill", "Park", "Lake", "Hill", "Market")
+_STREET_KINDS = ("Street", "Avenue", "Road", "Lane", "Boulevard")
+_PLACES = ("Grocer", "Gym", "Cafe", "Pharmacy", "Mall", "School", "Library", "Bakery")
+
+_HOME_PRICE_PER_KWH = 0.28
+_SUPERCHARGER_PRICE_PER_KWH = 0.45
+_PARKED_SAMPLE_S = 15 * 60
+_TPMS_EVERY_S = 60
+
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Everything that determines the generated rows."""
+
+    seed: int = 0
+    scale: float = 1.0
+    cars: int = 2
+    end_date: date = field(default_factory=lambda: datetime.now(UTC).date())
+
+    @property
+    def days(self) -> int:
+        return max(1, round(365 * self.scale))
+
+
+Row = tuple[Any, ...]
+
+
+def _km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in km."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * 6371.0 * math.asin(math.sqrt(a))
+
+
+def _offset(lat: float, lon: float, km: float, bearing: float) -> tuple[float, float]:
+    """The point `km` away from (lat, lon) on `bearing` radians (flat-earth, fine at < 500 km)."""
+    dlat = km * math.cos(bearing) / 111.0
+    dlon = km * math.sin(bearing) / (111.0 * math.cos(math.radians(lat)))
+    return round(lat + dlat, 6), round(lon + dlon, 6)
+
+
+@dataclass
+class _Place:
+    address_id: int
+    latitude: float
+    longitude: float
+    geofence_id: int | None = None
+
+
+class _Ids:
+    """Explicit primary keys, so positions can point at drives before either is loaded."""
+
+    def __init__(self) -> None:
+        self._counters = {table: itertools.count(1) for table in COLUMNS}
+
+    def next(self, table: str) -> int:
+        return next(self._counters[table])
+
+
+class _CarSimulation:
+    def __init__(
+        self, car_id: int, spec: DatasetSpec, ids: _Ids, start: datetime, rng: random.Random
+    ) -> None:
+        self.car_id = car_id
+        self.spec = spec
+        self.ids = ids
+        self.rng = rng
+        self.t = start
+        self.history_start = start
+        city, state, lat, lon, self.temp_mean, self.temp_amplitude = rng.choice(_METROS)
+        self.city, self.state = city, state
+        self.metro = (lat, lon)
+        model = _MODELS[(car_id - 1) % len(_MODELS)]
+        self.model, self.trim, self.marketing, self.capacity_kwh, self.new_range_km = model[:5]
+        self.colour = model[5]
+        self.soc = rng.uniform(60, 85)
+        self.odometer = round(rng.uniform(3_000, 40_000), 1)
+        self.tpms_base = rng.uniform(2.85, 3.0)
+        self.home_ac_kw = rng.choice((7, 11))
+        self.places: list[_Place] = []
+        self.pending: list[tuple[str, Row]] = []
+
+    # -- static rows -----------------------------------------------------------------
+
+    def _address(self, name: str, lat: float, lon: float, city: str | None = None) -> _Place:
+        address_id = self.ids.next("addresses")
+        self.pending.append(
+            ("addresses", (address_id, name, city or self.city, self.state, lat, lon))
+        )
+        return _Place(address_id, lat, lon)
+
+    def _street_name(self) -> str:
+        rng = self.rng
+        return f"{rng.randint(1, 240)} {rng.choice(_STREETS)} {rng.choice(_STREET_KINDS)}"
+
+    def setup(self) -> Iterator[tuple[str, Row]]:
+        settings_id = self.ids.next("car_settings")
+        yield "car_settings", (settings_id, True, self.rng.random() < 0.2)
+        name = (
+            _CAR_NAMES[self.car_id - 1] if self.car_id <= len(_CAR_NAMES) else f"Car {self.car_id}"
+        )
+        yield (
+            "cars",
+            (
+                self.car_id,
+                name,
+                self.model,
+                self.trim,
+                self.colour,
+                self.marketing,
+                round(self.capacity_kwh / self.new_range_km, 4),
+                settings_id,
+            ),
+        )
+        lat, lon = _offset(*self.metro, self.rng.uniform(3, 15), self.rng.uniform(0, 2 * math.pi))
+        self.home = self._address(f"{self._street_name()} (home)", lat, lon)
+        self.home.geofence_id = self.ids.next("geofences")
+        yield (
+            "geofences",
+            (
+                self.home.geofence_id,
+                f"Home ({name})",
+                lat,
+                lon,
+                25,
+                _HOME_PRICE_PER_KWH,
+                None,
+                "per_kwh",
+            ),
+        )
+        lat, lon = _offset(*self.metro, self.rng.uniform(1, 20), self.rng.uniform(0, 2 * math.pi))
+        self.work = self._address(f"{self._street_name()} (office)", lat, lon)
+        self.work.geofence_id = self.ids.next("geofences")
+        yield "geofences", (self.work.geofence_id, f"Work ({name})", lat, lon, 50, None, None, None)
+        for _ in range(12 + round(8 * math.sqrt(self.spec.scale))):
+            lat, lon = _offset(
+                *self.metro, self.rng.uniform(1, 35), self.rng.uniform(0, 2 * math.pi)
+            )
+            place = f"{self.rng.choice(_PLACES)}, {self._street_name()}"
+            self.places.append(self._address(place, lat, lon))
+        self.lat, self.lon, self.place = self.home.latitude, self.home.longitude, self.home
+        yield from self._flush()
+
+    def _flush(self) -> Iterator[tuple[str, Row]]:
+        pending, self.pending = self.pending, []
+        yield from pending
+
+    # -- derived quantities ---------------------------------------------------------
+
+    def _temp(self, at: datetime) -> float:
+        season = -math.cos(2 * math.pi * (at.timetuple().tm_yday - 15) / 365)
+        daily = math.sin(2 * math.pi * (at.hour - 9) / 24)
+        return self.temp_mean + self.temp_amplitude * season + 4 * daily
+
+    def _km_per_pct(self, at: datetime) -> float:
+        """Rated km per SOC percent, fading ~1.8%/year then flattening."""
+        years = (at - self.history_start).days / 365 + self.odometer / 150_000
+        return self.new_range_km / 100 * (1 - 0.05 * (1 - math.exp(-years / 2.5)))
+
+    def _position(
+        self,
+        at: datetime,
+        *,
+        drive_id: int | None = None,
+        speed: int | None = None,
+        power: int = 0,
+        temp: float,
+        climate: bool = False,
+        tpms: bool = False,
+    ) -> Row:
+        level = round(self.soc)
+        rated = round(self.soc * self._km_per_pct(at), 1)
+        pressure = self.tpms_base - max(0.0, 20 - temp) * 0.008 if tpms else None
+        pressures = (
+            (
+                round(pressure, 2),
+                round(pressure + 0.02, 2),
+                round(pressure - 0.03, 2),
+                round(pressure - 0.01, 2),
+            )
+            if pressure is not None
+            else (None, None, None, None)
+        )
+        return (
+            self.ids.next("positions"),
+            self.car_id,
+            drive_id,
+            at,
+            self.lat,
+            self.lon,
+            speed,
+            power,
+            round(self.odometer, 3),
+            level,
+            level - (1 if temp < 0 else 0),
+            rated,
+            round(rated * 1.06, 1),
+            round(rated * (0.93 if temp > 5 else 0.82), 1),
+            round(temp, 1),
+            climate,
+            *pressures,
+        )
+
+    # -- activities -----------------------------------------------------------------
+
+    def park_until(self, until: datetime) -> Iterator[tuple[str, Row]]:
+        """Sparse samples while parked, with a little vampire drain."""
+        while self.t + timedelta(seconds=_PARKED_SAMPLE_S) < until:
+            step = _PARKED_SAMPLE_S + self.rng.randint(0, 300)
+            self.t += timedelta(seconds=step)
+            self.soc = max(5.0, self.soc - 0.04 * step / 3600)
+            yield "positions", self._position(self.t, temp=self._temp(self.t))
+        self.t = max(self.t, until)
+
+    def travel(self, dest: _Place) -> Iterator[tuple[str, Row]]:
+        """Drive to `dest`, stopping at a supercharger on the way if the battery needs it."""
+        distance = _km(self.lat, self.lon, dest.latitude, dest.longitude) * 1.25
+        needed_pct = distance * 0.2 / self.capacity_kwh * 100
+        if self.soc - needed_pct < 12:
+            frac = min(0.6, max(0.2, (self.soc - 15) / max(needed_pct, 1)))
+            lat = round(self.lat + (dest.latitude - self.lat) * frac, 6)
+            lon = round(self.lon + (dest.longitude - self.lon) * frac, 6)
+            charger = self._address(f"Supercharger {self._street_name()}", lat, lon, "Highway")
+            yield from self._flush()
+            yield from self._drive(charger)
+            yield from self.charge(dc=True, target=self.rng.uniform(75, 90))
+        yield from self._drive(dest)
+
+    def _drive(self, dest: _Place) -> Iterator[tuple[str, Row]]:
+        rng = self.rng
+        line_km = _km(self.lat, self.lon, dest.latitude, dest.longitude)
+        distance = max(0.4, line_km * rng.uniform(1.15, 1.4))
+        avg_speed = (30 if distance < 8 else 55 if distance < 40 else 100) * rng.uniform(0.85, 1.15)
+        duration_s = max(60, int(distance / avg_speed * 3600))
+        step_km = distance / duration_s
+        temp = self._temp(self.t)
+        wh_per_km = (
+            150
+            * (1 + max(0.0, 15 - temp) * 0.012)
+            * (1 + max(0.0, avg_speed - 80) * 0.006)
+            * rng.uniform(0.92, 1.1)
+        )
+        pct_per_km = wh_per_km / 1000 / self.capacity_kwh * 100
+        climate = temp < 12 or temp > 26
+        drive_id = self.ids.next("drives")
+        lat0, lon0 = self.lat, self.lon
+        dlat, dlon = dest.latitude - lat0, dest.longitude - lon0
+        # A gentle sideways bow so routes are not ruler-straight.
+        bow = min(0.01, line_km / 111 * 0.08) * rng.choice((-1, 1))
+        start_time, start_km = self.t, self.odometer
+        start_rated = round(self.soc * self._km_per_pct(self.t), 1)
+        speed_max, power_max, power_min = 0, 0, 0
+        first_id = last_id = 0
+        phase = rng.uniform(0, 6.28)
+        ramp_s = min(45, duration_s // 3)
+        for i in range(duration_s + 1):
+            f = i / duration_s
+            ramp = min(1.0, (i + 1) / ramp_s, (duration_s - i + 1) / ramp_s)
+            speed = int(avg_speed * (0.3 + 0.7 * ramp) * (1 + 0.12 * math.sin(i / 41 + phase)))
+            braking = duration_s - i < ramp_s
+            power = -int(speed * 0.25) if braking else int(speed * wh_per_km / 1000 * 1.1)
+            bend = bow * math.sin(math.pi * f)
+            self.lat = round(lat0 + dlat * f - dlon * bend, 6)
+            self.lon = round(lon0 + dlon * f + dlat * bend, 6)
+            if i:
+                self.odometer += step_km
+                self.soc -= step_km * pct_per_km
+            row = self._position(
+                start_time + timedelta(seconds=i),
+                drive_id=drive_id,
+                speed=speed,
+                power=power,
+                temp=temp,
+                climate=climate,
+                tpms=i % _TPMS_EVERY_S == 0,
+            )
+            last_id = row[0]
+            first_id = first_id or last_id
+            speed_max, power_max, power_min = (
+                max(speed_max, speed),
+                max(power_max, power),
+                min(power_min, power),
+            )
+            yield "positions", row
+        self.soc = max(self.soc, 1.0)
+        self.t = start_time + timedelta(seconds=duration_s)
+        yield (
+            "drives",
+            (
+                drive_id,
+                self.car_id,
+                start_time,
+                self.t,
+                round(self.odometer - start_km, 2),
+                max(1, round(duration_s / 60)),
+                speed_max,
+                power_max,
+                power_min,
+                round(start_km, 2),
+                round(self.odometer, 2),
+                round(21 + rng.uniform(-1.5, 1.5), 1),
+                round(temp, 1),
+                self.place.address_id,
+                dest.address_id,
+                start_rated,
+                round(self.soc * self._km_per_pct(self.t), 1),
+                first_id,
+                last_id,
+            ),
+        )
+        self.place = dest
+
+    def charge(self, *, dc: bool, target: float) -> Iterator[tuple[str, Row]]:
+        if self.soc >= target:
+            return
+        rng = self.rng
+        process_id = self.ids.next("charging_processes")
+        start_time, start_soc, temp = self.t, self.soc, self._temp(self.t)
+        start_rated = round(self.soc * self._km_per_pct(self.t), 1)
+        step_s = 20 if dc else 60
+        added = 0.0
+        while self.soc < target:
+            if dc:
+                kw = max(35.0, 150.0 - max(0.0, self.soc - 35) * 2.4) * rng.uniform(0.95, 1.02)
+                voltage, phases = 390 + int(self.soc), None
+            else:
+                kw = float(self.home_ac_kw) * rng.uniform(0.97, 1.0)
+                voltage, phases = 230, 3 if self.home_ac_kw == 11 else 1
+            self.t += timedelta(seconds=step_s)
+            added += kw * step_s / 3600
+            self.soc = min(100.0, self.soc + kw * step_s / 3600 / self.capacity_kwh * 100)
+            yield (
+                "charges",
+                (
+                    self.ids.next("charges"),
+                    process_id,
+                    self.t,
+                    round(self.soc),
+                    round(added, 2),
+                    round(kw),
+                    voltage,
+                    round(kw * 1000 / voltage / (phases or 1)),
+                    phases,
+                    round(self.soc * self._km_per_pct(self.t), 1),
+                    round(temp, 1),
+                ),
+            )
+        used = added * (1.04 if dc else rng.uniform(1.08, 1.14))
+        price = _SUPERCHARGER_PRICE_PER_KWH if dc else _HOME_PRICE_PER_KWH
+        # TeslaMate leaves cost empty unless a geofence prices it or the user
+        # fills it in; keep some gaps for set_charging_cost to backfill.
+        cost = round(used * price, 2) if dc or rng.random() < 0.7 else None
+        position = self._position(self.t, temp=temp)
+        yield "positions", position
+        yield (
+            "charging_processes",
+            (
+                process_id,
+                self.car_id,
+                start_time,
+                self.t,
+                round(added, 2),
+                round(used, 2),
+                max(1, round((self.t - start_time).total_seconds() / 60)),
+                cost,
+                self.place.address_id,
+                self.place.geofence_id,
+                round(start_soc),
+                round(self.soc),
+                start_rated,
+                round(self.soc * self._km_per_pct(self.t), 1),
+                round(temp, 1),
+                position[0],
+            ),
+        )
+
+    # -- the daily routine ----------------------------------------------------------
+
+    def _at(self, day: datetime, hour: float, jitter_h: float = 0.5) -> datetime:
+        hours = hour + self.rng.uniform(-jitter_h, jitter_h)
+        return day + timedelta(seconds=int(hours * 3600))
+
+    def _plan(self, day: datetime) -> list[tuple[datetime, _Place, float]]:
+        """(departure, destination, hours to stay) for the day's trips."""
+        rng = self.rng
+        if rng.random() < 0.015:
+            bearing = rng.uniform(0, 2 * math.pi)
+            lat, lon = _offset(
+                self.home.latitude, self.home.longitude, rng.uniform(150, 320), bearing
+            )
+            dest = self._address(f"{self._street_name()}, day trip", lat, lon, "Countryside")
+            return [(self._at(day, 8.5), dest, rng.uniform(2, 4)), (day, self.home, 0)]
+        if day.weekday() < 5 and rng.random() < 0.85:
+            trips = [(self._at(day, 8.0), self.work, 0), (self._at(day, 17.5), self.home, 0)]
+            if rng.random() < 0.4:
+                trips.append((self._at(day, 19.5), rng.choice(self.places), rng.uniform(0.3, 1.5)))
+                trips.append((day, self.home, 0))
+            return trips
+        trips = []
+        for _ in range(rng.choice((0, 1, 1, 2, 3))):
+            trips.append(
+                (
+                    self._at(day, rng.uniform(10, 17), 0),
+                    rng.choice(self.places),
+                    rng.uniform(0.3, 2),
+                )
+            )
+        if trips:
+            trips.append((day, self.home, 0))
+        return trips
+
+    def run(self, days: int) -> Iterator[tuple[str, Row]]:
+        yield from self.setup()
+        next_update = self.rng.randint(5, 40)
+        version = (2023, 6, 1)
+        for n in range(days):
+            day = self.history_start + timedelta(days=n)
+            for departure, dest, stay_h in self._plan(day):
+                yield from self._flush()
+                # day-bound departures (returns, and trips the previous leg
+                # overran) leave after the stay at the current place.
+                leave = max(departure, self.t + timedelta(minutes=5))
+                yield from self.park_until(leave)
+                yield from self.travel(dest)
+                if stay_h:
+                    yield from self.park_until(self.t + timedelta(hours=stay_h))
+            yield from self._flush()
+            if self.place is self.home and self.soc < self.rng.uniform(45, 70):
+                yield from self.park_until(max(self.t, self._at(day, 22.5)))
+                target = 100.0 if self.rng.random() < 0.06 else self.rng.choice((80.0, 85.0, 90.0))
+                yield from self.charge(dc=False, target=target)
+            if n == next_update:
+                version = (version[0] + (version[1] == 52), version[1] % 52 + 2, 1)
+                start = self._at(day, 2.5, 0.3)
+                yield (
+                    "updates",
+                    (
+                        self.ids.next("updates"),
+                        self.car_id,
+                        f"{version[0]}.{version[1]}.{version[2]}",
+                        start,
+                        start + timedelta(minutes=self.rng.randint(18, 45)),
+                    ),
+                )
+                next_update += self.rng.randint(20, 45)
+        yield from self.park_until(self.history_start + timedelta(days=days))
+
+
+def generate(spec: DatasetSpec) -> Iterator[tuple[str, Row]]:
+    """Yield (table, row) pairs for the whole dataset, in id order within each table."""
+    ids = _Ids()
+    start = datetime.combine(spec.end_date - timedelta(days=spec.days - 1), time.min)
+    for car_id in range(1, spec.cars + 1):
+        rng = random.Random(f"{spec.seed}:{car_id}")
+        yield from _CarSimulation(car_id, spec, ids, start, rng).run(spec.days)
+
+
+def load(
+    conninfo: str,
+    spec: DatasetSpec,
+    *,
+    progress: Callable[[int], None] | None = None,
+) -> dict[str, int]:
+    """Recreate the TeslaMate tables in `conninfo` and COPY the dataset in.
+
+    Returns the row count per table. `progress` is called with the running
+    positions count every million rows.
+    """
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        if conn.execute("SELECT to_regclass('public.schema_migrations')").fetchone()[0]:
+            raise RuntimeError(
+                "The target database has TeslaMate's schema_migrations table; refusing to "
+                "replace a real TeslaMate database with synthetic data."
+            )
+        conn.execute(SCHEMA_SQL)
+
+    counts: Counter[str] = Counter()
+    buffered: dict[str, list[Row]] = {t: [] for t in COLUMNS if t not in _STREAMED}
+    # One connection per streamed table: two COPYs cannot share a connection,
+    # and interleaving them keeps memory flat however long the history is.
+    with psycopg.connect(conninfo) as pos_conn, psycopg.connect(conninfo) as chg_conn:
+        with (
+            pos_conn.cursor().copy(_copy_sql("positions")) as positions,
+            chg_conn.cursor().copy(_copy_sql("charges")) as charges,
+        ):
+            for table, row in generate(spec):
+                counts[table] += 1
+                if table == "positions":
+                    positions.write_row(row)
+                    if progress is not None and counts["positions"] % 1_000_000 == 0:
+                        progress(counts["positions"])
+                elif table == "charges":
+                    charges.write_row(row)
+                else:
+                    buffered[table].append(row)
+        for table, rows in buffered.items():
+            with pos_conn.cursor().copy(_copy_sql(table)) as copy:
+                for row in rows:
+                    copy.write_row(row)
+        pos_conn.commit()
+        chg_conn.commit()
+
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        conn.execute(INDEX_SQL)
+        for table in COLUMNS:
+            conn.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"GREATEST((SELECT MAX(id) FROM {table}), 1))"
+            )
+        conn.execute("ANALYZE")
+    return {table: counts[table] for table in COLUMNS}
+
+
+def _copy_sql(table: str) -> str:
+    return f"COPY {table} ({', '.join(COLUMNS[table])}) FROM STDIN"
@@ -0,0 +1,137 @@
+"""In-process trigram index over `addresses` for the location filters.
+
+`search_drives` and `search_charging_sessions` matched `location` with
+`ILIKE '%x%'` against the joined address names and cities of every
+candidate row. The read-only role cannot create a `pg_trgm` index, so a
+tool that declares an [address_index] table in its sidecar resolves the
+location up front instead. An in-memory index over `addresses.display_name`
+and `addresses.city` maps the text to the ids of matching addresses. The
+SQL then runs its `/*[if address_ids]*/` block, an `= ANY(%(address_ids)s)`
+filter on the address id columns, in place of the `ILIKE` block.
+
+Each lookup first reads addresses above the highest id indexed so far (a
+primary key range scan, usually empty). TeslaMate rarely edits an address
+after inserting it, and an id may commit out of order, so the whole index
+is rebuilt after `ADDRESS_INDEX_REBUILD_S`.
+
+Matching is a case-insensitive substring of either field, as with `ILIKE
+'%x%'`. The trigrams of the text narrow the candidates, and each candidate
+is confirmed with a substring test. Only ASCII letters are folded here:
+how PostgreSQL lowercases other characters depends on the database's
+locale. So text that is not ASCII, or that contains an `ILIKE` wildcard
+(`%`, `_` or `\\`), is left to the SQL. So is text containing a letter that
+an indexed non-ASCII character may lowercase to, such as the `i` of `İ` or
+the `k` of the Kelvin sign.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import string
+import time
+from collections.abc import Set as AbstractSet
+from typing import TYPE_CHECKING, Any
+
+from .month_memo import Query
+
+if TYPE_CHECKING:
+    from .registry import ToolParam
+
+logger = logging.getLogger(__name__)
+
+# The reserved param carrying the resolved address ids.
+ADDRESS_IDS_PARAM = "address_ids"
+_ALLOWED_ADDRESS_INDEX_KEYS = frozenset({"param"})
+_GRAM = 3
+_WILDCARD_RE = re.compile(r"[%_\\]")
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_REFRESH_SQL = """SELECT id, display_name, city
+FROM addresses
+WHERE id > %(after)s::bigint
+ORDER BY id"""
+
+
+def parse_address_index(raw: Any, params: dict[str, ToolParam], source: str) -> str:
+    """Validate the optional [address_index] table and return the location param's name."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [address_index] must be a table")
+    unknown = set(raw) - _ALLOWED_ADDRESS_INDEX_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown address_index key(s) {sorted(unknown)!r}")
+    param = params.get(raw.get("param", ""))
+    if param is None or param.type != "string":
+        raise ValueError(f"{source}: address_index param must name a declared string param")
+    return param.name
+
+
+def _grams(text: str) -> set[str]:
+    return {text[i : i + _GRAM] for i in range(len(text) - _GRAM + 1)}
+
+
+class AddressIndex:
+    """Trigram postings of the ASCII-lowercased address names and cities, by address id."""
+
+    def __init__(self, rebuild_s: float) -> None:
+        self._rebuild_s = rebuild_s
+        self._lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._fields: dict[int, tuple[str, ...]] = {}
+        self._postings: dict[str, set[int]] = {}
+        # ASCII letters some indexed non-ASCII character lowercases to.
+        self._locale_letters: set[str] = set()
+        self._watermark = 0
+        self._built_at = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    @staticmethod
+    def handles(text: str) -> bool:
+        """Whether `text` may be resolved here: ASCII, without ILIKE wildcards."""
+        return text.isascii() and not _WILDCARD_RE.search(text)
+
+    def add(self, address_id: int, *fields: str | None) -> None:
+        lowered = tuple(f.translate(_ASCII_LOWER) for f in fields if f is not None)
+        self._fields[address_id] = lowered
+        for char in set().union(*lowered):
+            if not char.isascii():
+                self._locale_letters.update(c for c in char.lower() if c.isascii())
+        for gram in set().union(*map(_grams, lowered)):
+            self._postings.setdefault(gram, set()).add(address_id)
+        self._watermark = max(self._watermark, address_id)
+
+    def match(self, text: str) -> list[int] | None:
+        """Ids of the addresses with `text` in their name or city, ignoring case.
+
+        None when the answer depends on the database's locale; see the module
+        docstring.
+        """
+        needle = text.translate(_ASCII_LOWER)
+        if not self.handles(text) or self._locale_letters.intersection(needle):
+            return None
+        candidates: AbstractSet[int] = self._fields.keys()
+        # Rarest trigram first: the intersection shrinks fastest.
+        for gram in sorted(_grams(needle), key=lambda g: len(self._postings.get(g, ()))):
+            candidates = candidates & self._postings.get(gram, set())
+            if not candidates:
+                return []
+        return sorted(i for i in candidates if any(needle in f for f in self._fields[i]))
+
+    async def refresh(self, query: Query) -> None:
+        """Index the addresses added since the last refresh, or all of them when stale."""
+        async with self._lock:
+            if time.monotonic() - self._built_at >= self._rebuild_s:
+                self._reset()
+            rows = await query(_REFRESH_SQL, {"after": self._watermark})
+            for row in rows:
+                self.add(row["id"], row["display_name"], row["city"])
+            if rows:
+                logger.info("Address index: %d new address(es), %d in all", len(rows), len(self))
+
+    async def lookup(self, text: str, query: Query) -> list[int] | None:
+        await self.refresh(query)
+        return self.match(text)
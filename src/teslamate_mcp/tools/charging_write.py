@@ -108,13 +108,14 @@ def register_charging_write_tools(mcp: MCPServer) -> None:
     ) -> list[dict[str, Any]]:
         if not (isinstance(confirmation, AcceptedElicitation) and confirmation.data.confirm):
             raise ValueError("Confirmation declined; no cost was written.")
-        pool = ctx.request_context.lifespan_context.pool
+        lifespan_ctx = ctx.request_context.lifespan_context
         logger.info("Setting cost of charging session %d to %s", charging_process_id, cost)
-        rows = await execute_write(
-            pool,
-            _SET_COST_SQL,
-            {"charging_process_id": charging_process_id, "cost": cost},
-        )
+        async with lifespan_ctx.health.breaker.guard():
+            rows = await execute_write(
+                lifespan_ctx.pool,
+                _SET_COST_SQL,
+                {"charging_process_id": charging_process_id, "cost": cost},
+            )
         if not rows:
             raise ValueError(
                 f"No charging session with id {charging_process_id}. "
@@ -0,0 +1,300 @@
+"""Chunked parallel execution of long-window `positions` aggregates.
+
+`get_soc_hygiene` or `get_tire_pressure_weekly_trends` with `days=1825` ran
+as one serial scan on one pooled connection while the rest of the pool sat
+idle. A tool that declares a [chunks] table in its sidecar instead has its
+window split into time ranges that run concurrently, each on its own pool
+connection, through the tool's `/*[if chunk_start]*/` block (a half-open
+`chunk_start <= date < chunk_end` filter). The first and last ranges are
+open-ended, so together the chunks cover exactly the rows of a serial run.
+
+Chunk results are combined in one of two ways:
+
+- With `align` (`day`, `week` or `month`), range edges are snapped to local
+  bucket starts in the report timezone. Each group of a bucketed report then
+  falls in exactly one chunk, and the rows are simply concatenated.
+- Otherwise groups span chunks and are merged on their `key` columns.
+  `[chunks.merge]` names how each column combines (`sum`, `min`, `max`);
+  columns the SQL adds only in chunk mode (inside the `chunk_start` block)
+  carry extra partials, such as a sum behind an average. `[chunks.derive]` then
+  recomputes ratio columns from merged partials in decimal arithmetic,
+  rounding half away from zero like PostgreSQL's `ROUND(numeric, n)`, and
+  returns them as floats, as the serial path returns a numeric.
+
+The merged rows are put back in the SQL's ORDER BY (`order_by`). Chunking
+only applies when the window param reaches `min_window` and the pool has
+room: the chunk count is the pool's free capacity (idle connections plus
+headroom below its cap, less waiting requests) minus one kept for other
+callers, up to `max_chunks`. With fewer than two, the tool runs serially.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import decimal
+import itertools
+import logging
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, TypeVar
+
+import anyio
+from psycopg_pool import AsyncConnectionPool
+
+from .month_memo import Query, in_sql_order, parse_order_by
+
+if TYPE_CHECKING:
+    from .registry import PredefinedTool, ToolOutputColumn, ToolParam
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# The reserved params bounding one chunk's rows.
+CHUNK_START_PARAM = "chunk_start"
+CHUNK_END_PARAM = "chunk_end"
+_ALLOWED_CHUNK_KEYS = frozenset(
+    {"window", "min_window", "max_chunks", "align", "key", "order_by", "merge", "derive"}
+)
+_ALLOWED_DERIVE_KEYS = frozenset({"numerator", "denominator", "factor", "scale"})
+_ALIGN_UNITS = frozenset({"day", "week", "month"})
+
+
+def _combine(pick: Callable[[Any, Any], Any]) -> Callable[[Any, Any], Any]:
+    # Aggregates over no rows are NULL: the other side wins.
+    return lambda a, b: b if a is None else a if b is None else pick(a, b)
+
+
+_MERGERS: dict[str, Callable[[Any, Any], Any]] = {
+    "sum": _combine(lambda a, b: a + b),
+    "min": _combine(min),
+    "max": _combine(max),
+}
+
+
+@dataclass(frozen=True)
+class Derived:
+    """`ROUND(factor * numerator / denominator, scale)` over merged partials."""
+
+    column: str
+    numerator: str
+    denominator: str
+    factor: decimal.Decimal = decimal.Decimal(1)
+    scale: int = 0
+
+    def compute(self, row: dict[str, Any]) -> float | None:
+        numerator, denominator = row[self.numerator], row[self.denominator]
+        if numerator is None or not denominator:
+            return None
+        with decimal.localcontext() as context:
+            context.prec = 40
+            value = self.factor * decimal.Decimal(numerator) / decimal.Decimal(denominator)
+            rounded = value.quantize(decimal.Decimal(1).scaleb(-self.scale), decimal.ROUND_HALF_UP)
+        # A float, as the serial path's rows_to_jsonable makes of a numeric.
+        return float(rounded)
+
+
+@dataclass(frozen=True)
+class ChunkPolicy:
+    """Chunked execution from a .toml [chunks] table; see the module docstring."""
+
+    window: str
+    order_by: tuple[tuple[str, bool], ...]
+    min_window: int = 0
+    max_chunks: int = 4
+    align: str | None = None
+    key: tuple[str, ...] = ()
+    merge: tuple[tuple[str, str], ...] = ()  # (column, merger)
+    derive: tuple[Derived, ...] = ()
+    helpers: frozenset[str] = frozenset()  # chunk-only columns, dropped after merging
+
+    def edges_sql(self) -> str:
+        """The interior chunk edges (UTC timestamps) for `%(chunks)s` equal ranges."""
+        point = "(b.lo + (b.hi - b.lo) * i / %(chunks)s::int)"
+        if self.align is not None:
+            point = (
+                f"(DATE_TRUNC('{self.align}', ({point} AT TIME ZONE 'UTC') AT TIME ZONE "
+                "%(tz)s::text) AT TIME ZONE %(tz)s::text) AT TIME ZONE 'UTC'"
+            )
+        return (
+            f"SELECT DISTINCT {point} AS edge\n"
+            f"FROM (SELECT (CURRENT_DATE - make_interval(days => %({self.window})s::int))"
+            "::timestamp AS lo, now() AT TIME ZONE 'UTC' AS hi) b,\n"
+            "    generate_series(1, %(chunks)s::int - 1) AS i\n"
+            "ORDER BY edge"
+        )
+
+    def combine(self, chunks: Iterable[list[dict[str, Any]]]) -> list[dict[str, Any]]:
+        """One result from the chunks' rows: concatenated if aligned, else merged on `key`."""
+        if self.align is not None:
+            return [row for rows in chunks for row in rows]
+        groups: dict[tuple[Any, ...], dict[str, Any]] = {}
+        for rows in chunks:
+            for row in rows:
+                group = tuple(row[column] for column in self.key)
+                into = groups.get(group)
+                if into is None:
+                    groups[group] = dict(row)
+                    continue
+                for column, merger in self.merge:
+                    into[column] = _MERGERS[merger](into[column], row[column])
+        merged = list(groups.values())
+        for row in merged:
+            for derived in self.derive:
+                row[derived.column] = derived.compute(row)
+            for helper in self.helpers:
+                del row[helper]
+        return merged
+
+
+def parse_chunks(
+    raw: Any,
+    params: dict[str, ToolParam],
+    output: dict[str, ToolOutputColumn],
+    source: str,
+) -> ChunkPolicy:
+    """Validate the optional [chunks] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [chunks] must be a table")
+    unknown = set(raw) - _ALLOWED_CHUNK_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown chunks key(s) {sorted(unknown)!r}")
+    for key in ("window", "order_by"):
+        if key not in raw:
+            raise ValueError(f"{source}: [chunks] is missing key {key!r}")
+    window = params.get(raw["window"])
+    if window is None or window.type != "integer":
+        raise ValueError(f"{source}: chunks window must name a declared integer param (days)")
+    order_by = parse_order_by(raw["order_by"], output, "chunks", source)
+
+    def count(key: str, default: int, minimum: int) -> int:
+        value = raw.get(key, default)
+        if not isinstance(value, int) or isinstance(value, bool) or value < minimum:
+            raise ValueError(f"{source}: chunks {key} must be an integer >= {minimum}")
+        return value
+
+    min_window = count("min_window", 0, 0)
+    max_chunks = count("max_chunks", 4, 2)
+    align = raw.get("align")
+    if align is not None and align not in _ALIGN_UNITS:
+        raise ValueError(f"{source}: chunks align must be one of {sorted(_ALIGN_UNITS)}")
+
+    if align is not None:
+        # Aligned chunks never split a group: there is nothing to merge.
+        if set(raw) & {"key", "merge", "derive"}:
+            raise ValueError(f"{source}: chunks with align take no key, merge or derive")
+        return ChunkPolicy(
+            window=window.name,
+            order_by=order_by,
+            min_window=min_window,
+            max_chunks=max_chunks,
+            align=align,
+        )
+
+    key = raw.get("key")
+    if not isinstance(key, list) or not key or any(name not in output for name in key):
+        raise ValueError(f"{source}: chunks key must list the output columns of a group")
+    merge = raw.get("merge", {})
+    if not isinstance(merge, dict) or any(m not in _MERGERS for m in merge.values()):
+        raise ValueError(f"{source}: chunks merge must map columns to one of {sorted(_MERGERS)}")
+    derive_raw = raw.get("derive", {})
+    if not isinstance(derive_raw, dict):
+        raise ValueError(f"{source}: chunks derive must be a table")
+    derive = []
+    for column, spec in derive_raw.items():
+        if (
+            column not in output
+            or not isinstance(spec, dict)
+            or set(spec) - _ALLOWED_DERIVE_KEYS
+            or spec.get("numerator") not in merge
+            or spec.get("denominator") not in merge
+        ):
+            raise ValueError(
+                f"{source}: chunks derive {column!r} must be an output column with a "
+                "numerator and denominator from [chunks.merge]"
+            )
+        scale = spec.get("scale", 0)
+        if not isinstance(scale, int) or isinstance(scale, bool) or scale < 0:
+            raise ValueError(f"{source}: chunks derive {column!r} scale must be an integer >= 0")
+        derive.append(
+            Derived(
+                column=column,
+                numerator=spec["numerator"],
+                denominator=spec["denominator"],
+                factor=decimal.Decimal(str(spec.get("factor", 1))),
+                scale=scale,
+            )
+        )
+    unmerged = set(output) - set(key) - set(merge) - set(derive_raw)
+    if unmerged:
+        raise ValueError(f"{source}: chunks give no merge or derive for {sorted(unmerged)!r}")
+    return ChunkPolicy(
+        window=window.name,
+        order_by=order_by,
+        min_window=min_window,
+        max_chunks=max_chunks,
+        key=tuple(key),
+        merge=tuple(merge.items()),
+        derive=tuple(derive),
+        helpers=frozenset(merge) - set(output),
+    )
+
+
+def chunk_count(pool: AsyncConnectionPool, max_chunks: int) -> int:
+    """How many queries the pool can run at once, keeping one connection for others."""
+    stats = pool.get_stats()
+    free = (
+        stats["pool_available"]
+        + stats["pool_max"]
+        - stats["pool_size"]
+        - stats.get("requests_waiting", 0)
+    )
+    return max(1, min(max_chunks, free - 1))
+
+
+async def query_in_chunks(
+    tool: PredefinedTool, pool: AsyncConnectionPool, bound: dict[str, Any], query: Query
+) -> list[dict[str, Any]] | None:
+    """Run `tool` as concurrent chunks and combine them; None when it should run serially."""
+    policy = tool.chunks
+    assert policy is not None
+    if bound[policy.window] is None or bound[policy.window] < policy.min_window:
+        return None
+    chunks = chunk_count(pool, policy.max_chunks)
+    if chunks < 2:
+        return None
+    edges = [row["edge"] for row in await query(policy.edges_sql(), bound | {"chunks": chunks})]
+    ranges = ["-infinity", *edges, "infinity"]
+    chunk_params = [
+        bound | {CHUNK_START_PARAM: start, CHUNK_END_PARAM: end}
+        for start, end in itertools.pairwise(ranges)
+    ]
+    results = await run_concurrently(query(tool.render(p), p) for p in chunk_params)
+    logger.info("%s ran in %d chunk(s)", tool.name, len(results))
+    return await in_sql_order(policy.combine(results), policy.order_by, query)
+
+
+async def run_concurrently(queries: Iterable[Awaitable[T]], *, limit: int | None = None) -> list[T]:
+    """Await `queries` concurrently, each on its own pool connection, in order.
+
+    With `limit`, at most that many run at a time. If one fails (or the call
+    is cancelled) the others are stopped before their connections go back to
+    the pool.
+    """
+    gate = asyncio.Semaphore(limit) if limit is not None else None
+
+    async def gated(q: Awaitable[T]) -> T:
+        if gate is None:
+            return await q
+        async with gate:
+            return await q
+
+    tasks = [asyncio.ensure_future(gated(q)) for q in queries]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        with anyio.CancelScope(shield=True):
+            await asyncio.gather(*tasks, return_exceptions=True)
+        raise
@@ -5,13 +5,17 @@ from __future__ import annotations
 import logging
 import re
 import time
-from typing import Any
+from typing import Annotated, Any
 
+import psycopg
+import pydantic_core
 from mcp.server.mcpserver import Context, MCPServer
-from mcp.types import ToolAnnotations
+from mcp.types import CallToolResult, TextContent, ToolAnnotations
 from pydantic import Field
 
+from ..cursors import CursorError, Page
 from ..db import fetch_readonly
+from .registry import deadline_exceeded, requested_timeout_ms
 
 logger = logging.getLogger(__name__)
 
@@ -81,6 +85,32 @@ def enforce_limit(sql: str, default_limit: int) -> str:
     return f"SELECT * FROM ({body}) AS _capped LIMIT {default_limit}"
 
 
+def _page_result(page: Page) -> list[dict[str, Any]] | CallToolResult:
+    """Plain rows for a complete result; rows plus a continuation note otherwise.
+
+    The token goes in a trailing text block (what the model reads) and in
+    `_meta.next_cursor` (what a program reads), so the structured `result`
+    keeps the same shape whether or not more pages follow.
+    """
+    if page.next_cursor is None:
+        return page.rows
+    note = (
+        f"{len(page.rows)} rows returned and more remain. To fetch the next page, "
+        f"call run_sql again with the same query and cursor={page.next_cursor!r}."
+    )
+    return CallToolResult(
+        content=[
+            *(
+                TextContent(type="text", text=pydantic_core.to_json(row, indent=2).decode())
+                for row in page.rows
+            ),
+            TextContent(type="text", text=note),
+        ],
+        structured_content={"result": page.rows},
+        meta={"next_cursor": page.next_cursor},
+    )
+
+
 def register_custom_sql(
     mcp: MCPServer,
     *,
@@ -99,9 +129,12 @@ def register_custom_sql(
     description = (
         "Execute a custom read-only SQL query against the TeslaMate database. "
         "Only SELECT (and WITH ... SELECT) statements are accepted. The query "
-        "runs in a READ ONLY transaction with statement_timeout enforced; if "
-        "no LIMIT is supplied, the result is automatically capped. Call "
-        "`get_database_schema` first to learn the available tables and columns."
+        "runs in a READ ONLY transaction with statement_timeout enforced. "
+        "Results are returned in pages; when more rows remain, the response "
+        "ends with a `cursor` token — call run_sql again with the same query "
+        "and that cursor for the next page, which comes from the same "
+        "snapshot (do not paginate with OFFSET). Call `get_database_schema` "
+        "first to learn the available tables and columns."
     )
 
     async def run_sql(
@@ -111,23 +144,58 @@ def register_custom_sql(
             description="A single SELECT or WITH...SELECT statement.",
             min_length=1,
         ),
-    ) -> list[dict[str, Any]]:
-        try:
-            validate_sql(query)
-        except SqlValidationError as exc:
-            logger.warning("run_sql rejected query: %s", exc)
-            raise
-        capped = enforce_limit(query, row_limit)
-        pool = ctx.request_context.lifespan_context.pool
-
-        logger.info(
-            "run_sql executing %d-char query (timeout %dms)", len(query), statement_timeout_ms
-        )
+        cursor: str | None = Field(
+            default=None,
+            description="Continuation token from the previous page of this same query.",
+        ),
+    ) -> Annotated[CallToolResult, list[dict[str, Any]]]:
+        lifespan_ctx = ctx.request_context.lifespan_context
         start = time.perf_counter()
-        rows = await fetch_readonly(pool, capped, statement_timeout_ms)
+        if cursor is not None:
+            # A held cursor already owns its connection (on whichever server
+            # the first page was routed to), so there is no pool wait to fail
+            # fast on.
+            try:
+                page = await lifespan_ctx.cursors.next_page(cursor, query)
+            except CursorError as exc:
+                logger.warning("run_sql rejected cursor: %s", exc)
+                raise
+        else:
+            try:
+                validate_sql(query)
+            except SqlValidationError as exc:
+                logger.warning("run_sql rejected query: %s", exc)
+                raise
+            # A client deadline only ever tightens QUERY_TIMEOUT_MS.
+            deadline_ms = requested_timeout_ms(ctx)
+            if deadline_ms is not None and deadline_ms >= statement_timeout_ms:
+                deadline_ms = None
+            timeout_ms = deadline_ms or statement_timeout_ms
+            logger.info("run_sql executing %d-char query (timeout %dms)", len(query), timeout_ms)
+            pool, breaker = lifespan_ctx.read_target()
+            try:
+                async with breaker.guard():
+                    page = await lifespan_ctx.cursors.first_page(
+                        pool, query, statement_timeout_ms=timeout_ms
+                    )
+                    if page is None:
+                        # Every cursor slot is taken: serve the pre-paging capped
+                        # result rather than queueing behind another client's cursor.
+                        logger.info("run_sql cursor slots exhausted; returning a capped result")
+                        capped = enforce_limit(query, row_limit)
+                        page = Page(await fetch_readonly(pool, capped, timeout_ms))
+            except psycopg.errors.QueryCanceled as exc:
+                if deadline_ms is None:
+                    raise
+                raise deadline_exceeded("run_sql", deadline_ms) from exc
         elapsed_ms = int((time.perf_counter() - start) * 1000)
-        logger.info("run_sql returned %d row(s) in %dms", len(rows), elapsed_ms)
-        return rows
+        logger.info(
+            "run_sql returned %d row(s) in %dms%s",
+            len(page.rows),
+            elapsed_ms,
+            " (more pages open)" if page.next_cursor else "",
+        )
+        return _page_result(page)
 
     run_sql.__annotations__["ctx"] = Context
     mcp.tool(name="run_sql", description=description, annotations=annotations)(run_sql)
@@ -0,0 +1,220 @@
+"""Keyset pagination for predefined tools that declare a [pagination] table.
+
+The search tools used to cap at `limit` rows with no way to the next page but
+widening the filters, which re-scans. A paginated tool instead returns an
+opaque cursor holding the last row's (sort key, id); the next call adds
+`(key, id) < (last key, last id)` to its WHERE clause, so every page is a
+range scan from where the previous one stopped, however deep. Rows TeslaMate
+inserts meanwhile sort before the cursor (or after it, never between two rows
+already returned), so pages neither repeat nor skip rows.
+
+The .sql file marks where the pieces go:
+
+    WHERE TRUE
+        /*[keyset]*/
+    ORDER BY /*[keyset_order]*/
+    LIMIT %(limit)s::int;
+
+and the sidecar names the sort key (one per `order_param` option) and the
+unique id that breaks ties:
+
+    [pagination]
+    order_param = "order_by"   # optional: an enum param choosing the key
+    id = "d.id"
+    id_column = "drive_id"
+
+    [pagination.keys.distance]
+    sql = "d.distance"
+    column = "distance_km"
+    nullable = true            # NULL keys sort last
+
+Pages are always in descending key order.
+"""
+
+from __future__ import annotations
+
+import base64
+import functools
+import hashlib
+import json
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from mcp.server.mcpserver.exceptions import ToolError
+
+KEYSET_MARKER = "/*[keyset]*/"
+ORDER_MARKER = "/*[keyset_order]*/"
+# Bound by the registry from a decoded cursor; the leading underscore keeps
+# them out of the declarable param namespace.
+AFTER_KEY = "_after_key"
+AFTER_ID = "_after_id"
+
+_ALLOWED_KEYS = frozenset({"order_param", "id", "id_column", "keys", "limit_param"})
+_ALLOWED_KEY_KEYS = frozenset({"sql", "column", "nullable"})
+_SQL_EXPR_RE = re.compile(r"^[a-z_][a-z0-9_]*\.[a-z_][a-z0-9_]*$")
+
+
+class KeysetCursorError(ToolError):
+    """A cursor that is malformed, or reused with other filters or another order."""
+
+
+@dataclass(frozen=True)
+class SortKey:
+    sql: str  # column expression, e.g. `d.start_date`
+    column: str  # the output column carrying its value
+    nullable: bool = False
+
+
+@dataclass(frozen=True)
+class Pagination:
+    id_sql: str
+    id_column: str
+    keys: dict[str, SortKey]  # by order_param option; one entry without order_param
+    order_param: str | None = None
+    limit_param: str = "limit"
+
+    def key_for(self, bound: dict[str, Any]) -> tuple[str, SortKey]:
+        option = bound[self.order_param] if self.order_param else next(iter(self.keys))
+        return option, self.keys[option]
+
+
+def _column(value: Any, what: str, source: str) -> str:
+    if not isinstance(value, str) or not _SQL_EXPR_RE.match(value):
+        raise ValueError(f"{source}: [pagination] {what} must be a qualified column like 'd.id'")
+    return value
+
+
+def parse_pagination(raw: Any, source: str) -> Pagination:
+    """Validate a [pagination] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [pagination] must be a table")
+    unknown = set(raw) - _ALLOWED_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown pagination key(s) {sorted(unknown)!r}")
+    for key in ("id", "id_column", "keys"):
+        if key not in raw:
+            raise ValueError(f"{source}: [pagination] is missing required key {key!r}")
+    raw_keys = raw["keys"]
+    if not isinstance(raw_keys, dict) or not raw_keys:
+        raise ValueError(f"{source}: [pagination.keys] must be a non-empty table")
+    keys = {}
+    for option, spec in raw_keys.items():
+        if not isinstance(spec, dict) or set(spec) - _ALLOWED_KEY_KEYS or "column" not in spec:
+            raise ValueError(
+                f"{source}: [pagination.keys.{option}] needs 'sql' and 'column' "
+                "(and optionally 'nullable')"
+            )
+        nullable = spec.get("nullable", False)
+        if not isinstance(nullable, bool):
+            raise ValueError(f"{source}: [pagination.keys.{option}] nullable must be a boolean")
+        keys[option] = SortKey(
+            sql=_column(spec.get("sql"), f"keys.{option}.sql", source),
+            column=spec["column"],
+            nullable=nullable,
+        )
+    order_param = raw.get("order_param")
+    if order_param is None and len(keys) != 1:
+        raise ValueError(f"{source}: [pagination] without order_param takes exactly one key")
+    return Pagination(
+        id_sql=_column(raw["id"], "id", source),
+        id_column=raw["id_column"],
+        keys=keys,
+        order_param=order_param,
+        limit_param=raw.get("limit_param", "limit"),
+    )
+
+
+def validate_pagination(
+    pagination: Pagination | None,
+    sql: str,
+    params: dict[str, Any],
+    output_columns: set[str],
+    source: str,
+) -> None:
+    """Cross-check a [pagination] table against the SQL markers, params and [[output]]."""
+    markers = sql.count(KEYSET_MARKER), sql.count(ORDER_MARKER)
+    if pagination is None:
+        if markers != (0, 0):
+            raise ValueError(f"{source}: keyset markers in the SQL need a [pagination] table")
+        return
+    if markers != (1, 1):
+        raise ValueError(
+            f"{source}: [pagination] needs exactly one {KEYSET_MARKER} (in WHERE) "
+            f"and one {ORDER_MARKER} (the ORDER BY list)"
+        )
+    limit = params.get(pagination.limit_param)
+    if limit is None or limit.type != "integer" or limit.maximum is None:
+        raise ValueError(
+            f"{source}: [pagination] needs an integer {pagination.limit_param!r} param "
+            "with a maximum"
+        )
+    if pagination.order_param is not None:
+        order = params.get(pagination.order_param)
+        if order is None or order.enum is None or set(order.enum) != set(pagination.keys):
+            raise ValueError(
+                f"{source}: [pagination.keys] must have one entry per {pagination.order_param!r} "
+                "enum value"
+            )
+        if order.default is None:
+            raise ValueError(f"{source}: {pagination.order_param!r} needs a default")
+    for column in (pagination.id_column, *(k.column for k in pagination.keys.values())):
+        if column not in output_columns:
+            raise ValueError(f"{source}: [pagination] column {column!r} is not in [[output]]")
+
+
+@functools.lru_cache(maxsize=256)
+def expand_keyset(sql: str, key: SortKey, id_sql: str, after: str | None) -> str:
+    """Fill the keyset markers. `after` is None (first page), "value" or "null".
+
+    Each combination is one stable string, like the conditional-block variants.
+    """
+    direction = "DESC NULLS LAST" if key.nullable else "DESC"
+    order = f"{key.sql} {direction}, {id_sql} DESC"
+    k, i = f"%({AFTER_KEY})s", f"%({AFTER_ID})s"
+    if after is None:
+        predicate = ""
+    elif after == "null":
+        # Past the last non-null key: only the NULL tail remains, by id.
+        predicate = f"AND {key.sql} IS NULL AND {id_sql} < {i}"
+    elif key.nullable:
+        predicate = (
+            f"AND ({key.sql} < {k} OR ({key.sql} = {k} AND {id_sql} < {i}) OR {key.sql} IS NULL)"
+        )
+    else:
+        # A row comparison is a single index range condition.
+        predicate = f"AND ({key.sql}, {id_sql}) < ({k}, {i})"
+    return sql.replace(KEYSET_MARKER, predicate).replace(ORDER_MARKER, order)
+
+
+def filters_digest(bound: dict[str, Any], pagination: Pagination) -> str:
+    """Identify the call's filters, so a cursor cannot continue a different search."""
+    filters = {
+        name: value
+        for name, value in bound.items()
+        if name not in (pagination.limit_param, AFTER_KEY, AFTER_ID)
+    }
+    encoded = json.dumps(filters, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def encode_cursor(option: str, key: Any, row_id: Any, digest: str) -> str:
+    payload = json.dumps([option, key, row_id, digest], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str, option: str, digest: str) -> tuple[Any, Any]:
+    """The (key, id) a cursor continues after; raises KeysetCursorError on any mismatch."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        cursor_option, key, row_id, cursor_digest = json.loads(
+            base64.urlsafe_b64decode(padded.encode("ascii"))
+        )
+    except (ValueError, TypeError, UnicodeError) as exc:
+        raise KeysetCursorError("Malformed cursor; start again without one") from exc
+    if cursor_option != option or cursor_digest != digest:
+        raise KeysetCursorError(
+            "This cursor belongs to a search with other filters or another order; "
+            "repeat the original arguments or start again without a cursor"
+        )
+    return key, row_id
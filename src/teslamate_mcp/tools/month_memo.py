@@ -0,0 +1,252 @@
+"""Memoized closed months for the monthly report tools.
+
+`get_monthly_driving_summary` and its kin re-aggregated every month of their
+window on every call, although only the current month (and any month
+receiving late data) can change. A tool whose every result row is one month
+group declares a [memo] table in its sidecar, and the registry then answers
+in three steps:
+
+1. A state query over the bucketed table alone (no joins) returns each
+   month's fingerprint: row count, highest id and the sum of the rows'
+   `xmin`, so an insert, update or delete anywhere in the month changes it.
+   The `cars` table's own fingerprint is folded in (a rename changes every
+   row). A month is *memoizable* when it has ended in the report timezone,
+   has no open (`end_date IS NULL`) rows, and lies wholly inside the call's
+   window (the [memo] `inside` expression), so the window does not shape it.
+2. Memoizable months whose fingerprint matches a memo entry are served from
+   memory; the tool's SQL runs with those months excluded through its
+   `/*[if memo_skip]*/` block. With nothing memoized the block is dropped and
+   the query is exactly the full recompute.
+3. The months just computed are memoized under the fingerprint read *before*
+   the query, so a write landing in between can only cause a later miss,
+   never a stale hit. The merged rows are put back in the SQL's ORDER BY
+   (the [memo] `order_by`), ranking text through PostgreSQL so collation
+   matches.
+
+Entries are keyed by tool, query version, the arguments other than the
+window, and month, and held in a bounded in-process LRU (`MONTH_MEMO_MAX_ENTRIES`).
+"""
+
+from __future__ import annotations
+
+import logging
+import re
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from ..entity_cache import variant_digest
+
+if TYPE_CHECKING:
+    from .registry import PredefinedTool, ToolOutputColumn, ToolParam
+
+logger = logging.getLogger(__name__)
+
+# The reserved param naming the months a memoized call must not recompute.
+MEMO_SKIP_PARAM = "memo_skip"
+_ALLOWED_MEMO_KEYS = frozenset(
+    {"table", "date_column", "month_column", "order_by", "window", "inside", "when"}
+)
+_MEMO_TABLES = frozenset({"drives", "charging_processes"})
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s")
+
+Query = Callable[[str, dict[str, Any]], Awaitable[list[dict[str, Any]]]]
+
+
+@dataclass(frozen=True)
+class MonthMemoPolicy:
+    """Month memoization from a .toml [memo] table; see the module docstring."""
+
+    table: str
+    date_column: str
+    month_column: str
+    order_by: tuple[tuple[str, bool], ...]  # (column, descending)
+    window: frozenset[str] = frozenset()
+    inside: str = "TRUE"
+    when: tuple[tuple[str, Any], ...] = ()  # (param, value) a call must match
+
+    def applies(self, bound: dict[str, Any]) -> bool:
+        return all(bound.get(name) == value for name, value in self.when)
+
+    def state_sql(self) -> str:
+        """One row per month of the table: its fingerprint and whether it may be memoized."""
+        local = f"(t.{self.date_column} AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s::text"
+        return f"""WITH months AS (
+    SELECT DATE_TRUNC('month', {local}) AS month_start,
+        COUNT(*) AS n,
+        MAX(t.id) AS max_id,
+        SUM(t.xmin::text::bigint) AS xmin_sum,
+        BOOL_OR(t.end_date IS NULL) AS open
+    FROM {self.table} t
+    GROUP BY 1
+),
+cars_state AS (
+    SELECT COUNT(*) || '/' || COALESCE(SUM(xmin::text::bigint), 0) AS fingerprint FROM cars
+)
+SELECT TO_CHAR(m.month_start, 'YYYY-MM') AS month,
+    m.n || '/' || m.max_id || '/' || m.xmin_sum || '/' || cs.fingerprint AS fingerprint,
+    NOT m.open
+        AND m.month_start < DATE_TRUNC('month', now() AT TIME ZONE %(tz)s::text)
+        AND COALESCE(({self.inside}), FALSE) AS memoizable
+FROM months m
+    CROSS JOIN cars_state cs
+    CROSS JOIN LATERAL (SELECT m.month_start + interval '1 month' AS month_end) bounds"""
+
+
+def parse_order_by(
+    raw: Any, output: dict[str, ToolOutputColumn], table: str, source: str
+) -> tuple[tuple[str, bool], ...]:
+    """Validate a sidecar `order_by` list: string output columns, '-name' for descending."""
+    if not isinstance(raw, list) or not raw:
+        raise ValueError(f"{source}: {table} order_by must be a non-empty list of output columns")
+    order_by = []
+    for item in raw:
+        name = item.removeprefix("-") if isinstance(item, str) else None
+        column = output.get(name) if name else None
+        if column is None or column.type != "string":
+            raise ValueError(
+                f"{source}: {table} order_by entry {item!r} must name a string output column "
+                "('-name' for descending)"
+            )
+        order_by.append((column.name, item.startswith("-")))
+    return tuple(order_by)
+
+
+def parse_memo(
+    raw: Any,
+    params: dict[str, ToolParam],
+    output: dict[str, ToolOutputColumn],
+    source: str,
+) -> MonthMemoPolicy:
+    """Validate the optional [memo] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [memo] must be a table")
+    unknown = set(raw) - _ALLOWED_MEMO_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown memo key(s) {sorted(unknown)!r}")
+    for key in ("table", "date_column", "month_column", "order_by"):
+        if key not in raw:
+            raise ValueError(f"{source}: [memo] is missing key {key!r}")
+    if raw["table"] not in _MEMO_TABLES:
+        raise ValueError(
+            f"{source}: memo table {raw['table']!r} is not one of {sorted(_MEMO_TABLES)}"
+        )
+    if not isinstance(raw["date_column"], str) or not _IDENTIFIER_RE.match(raw["date_column"]):
+        raise ValueError(f"{source}: memo date_column must be a column name")
+    if output.get(raw["month_column"]) is None:
+        raise ValueError(
+            f"{source}: memo month_column {raw['month_column']!r} is not an output column"
+        )
+
+    order_by = parse_order_by(raw["order_by"], output, "memo", source)
+
+    window = raw.get("window", [])
+    if not isinstance(window, list) or any(name not in params for name in window):
+        raise ValueError(f"{source}: memo window must list declared params")
+    inside = raw.get("inside", "TRUE")
+    if not isinstance(inside, str) or not inside.strip():
+        raise ValueError(f"{source}: memo inside must be a SQL boolean expression")
+    unknown = set(_PLACEHOLDER_RE.findall(inside)) - set(params) - {"tz"}
+    if unknown:
+        raise ValueError(
+            f"{source}: memo inside uses undeclared placeholder(s) {sorted(unknown)!r}"
+        )
+    when = raw.get("when", {})
+    if not isinstance(when, dict) or any(name not in params for name in when):
+        raise ValueError(f"{source}: memo when must map declared params to values")
+    return MonthMemoPolicy(
+        table=raw["table"],
+        date_column=raw["date_column"],
+        month_column=raw["month_column"],
+        order_by=order_by,
+        window=frozenset(window),
+        inside=inside,
+        when=tuple(sorted(when.items())),
+    )
+
+
+class MonthMemo:
+    """Bounded LRU of memoized month rows, each stored with its fingerprint."""
+
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._entries: OrderedDict[tuple[str, ...], tuple[str, list[dict[str, Any]]]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple[str, ...], fingerprint: str) -> list[dict[str, Any]] | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple[str, ...], fingerprint: str, rows: list[dict[str, Any]]) -> None:
+        self._entries[key] = (fingerprint, rows)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+
+def month_of(value: Any) -> str:
+    """'YYYY-MM' of a month column value (an ISO timestamp or already 'YYYY-MM')."""
+    return str(value)[:7]
+
+
+async def query_with_memo(
+    tool: PredefinedTool, memo: MonthMemo, bound: dict[str, Any], query: Query
+) -> list[dict[str, Any]]:
+    """Run `tool` with its memoized closed months served from `memo`."""
+    policy = tool.memo
+    assert policy is not None
+    variant = variant_digest({k: v for k, v in bound.items() if k not in policy.window})
+    states = await query(policy.state_sql(), bound)
+
+    def key(month: str) -> tuple[str, ...]:
+        return (tool.name, tool.version, variant, month)
+
+    served: dict[str, list[dict[str, Any]]] = {}
+    for state in states:
+        if state["memoizable"]:
+            rows = memo.get(key(state["month"]), state["fingerprint"])
+            if rows is not None:
+                served[state["month"]] = rows
+
+    live = bound | {MEMO_SKIP_PARAM: sorted(served) or None}
+    rows = await query(tool.render(live), live)
+
+    fresh: dict[str, list[dict[str, Any]]] = {}
+    for row in rows:
+        fresh.setdefault(month_of(row[policy.month_column]), []).append(row)
+    for state in states:
+        if state["memoizable"] and state["month"] not in served:
+            memo.put(key(state["month"]), state["fingerprint"], fresh.get(state["month"], []))
+    logger.info("%s: %d month(s) from the memo", tool.name, len(served))
+    if not served:
+        return rows
+    merged = rows + [row for month in sorted(served) for row in served[month]]
+    return await in_sql_order(merged, policy.order_by, query)
+
+
+async def in_sql_order(
+    rows: list[dict[str, Any]], order_by: tuple[tuple[str, bool], ...], query: Query
+) -> list[dict[str, Any]]:
+    """Sort `rows` as the tool's ORDER BY would, ranking values with PostgreSQL's collation."""
+    values = sorted({str(row[c]) for row in rows for c, _ in order_by if row[c] is not None})
+    ranked = await query(
+        "SELECT v FROM unnest(%(values)s::text[]) AS v ORDER BY v", {"values": values}
+    )
+    rank = {row["v"]: i for i, row in enumerate(ranked)}
+    # Stable sorts from the last key to the first; NULLs sort as PostgreSQL
+    # does (last ascending, first descending).
+    for column, descending in reversed(order_by):
+        rows.sort(
+            key=lambda row, c=column: (row[c] is None, rank.get(str(row[c]), 0)),
+            reverse=descending,
+        )
+    return rows
@@ -2,41 +2,134 @@
 
 from __future__ import annotations
 
+import functools
+import hashlib
 import inspect
+import itertools
 import logging
 import re
 import tomllib
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from importlib.resources import as_file, files
 from pathlib import Path
 from typing import Annotated, Any, Literal
 
+import psycopg
+import pydantic_core
 from mcp.server.mcpserver import Context, MCPServer
-from mcp.types import ToolAnnotations
+from mcp.server.mcpserver.exceptions import ToolError
+from mcp.types import CallToolResult, TextContent, ToolAnnotations
 from pydantic import BaseModel, ConfigDict, Field, create_model
 
 from ..db import fetch_all
+from ..entity_cache import EntityCache, variant_digest
+from ..spool import SpooledResult, SpoolError
+from .address_index import ADDRESS_IDS_PARAM, AddressIndex, parse_address_index
+from .chunked import (
+    CHUNK_END_PARAM,
+    CHUNK_START_PARAM,
+    ChunkPolicy,
+    parse_chunks,
+    query_in_chunks,
+)
+from .keyset import (
+    AFTER_ID,
+    AFTER_KEY,
+    Pagination,
+    decode_cursor,
+    encode_cursor,
+    expand_keyset,
+    filters_digest,
+    parse_pagination,
+    validate_pagination,
+)
+from .month_memo import MEMO_SKIP_PARAM, MonthMemo, MonthMemoPolicy, parse_memo, query_with_memo
+from .sampling import (
+    APPROXIMATE_PARAM,
+    SAMPLE_PERCENT_PARAM,
+    SAMPLE_SEED_PARAM,
+    Sampled,
+    SamplePolicy,
+    parse_sample,
+    query_sampled,
+)
+from .shared_scan import ScanPolicy, SharedScans, parse_scan
+from .sql_lint import RULES as LINT_RULES
+from .sql_lint import lint_sql
 
 logger = logging.getLogger(__name__)
 
-_PARAM_TYPES: dict[str, type] = {
+_PARAM_TYPES: dict[str, Any] = {
     "string": str,
     "integer": int,
     "number": float,
     "boolean": bool,
+    # Bound as PostgreSQL arrays, for set-based lookups: `id = ANY(%(ids)s::int[])`.
+    "integer[]": list[int],
+    "string[]": list[str],
 }
+# Tool `_meta` key listing alternative params of which a call must pass one.
+ONE_OF_META_KEY = "teslamate/one_of"
+# Request `_meta` key a client sets to bound one call, in milliseconds.
+TIMEOUT_META_KEY = "teslamate/timeout_ms"
+_ARRAY_ITEM_TYPES = {"integer[]": "integer", "string[]": "string"}
+# Arrays are capped so one call cannot turn into an unbounded IN-list.
+_DEFAULT_MAX_ITEMS = 100
 _PARAM_NAME_RE = re.compile(r"^[a-z][a-z0-9_]{0,29}$")
 _PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s")
 # A bare % that is neither %% nor the start of a %(name)s placeholder breaks
 # psycopg's client-side substitution once a params argument is supplied.
 _STRAY_PERCENT_RE = re.compile(r"(?<!%)%(?![%(])")
 # "tz" is injected by the registry from Settings.report_timezone; "ctx" is the
-# MCP context argument. Neither may be declared as a user-facing param.
-_RESERVED_PARAM_NAMES = frozenset({"ctx", "tz"})
+# MCP context argument; "cursor" is added to paginated tools; "memo_skip" is
+# bound for [memo] tools and "chunk_start"/"chunk_end" for [chunks] tools;
+# [sample] tools gain "approximate" and bind "sample_percent"/"sample_seed";
+# [address_index] tools bind "address_ids".
+# None may be declared as a user-facing param.
+_RESERVED_PARAM_NAMES = frozenset(
+    {
+        "ctx",
+        "tz",
+        "cursor",
+        MEMO_SKIP_PARAM,
+        CHUNK_START_PARAM,
+        CHUNK_END_PARAM,
+        APPROXIMATE_PARAM,
+        SAMPLE_PERCENT_PARAM,
+        SAMPLE_SEED_PARAM,
+        ADDRESS_IDS_PARAM,
+    }
+)
 _ALLOWED_PARAM_KEYS = frozenset(
-    {"name", "type", "description", "required", "default", "minimum", "maximum", "enum"}
+    {
+        "name",
+        "type",
+        "description",
+        "required",
+        "default",
+        "minimum",
+        "maximum",
+        "enum",
+        "max_items",
+    }
 )
 _ALLOWED_OUTPUT_KEYS = frozenset({"name", "type", "description"})
+_ALLOWED_EXECUTION_KEYS = frozenset(
+    {"timeout_ms", "max_rows", "work_mem", "jit", "max_parallel_workers_per_gather"}
+)
+_ALLOWED_CACHE_KEYS = frozenset({"entity", "id_param", "ids_param", "id_column"})
+# Tables whose rows are final once `end_date` is set: a [cache] entity.
+_CACHE_ENTITIES = frozenset({"drives", "charging_processes"})
+# PostgreSQL memory units; a bare number is kB.
+_WORK_MEM_RE = re.compile(r"^[1-9][0-9]*\s*(kB|MB|GB)?$")
+# `/*[if name]*/ … /*[end]*/` keeps its body only when param `name` is not
+# None. Being comments, the markers leave the raw file runnable SQL.
+_BLOCK_MARKER_RE = re.compile(r"/\*\[\s*(?:if\s+(\w+)|(end))\s*\]\*/")
+# Every combination is checked at discovery up to this many conditions.
+_MAX_CHECKED_CONDITIONS = 8
+# Rows a spooled result's summary still carries inline.
+_SPOOL_PREVIEW_ROWS = 5
 
 
 @dataclass(frozen=True)
@@ -51,6 +144,7 @@ class ToolParam:
     minimum: int | float | None = None
     maximum: int | float | None = None
     enum: tuple[str, ...] | None = None
+    max_items: int | None = None  # array types only
 
 
 @dataclass(frozen=True)
@@ -67,6 +161,54 @@ class ToolOutputColumn:
     description: str | None = None
 
 
+@dataclass(frozen=True)
+class ExecutionPolicy:
+    """Per-tool execution settings from a .toml [execution] table.
+
+    Unset fields inherit the connection's settings (the pool-wide
+    `statement_timeout`, the server's planner defaults, no row cap).
+    `max_rows` only caps the rows fetched; it does not bound the rows the
+    server scans or sorts, which only `timeout_ms` limits.
+    """
+
+    timeout_ms: int | None = None
+    max_rows: int | None = None
+    work_mem: str | None = None
+    jit: bool | None = None
+    max_parallel_workers_per_gather: int | None = None
+
+    def settings(self) -> dict[str, str]:
+        """The GUCs to `SET LOCAL` around the query, by PostgreSQL name."""
+        values = {
+            "statement_timeout": self.timeout_ms,
+            "work_mem": self.work_mem,
+            "jit": None if self.jit is None else ("on" if self.jit else "off"),
+            "max_parallel_workers_per_gather": self.max_parallel_workers_per_gather,
+        }
+        return {name: str(value) for name, value in values.items() if value is not None}
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """Per-entity result caching from a .toml [cache] table; see `entity_cache`.
+
+    The tool answers `id_param` (one entity) or `ids_param` (several), and
+    each result row names its entity in `id_column`. The SQL must order rows
+    by that column first, so cached and fresh entities merge in id order.
+    """
+
+    entity: str
+    id_param: str
+    ids_param: str
+    id_column: str
+
+    def finished_sql(self) -> str:
+        """Which of `%(ids)s` have ended, and so can be cached."""
+        return (
+            f"SELECT id FROM {self.entity} WHERE id = ANY(%(ids)s::int[]) AND end_date IS NOT NULL"
+        )
+
+
 @dataclass(frozen=True)
 class PredefinedTool:
     """A SQL query exposed as an MCP tool, declared via a .sql + .toml pair."""
@@ -78,6 +220,37 @@ class PredefinedTool:
     params: tuple[ToolParam, ...] = field(default=())
     uses_tz: bool = False
     output: tuple[ToolOutputColumn, ...] = field(default=())
+    lint_allow: frozenset[str] = frozenset()
+    conditions: tuple[str, ...] = field(default=())  # params gating /*[if]*/ blocks
+    one_of: tuple[str, ...] = field(default=())  # at least one must be non-null per call
+    execution: ExecutionPolicy = field(default_factory=ExecutionPolicy)
+    pagination: Pagination | None = None
+    cache: CachePolicy | None = None
+    memo: MonthMemoPolicy | None = None
+    chunks: ChunkPolicy | None = None
+    sample: SamplePolicy | None = None
+    scan: ScanPolicy | None = None
+    address_index: str | None = None  # the location param resolved through the AddressIndex
+
+    @functools.cached_property
+    def version(self) -> str:
+        """A digest of the SQL: cached results of an edited query are never served."""
+        return hashlib.sha256(self.sql.encode()).hexdigest()[:16]
+
+    def render(self, bound: dict[str, Any]) -> str:
+        """The SQL for one call: conditional blocks whose param is None are dropped,
+        and keyset markers are filled for the chosen order and cursor (if any)."""
+        sql = self.sql
+        if self.conditions:
+            active = frozenset(name for name in self.conditions if bound.get(name) is not None)
+            sql = expand_conditional_sql(sql, active)
+        if self.pagination is not None:
+            _, key = self.pagination.key_for(bound)
+            after = None
+            if AFTER_ID in bound:
+                after = "null" if bound[AFTER_KEY] is None else "value"
+            sql = expand_keyset(sql, key, self.pagination.id_sql, after)
+        return sql
 
 
 def _queries_dir() -> Path:
@@ -88,6 +261,11 @@ def _queries_dir() -> Path:
 
 
 def _default_matches_type(default: Any, param_type: str) -> bool:
+    if param_type in _ARRAY_ITEM_TYPES:
+        item_type = _ARRAY_ITEM_TYPES[param_type]
+        return isinstance(default, list) and all(
+            _default_matches_type(item, item_type) for item in default
+        )
     # bool is checked first because isinstance(True, int) is True in Python.
     if param_type == "boolean":
         return isinstance(default, bool)
@@ -161,6 +339,16 @@ def _parse_param(raw: Any, source: str) -> ToolParam:
         if "default" in raw and default not in enum:
             raise ValueError(f"{source}: param {name!r} default {default!r} is not in enum")
 
+    max_items: int | None = None
+    if param_type in _ARRAY_ITEM_TYPES:
+        max_items = raw.get("max_items", _DEFAULT_MAX_ITEMS)
+        if isinstance(max_items, bool) or not isinstance(max_items, int) or max_items < 1:
+            raise ValueError(f"{source}: param {name!r} max_items must be a positive integer")
+        if "default" in raw and not 1 <= len(default) <= max_items:
+            raise ValueError(f"{source}: param {name!r} default must have 1..{max_items} items")
+    elif "max_items" in raw:
+        raise ValueError(f"{source}: param {name!r} max_items only applies to array types")
+
     return ToolParam(
         name=name,
         type=param_type,
@@ -170,6 +358,89 @@ def _parse_param(raw: Any, source: str) -> ToolParam:
         minimum=minimum,
         maximum=maximum,
         enum=enum,
+        max_items=max_items,
+    )
+
+
+def _parse_one_of(raw: Any, params: tuple[ToolParam, ...], source: str) -> tuple[str, ...]:
+    """Validate the optional `one_of` list: alternative params, at least one given per call."""
+    if not isinstance(raw, list) or not all(isinstance(name, str) for name in raw):
+        raise ValueError(f"{source}: 'one_of' must be a list of param names")
+    by_name = {p.name: p for p in params}
+    for name in raw:
+        if name not in by_name:
+            raise ValueError(f"{source}: one_of names undeclared param {name!r}")
+        if by_name[name].required or by_name[name].default is not None:
+            raise ValueError(f"{source}: one_of param {name!r} must be optional with no default")
+    if raw and len(raw) < 2:
+        raise ValueError(f"{source}: one_of needs at least two params")
+    return tuple(raw)
+
+
+def _parse_execution(raw: Any, source: str) -> ExecutionPolicy:
+    """Validate the optional [execution] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [execution] must be a table")
+    unknown = set(raw) - _ALLOWED_EXECUTION_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown execution key(s) {sorted(unknown)!r}")
+
+    def integer(key: str, minimum: int) -> int | None:
+        value = raw.get(key)
+        if value is not None and (
+            isinstance(value, bool) or not isinstance(value, int) or value < minimum
+        ):
+            raise ValueError(f"{source}: execution {key} must be an integer >= {minimum}")
+        return value
+
+    work_mem = raw.get("work_mem")
+    if work_mem is not None and (not isinstance(work_mem, str) or not _WORK_MEM_RE.match(work_mem)):
+        raise ValueError(f"{source}: execution work_mem {work_mem!r} is not a size like '64MB'")
+    jit = raw.get("jit")
+    if jit is not None and not isinstance(jit, bool):
+        raise ValueError(f"{source}: execution jit must be a boolean")
+    return ExecutionPolicy(
+        timeout_ms=integer("timeout_ms", 1),
+        max_rows=integer("max_rows", 1),
+        work_mem=work_mem,
+        jit=jit,
+        max_parallel_workers_per_gather=integer("max_parallel_workers_per_gather", 0),
+    )
+
+
+def _parse_cache(
+    raw: Any,
+    params: dict[str, ToolParam],
+    output: set[str],
+    pagination: Pagination | None,
+    source: str,
+) -> CachePolicy:
+    """Validate the optional [cache] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [cache] must be a table")
+    unknown = set(raw) - _ALLOWED_CACHE_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown cache key(s) {sorted(unknown)!r}")
+    missing = _ALLOWED_CACHE_KEYS - set(raw)
+    if missing:
+        raise ValueError(f"{source}: [cache] is missing key(s) {sorted(missing)!r}")
+    if pagination is not None:
+        raise ValueError(f"{source}: [cache] cannot be combined with [pagination]")
+    if raw["entity"] not in _CACHE_ENTITIES:
+        raise ValueError(
+            f"{source}: cache entity {raw['entity']!r} is not one of {sorted(_CACHE_ENTITIES)}"
+        )
+    for key, param_type in (("id_param", "integer"), ("ids_param", "integer[]")):
+        param = params.get(raw[key])
+        if param is None or param.type != param_type:
+            raise ValueError(f"{source}: cache {key} must name a declared {param_type} param")
+    if raw["id_column"] not in output:
+        raise ValueError(f"{source}: cache id_column {raw['id_column']!r} is not an output column")
+    return CachePolicy(
+        entity=raw["entity"],
+        id_param=raw["id_param"],
+        ids_param=raw["ids_param"],
+        id_column=raw["id_column"],
     )
 
 
@@ -202,22 +473,109 @@ def _parse_output_column(raw: Any, source: str) -> ToolOutputColumn:
     return ToolOutputColumn(name=name, type=col_type, description=description)
 
 
-def _validate_sql_placeholders(sql: str, params: tuple[ToolParam, ...], source: str) -> bool:
+def _split_blocks(sql: str, source: str) -> list[tuple[str | None, str]]:
+    """Split SQL into (condition, text) segments; condition None is unconditional."""
+    segments: list[tuple[str | None, str]] = []
+    condition: str | None = None
+    pos = 0
+    for marker in _BLOCK_MARKER_RE.finditer(sql):
+        segments.append((condition, sql[pos : marker.start()]))
+        pos = marker.end()
+        name = marker.group(1)
+        if name is not None:
+            if condition is not None:
+                raise ValueError(f"{source}: /*[if {name}]*/ is nested inside /*[if {condition}]*/")
+            condition = name
+        elif condition is None:
+            raise ValueError(f"{source}: /*[end]*/ without a matching /*[if ...]*/")
+        else:
+            condition = None
+    if condition is not None:
+        raise ValueError(f"{source}: /*[if {condition}]*/ is never closed with /*[end]*/")
+    segments.append((None, sql[pos:]))
+    return segments
+
+
+@functools.lru_cache(maxsize=1024)
+def expand_conditional_sql(sql: str, active: frozenset[str]) -> str:
+    """Keep the bodies of blocks whose condition is in `active`, drop the rest.
+
+    Cached per (query, active set): a tool has at most 2**conditions distinct
+    texts, each stable, so psycopg's per-connection prepared statements (keyed
+    by query text) still apply.
+    """
+    return "".join(
+        text
+        for condition, text in _split_blocks(sql, "query")
+        if condition in active or condition is None
+    )
+
+
+def _validate_conditions(
+    sql: str,
+    params: tuple[ToolParam, ...],
+    source: str,
+    injected: frozenset[str] = frozenset(),
+) -> tuple[str, ...]:
+    """Check /*[if]*/ blocks and return the params that gate them, in file order.
+
+    `injected` names are bound by the registry (a [memo] tool's `memo_skip`)
+    and may gate blocks without being declared.
+    """
+    segments = _split_blocks(sql, source)
+    by_name = {p.name: p for p in params}
+    conditions = tuple(dict.fromkeys(c for c, _ in segments if c is not None))
+    for name in conditions:
+        if name in injected:
+            continue
+        if name not in by_name:
+            raise ValueError(f"{source}: /*[if {name}]*/ does not name a declared param")
+        if by_name[name].required:
+            raise ValueError(f"{source}: /*[if {name}]*/ gates on a required param (never None)")
+    # A block that cuts through a parenthesised expression only breaks when it
+    # is dropped, so check every variant rather than just the raw file.
+    if len(conditions) <= _MAX_CHECKED_CONDITIONS:
+        for n in range(len(conditions) + 1):
+            for active in itertools.combinations(conditions, n):
+                variant = expand_conditional_sql(sql, frozenset(active))
+                depth = 0
+                for char in _PLACEHOLDER_RE.sub("", variant):
+                    depth += (char == "(") - (char == ")")
+                    if depth < 0:
+                        break
+                if depth != 0:
+                    raise ValueError(
+                        f"{source}: unbalanced parentheses with conditional blocks "
+                        f"{sorted(active)} kept"
+                    )
+    return conditions
+
+
+def _validate_sql_placeholders(
+    sql: str,
+    params: tuple[ToolParam, ...],
+    source: str,
+    consumed: frozenset[str] = frozenset(),
+    injected: frozenset[str] = frozenset(),
+) -> bool:
     """Cross-check SQL `%(name)s` placeholders against declared params.
 
-    Returns whether the SQL uses the reserved `tz` placeholder (injected at
-    call time from Settings.report_timezone, never declared in the .toml).
+    `consumed` params are read by the registry itself (a [pagination]
+    order_param) and need not appear in the SQL; `injected` placeholders are
+    bound by it (a [memo] tool's `memo_skip`). Returns whether the SQL uses
+    the reserved `tz` placeholder (injected at call time from
+    Settings.report_timezone, never declared in the .toml).
     """
     placeholders = set(_PLACEHOLDER_RE.findall(sql))
     uses_tz = "tz" in placeholders
     declared = {p.name for p in params}
 
-    undeclared = placeholders - {"tz"} - declared
+    undeclared = placeholders - {"tz"} - declared - injected
     if undeclared:
         raise ValueError(
             f"{source}: SQL placeholder(s) {sorted(undeclared)!r} are not declared in [[params]]"
         )
-    unused = declared - placeholders
+    unused = declared - placeholders - consumed
     if unused:
         raise ValueError(f"{source}: declared param(s) {sorted(unused)!r} are not used in the SQL")
 
@@ -229,13 +587,131 @@ def _validate_sql_placeholders(sql: str, params: tuple[ToolParam, ...], source:
     return uses_tz
 
 
-def discover_predefined_tools(directory: Path | None = None) -> list[PredefinedTool]:
+def _validate_memo(
+    memo: MonthMemoPolicy,
+    uses_tz: bool,
+    conditions: tuple[str, ...],
+    pagination: Pagination | None,
+    cache: CachePolicy | None,
+    execution: ExecutionPolicy,
+    source: str,
+) -> None:
+    """Check a [memo] table against the rest of the tool it memoizes."""
+    if pagination is not None or cache is not None:
+        raise ValueError(f"{source}: [memo] cannot be combined with [pagination] or [cache]")
+    if execution.max_rows is not None:
+        # A capped result could silently memoize a partial month.
+        raise ValueError(f"{source}: [memo] cannot be combined with execution.max_rows")
+    if not uses_tz:
+        raise ValueError(f"{source}: [memo] needs the SQL to bucket months with %(tz)s")
+    if MEMO_SKIP_PARAM not in conditions:
+        raise ValueError(
+            f"{source}: [memo] needs a /*[if {MEMO_SKIP_PARAM}]*/ block excluding the "
+            "memoized months"
+        )
+
+
+def _validate_chunks(
+    chunks: ChunkPolicy,
+    uses_tz: bool,
+    conditions: tuple[str, ...],
+    pagination: Pagination | None,
+    cache: CachePolicy | None,
+    memo: MonthMemoPolicy | None,
+    execution: ExecutionPolicy,
+    source: str,
+) -> None:
+    """Check a [chunks] table against the rest of the tool it splits."""
+    if pagination is not None or cache is not None or memo is not None:
+        raise ValueError(
+            f"{source}: [chunks] cannot be combined with [pagination], [cache] or [memo]"
+        )
+    if execution.max_rows is not None:
+        # Each chunk would be capped on its own, not the combined result.
+        raise ValueError(f"{source}: [chunks] cannot be combined with execution.max_rows")
+    if chunks.align is not None and not uses_tz:
+        raise ValueError(f"{source}: chunks align needs the SQL to bucket with %(tz)s")
+    if CHUNK_START_PARAM not in conditions:
+        raise ValueError(
+            f"{source}: [chunks] needs a /*[if {CHUNK_START_PARAM}]*/ block bounding the "
+            f"rows to %({CHUNK_START_PARAM})s <= date < %({CHUNK_END_PARAM})s"
+        )
+
+
+def _validate_sample(
+    conditions: tuple[str, ...],
+    pagination: Pagination | None,
+    cache: CachePolicy | None,
+    memo: MonthMemoPolicy | None,
+    execution: ExecutionPolicy,
+    source: str,
+) -> None:
+    """Check a [sample] table against the rest of the tool it estimates."""
+    if pagination is not None or cache is not None or memo is not None:
+        raise ValueError(
+            f"{source}: [sample] cannot be combined with [pagination], [cache] or [memo]"
+        )
+    if execution.max_rows is not None:
+        raise ValueError(f"{source}: [sample] cannot be combined with execution.max_rows")
+    if SAMPLE_PERCENT_PARAM not in conditions:
+        raise ValueError(
+            f"{source}: [sample] needs a /*[if {SAMPLE_PERCENT_PARAM}]*/ block putting "
+            f"TABLESAMPLE SYSTEM (%({SAMPLE_PERCENT_PARAM})s) REPEATABLE "
+            f"(%({SAMPLE_SEED_PARAM})s) on the scanned table"
+        )
+
+
+def _validate_scan(
+    pagination: Pagination | None,
+    cache: CachePolicy | None,
+    memo: MonthMemoPolicy | None,
+    execution: ExecutionPolicy,
+    source: str,
+) -> None:
+    """Check a [scan] table against the rest of the tool it fuses."""
+    if pagination is not None or cache is not None or memo is not None:
+        raise ValueError(
+            f"{source}: [scan] cannot be combined with [pagination], [cache] or [memo]"
+        )
+    if execution.max_rows is not None:
+        # The fused statement returns each member's rows as one value.
+        raise ValueError(f"{source}: [scan] cannot be combined with execution.max_rows")
+
+
+def _validate_address_index(param: str, conditions: tuple[str, ...], source: str) -> None:
+    """Check that the SQL can trade the location text for resolved address ids."""
+    if param not in conditions or ADDRESS_IDS_PARAM not in conditions:
+        raise ValueError(
+            f"{source}: [address_index] needs a /*[if {param}]*/ block matching the text and "
+            f"a /*[if {ADDRESS_IDS_PARAM}]*/ block filtering on %({ADDRESS_IDS_PARAM})s instead"
+        )
+
+
+def _parse_lint_allow(raw: Any, source: str) -> frozenset[str]:
+    """Validate the optional [lint] table: `allow` names rules this file opts out of."""
+    if not isinstance(raw, dict) or set(raw) - {"allow"}:
+        raise ValueError(f"{source}: [lint] must be a table with only an 'allow' key")
+    allow = raw.get("allow", [])
+    if not isinstance(allow, list) or not all(isinstance(rule, str) for rule in allow):
+        raise ValueError(f"{source}: [lint] allow must be a list of rule names")
+    unknown = set(allow) - set(LINT_RULES)
+    if unknown:
+        raise ValueError(
+            f"{source}: unknown lint rule(s) {sorted(unknown)!r} (want {sorted(LINT_RULES)})"
+        )
+    return frozenset(allow)
+
+
+def discover_predefined_tools(
+    directory: Path | None = None, *, strict: bool = False
+) -> list[PredefinedTool]:
     """Scan a directory for .sql files and load each one's sidecar .toml metadata.
 
     Each .sql file must have a sibling .toml with `name` and `description` keys
     and optional [[params]] tables. Missing sidecars or contract violations raise
     so misconfiguration fails fast at startup rather than silently producing a
-    half-empty or mis-typed tool list.
+    half-empty or mis-typed tool list. With `strict`, performance lint findings
+    (see `sql_lint`) not allowed by the file's [lint] table raise too.
     """
     base = directory or _queries_dir()
     tools: list[PredefinedTool] = []
@@ -273,7 +749,87 @@ def discover_predefined_tools(directory: Path | None = None) -> list[PredefinedT
             seen_cols.add(col.name)
 
         sql = sql_path.read_text(encoding="utf-8")
-        uses_tz = _validate_sql_placeholders(sql, params, toml_path.name)
+        pagination = (
+            parse_pagination(meta["pagination"], toml_path.name) if "pagination" in meta else None
+        )
+        validate_pagination(pagination, sql, {p.name: p for p in params}, seen_cols, toml_path.name)
+        consumed = frozenset(
+            [pagination.order_param] if pagination and pagination.order_param else []
+        )
+        memo = (
+            parse_memo(
+                meta["memo"],
+                {p.name: p for p in params},
+                {c.name: c for c in output},
+                toml_path.name,
+            )
+            if "memo" in meta
+            else None
+        )
+        chunks = (
+            parse_chunks(
+                meta["chunks"],
+                {p.name: p for p in params},
+                {c.name: c for c in output},
+                toml_path.name,
+            )
+            if "chunks" in meta
+            else None
+        )
+        sample = (
+            parse_sample(
+                meta["sample"],
+                {p.name: p for p in params},
+                {c.name: c for c in output},
+                toml_path.name,
+            )
+            if "sample" in meta
+            else None
+        )
+        scan = (
+            parse_scan(meta["scan"], {p.name: p for p in params}, sql, toml_path.name)
+            if "scan" in meta
+            else None
+        )
+        address_index = (
+            parse_address_index(meta["address_index"], {p.name: p for p in params}, toml_path.name)
+            if "address_index" in meta
+            else None
+        )
+        injected = frozenset(
+            ([MEMO_SKIP_PARAM] if memo else [])
+            + ([CHUNK_START_PARAM, CHUNK_END_PARAM] if chunks else [])
+            + ([SAMPLE_PERCENT_PARAM, SAMPLE_SEED_PARAM] if sample else [])
+            + ([ADDRESS_IDS_PARAM] if address_index else [])
+        )
+        uses_tz = _validate_sql_placeholders(sql, params, toml_path.name, consumed, injected)
+        conditions = _validate_conditions(sql, params, toml_path.name, injected)
+        lint_allow = _parse_lint_allow(meta.get("lint", {}), toml_path.name)
+        one_of = _parse_one_of(meta.get("one_of", []), params, toml_path.name)
+        execution = _parse_execution(meta.get("execution", {}), toml_path.name)
+        cache = (
+            _parse_cache(
+                meta["cache"], {p.name: p for p in params}, seen_cols, pagination, toml_path.name
+            )
+            if "cache" in meta
+            else None
+        )
+        if memo is not None:
+            _validate_memo(memo, uses_tz, conditions, pagination, cache, execution, toml_path.name)
+        if chunks is not None:
+            _validate_chunks(
+                chunks, uses_tz, conditions, pagination, cache, memo, execution, toml_path.name
+            )
+        if sample is not None:
+            _validate_sample(conditions, pagination, cache, memo, execution, toml_path.name)
+        if scan is not None:
+            _validate_scan(pagination, cache, memo, execution, toml_path.name)
+        if address_index is not None:
+            _validate_address_index(address_index, conditions, toml_path.name)
+        if strict:
+            findings = lint_sql(sql, sql_path.name, lint_allow)
+            if findings:
+                raise ValueError("\n".join(str(f) for f in findings))
 
         tools.append(
             PredefinedTool(
@@ -284,6 +840,17 @@ def discover_predefined_tools(directory: Path | None = None) -> list[PredefinedT
                 params=params,
                 uses_tz=uses_tz,
                 output=output,
+                lint_allow=lint_allow,
+                conditions=conditions,
+                one_of=one_of,
+                execution=execution,
+                pagination=pagination,
+                cache=cache,
+                memo=memo,
+                chunks=chunks,
+                sample=sample,
+                scan=scan,
+                address_index=address_index,
             )
         )
     return tools
@@ -313,6 +880,10 @@ def _annotation_for(param: ToolParam) -> Any:
     base: Any = Literal[param.enum] if param.enum else _PARAM_TYPES[param.type]
     if not param.required and param.default is None:
         base = base | None  # nullable = "filter off" (binds SQL NULL)
+    if param.max_items is not None:
+        return Annotated[
+            base, Field(description=param.description, min_length=1, max_length=param.max_items)
+        ]
     return Annotated[base, Field(description=param.description, ge=param.minimum, le=param.maximum)]
 
 
@@ -338,11 +909,180 @@ def _build_signature(tool: PredefinedTool) -> inspect.Signature:
             )
         )
     row_model = build_row_model(tool)
-    return_annotation = list[row_model] if row_model else list[dict[str, Any]]
+    return_annotation: Any = list[row_model] if row_model else list[dict[str, Any]]
+    if tool.pagination is not None:
+        parameters.append(
+            inspect.Parameter(
+                "cursor",
+                inspect.Parameter.KEYWORD_ONLY,
+                default=None,
+                annotation=Annotated[
+                    str | None,
+                    Field(description="Continuation token from the previous page of this search."),
+                ],
+            )
+        )
+        # A page with more to come is a CallToolResult carrying the cursor;
+        # the structured rows keep the declared shape either way.
+        return_annotation = Annotated[CallToolResult, return_annotation]
+    if tool.sample is not None:
+        parameters.append(
+            inspect.Parameter(
+                APPROXIMATE_PARAM,
+                inspect.Parameter.KEYWORD_ONLY,
+                default=False,
+                annotation=Annotated[
+                    bool,
+                    Field(
+                        description=(
+                            "Estimate from a sample of the table instead of reading every "
+                            "row: much faster on long windows. The result carries 95% "
+                            "confidence intervals (ci95) and the sampling fraction."
+                        )
+                    ),
+                ],
+            )
+        )
+        return_annotation = Annotated[CallToolResult, return_annotation]
     return inspect.Signature(parameters, return_annotation=return_annotation)
 
 
-def make_query_handler(tool: PredefinedTool, *, report_timezone: str) -> Any:
+def _next_page_result(
+    tool: PredefinedTool, rows: list[dict[str, Any]], cursor: str
+) -> CallToolResult:
+    """Rows plus a continuation note, shaped like `run_sql`'s paged results."""
+    note = (
+        f"{len(rows)} rows returned and more remain. To fetch the next page, call "
+        f"{tool.name} again with the same arguments and cursor={cursor!r}."
+    )
+    return CallToolResult(
+        content=[
+            *(
+                TextContent(type="text", text=pydantic_core.to_json(row, indent=2).decode())
+                for row in rows
+            ),
+            TextContent(type="text", text=note),
+        ],
+        structured_content={"result": rows},
+        meta={"next_cursor": cursor},
+    )
+
+
+def _approximate_result(tool: PredefinedTool, sampled: Sampled) -> CallToolResult:
+    """Estimated rows (or exact ones, for a small window) with a note on how they were made."""
+    if sampled.fraction >= 1:
+        note = f"The window is small enough that {tool.name} answered exactly."
+    else:
+        note = (
+            f"Approximate: estimated from {sampled.replicates} independent page samples "
+            f"totalling {100 * sampled.fraction:.3g}% of the table. ci95 gives each "
+            "estimate's 95% confidence interval; counts are scaled to the whole window, and "
+            "minima/maxima are only those seen in the sample. Call again with "
+            "approximate=false for exact figures."
+        )
+    return CallToolResult(
+        content=[
+            TextContent(type="text", text=note),
+            *(
+                TextContent(type="text", text=pydantic_core.to_json(row, indent=2).decode())
+                for row in sampled.rows
+            ),
+        ],
+        structured_content={"result": sampled.rows},
+        meta={
+            "approximate": {
+                "sample_fraction": sampled.fraction,
+                "replicates": sampled.replicates,
+                "confidence": 0.95,
+            }
+        },
+    )
+
+
+def requested_timeout_ms(ctx: Context) -> int | None:
+    """The per-call deadline the client put in the request's `_meta`, if any."""
+    value = (ctx.request_context.meta or {}).get(TIMEOUT_META_KEY)
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int) or value < 1:
+        raise ToolError(f"_meta[{TIMEOUT_META_KEY!r}] must be a positive number of milliseconds")
+    return value
+
+
+def deadline_exceeded(tool_name: str, timeout_ms: int) -> ToolError:
+    return ToolError(
+        f"{tool_name} did not finish within the requested {timeout_ms} ms "
+        f"(_meta[{TIMEOUT_META_KEY!r}]); the query was cancelled on the server."
+    )
+
+
+def _spooled_result(rows: list[dict[str, Any]], spooled: SpooledResult) -> CallToolResult:
+    """A summary of a spooled result: where to read it, plus its first rows."""
+    preview = rows[:_SPOOL_PREVIEW_ROWS]
+    note = (
+        f"{spooled.total_rows} rows ({spooled.size_bytes} bytes) are too many to return "
+        f"inline. They are stored as the resource {spooled.uri} in {spooled.pages} page(s) "
+        f"of {spooled.page_rows} rows; read {spooled.uri}?page=N for page N (from 1). "
+        f"It expires in {spooled.ttl_s} s. The first {len(preview)} rows follow."
+    )
+    return CallToolResult(
+        content=[
+            TextContent(type="text", text=note),
+            *(
+                TextContent(type="text", text=pydantic_core.to_json(row, indent=2).decode())
+                for row in preview
+            ),
+        ],
+        structured_content={"result": preview},
+        meta={
+            "spooled_result": {
+                "uri": spooled.uri,
+                "total_rows": spooled.total_rows,
+                "pages": spooled.pages,
+                "size_bytes": spooled.size_bytes,
+            }
+        },
+    )
+
+
+async def _query_through_cache(
+    tool: PredefinedTool,
+    entities: EntityCache,
+    bound: dict[str, Any],
+    query: Callable[[str, dict[str, Any]], Awaitable[list[dict[str, Any]]]],
+) -> list[dict[str, Any]]:
+    """Serve cached entities from disk; query the rest and cache those that have ended."""
+    policy = tool.cache
+    assert policy is not None
+    requested = bound[policy.ids_param]
+    ids = sorted(set(requested if requested is not None else [bound[policy.id_param]]))
+    variant = variant_digest(
+        {k: v for k, v in bound.items() if k not in (policy.id_param, policy.ids_param)}
+    )
+    by_id = await entities.get_many(tool.name, tool.version, ids, variant)
+    misses = [entity_id for entity_id in ids if entity_id not in by_id]
+    if misses:
+        # Checked before the query: an entity that had ended by then has all
+        # its rows in the result.
+        finished = {row["id"] for row in await query(policy.finished_sql(), {"ids": misses})}
+        missed = bound | {policy.id_param: None, policy.ids_param: misses}
+        fetched: dict[int, list[dict[str, Any]]] = {entity_id: [] for entity_id in misses}
+        for row in await query(tool.render(missed), missed):
+            fetched.setdefault(row[policy.id_column], []).append(row)
+        await entities.put_many(
+            tool.name,
+            tool.version,
+            {entity_id: rows for entity_id, rows in fetched.items() if entity_id in finished},
+            variant,
+        )
+        by_id |= fetched
+    logger.info("%s: %d of %d entities from the cache", tool.name, len(ids) - len(misses), len(ids))
+    return [row for entity_id in ids for row in by_id.get(entity_id, [])]
+
+
+def make_query_handler(
+    tool: PredefinedTool, *, report_timezone: str, spool_results: bool = False
+) -> Any:
     """Build the async handler for one predefined query, ready to register.
 
     Shared by the plain tool registry and the MCP Apps extension so a
@@ -351,17 +1091,121 @@ def make_query_handler(tool: PredefinedTool, *, report_timezone: str) -> Any:
     Acting as a per-tool factory also keeps each coroutine closed over only
     its own query — without it, handlers in a registration loop would share
     the loop variable and run the same SQL.
+
+    With `spool_results`, a result larger than the spool threshold is written
+    to the AppContext's ResultSpool and answered with a summary instead. The
+    MCP Apps tools leave it off: their views render the full structured rows.
+
+    Each optional sidecar table routes the query through its module:
+
+    - [cache]: finished entities from the EntityCache (`teslamate_mcp.entity_cache`)
+    - [memo]: closed months from the MonthMemo (`tools.month_memo`)
+    - [sample]: `approximate=true` from page samples (`tools.sampling`)
+    - [scan]: one read shared by concurrent calls (`tools.shared_scan`)
+    - [chunks]: long windows across pool connections (`tools.chunked`)
+    - [address_index]: location text as address ids (`tools.address_index`)
     """
 
-    async def handler(ctx: Context, **params: Any) -> list[dict[str, Any]]:
-        pool = ctx.request_context.lifespan_context.pool
+    async def handler(ctx: Context, **params: Any) -> list[dict[str, Any]] | CallToolResult:
+        lifespan_ctx = ctx.request_context.lifespan_context
         bound = {p.name: params.get(p.name, p.default) for p in tool.params}
+        if tool.one_of and all(bound[name] is None for name in tool.one_of):
+            raise ToolError(f"{tool.name} needs one of: {', '.join(tool.one_of)}")
         if tool.uses_tz:
             bound["tz"] = report_timezone
+        page = tool.pagination
+        if page is not None:
+            option, key = page.key_for(bound)
+            digest = filters_digest(bound, page)
+            page_size = bound[page.limit_param]
+            if params.get("cursor") is not None:
+                bound[AFTER_KEY], bound[AFTER_ID] = decode_cursor(params["cursor"], option, digest)
+            bound[page.limit_param] = page_size + 1  # one row of lookahead
+        settings = tool.execution.settings()
+        # A client deadline only ever tightens the timeout already in force.
+        deadline_ms = requested_timeout_ms(ctx)
+        if deadline_ms is not None:
+            in_force = tool.execution.timeout_ms or lifespan_ctx.statement_timeout_ms
+            if not in_force or deadline_ms < in_force:
+                settings["statement_timeout"] = str(deadline_ms)
+            else:
+                deadline_ms = None
         logger.info("Running %s (%s)", tool.name, tool.source)
-        # `or None` keeps psycopg's %-escaping rules off for param-less SQL.
-        rows = await fetch_all(pool, tool.sql, bound or None)
+        pool, breaker = lifespan_ctx.read_target()
+
+        async def query(
+            sql: str, query_params: dict[str, Any], *, session: dict[str, str] | None = None
+        ) -> list[dict[str, Any]]:
+            try:
+                async with breaker.guard():
+                    # `or None` keeps psycopg's %-escaping rules off for param-less SQL.
+                    return await fetch_all(
+                        pool,
+                        sql,
+                        query_params or None,
+                        settings=settings if session is None else session,
+                        max_rows=tool.execution.max_rows,
+                    )
+            except psycopg.errors.QueryCanceled as exc:
+                if deadline_ms is None:
+                    raise
+                raise deadline_exceeded(tool.name, deadline_ms) from exc
+
+        addresses: AddressIndex | None = (
+            lifespan_ctx.addresses if tool.address_index is not None else None
+        )
+        if addresses is not None:
+            text = bound[tool.address_index]
+            ids = None
+            if text is not None and addresses.handles(text):
+                ids = await addresses.lookup(text, query)
+            if ids is not None:
+                # The ids replace the text's ILIKE block; the cursor digest
+                # above was taken over the text.
+                bound[ADDRESS_IDS_PARAM] = ids
+                bound[tool.address_index] = None
+        entities = lifespan_ctx.entities if tool.cache is not None else None
+        memo: MonthMemo | None = lifespan_ctx.month_memo if tool.memo is not None else None
+        scans: SharedScans | None = lifespan_ctx.shared_scans if tool.scan is not None else None
+        if deadline_ms is not None:
+            scans = None  # a client deadline bounds this call alone
+        if entities is not None:
+            rows = await _query_through_cache(tool, entities, bound, query)
+        elif memo is not None and tool.memo.applies(bound):
+            rows = await query_with_memo(tool, memo, bound, query)
+        elif tool.sample is not None and params.get(APPROXIMATE_PARAM):
+            sampled = await query_sampled(
+                tool, pool, bound, query, lifespan_ctx.approximate_target_rows
+            )
+            logger.info("%s returned %d row(s) (approximate)", tool.name, len(sampled.rows))
+            return _approximate_result(tool, sampled)
+        elif (
+            scans is not None
+            and (shared := await scans.run(tool, bound, pool, settings, query)) is not None
+        ):
+            rows = shared
+        elif (
+            tool.chunks is None
+            or (chunked := await query_in_chunks(tool, pool, bound, query)) is None
+        ):
+            rows = await query(tool.render(bound), bound)
+        else:
+            rows = chunked
+        if page is not None and len(rows) > page_size:
+            rows = rows[:page_size]
+            last = rows[-1]
+            cursor = encode_cursor(option, last[key.column], last[page.id_column], digest)
+            logger.info("%s returned %d row(s) (more pages)", tool.name, len(rows))
+            return _next_page_result(tool, rows, cursor)
         logger.info("%s returned %d row(s)", tool.name, len(rows))
+        spool = lifespan_ctx.spool if spool_results else None
+        if spool is not None:
+            try:
+                spooled = await spool.store_if_large(tool.name, rows)
+            except SpoolError as exc:
+                raise ToolError(str(exc)) from exc
+            if spooled is not None:
+                return _spooled_result(rows, spooled)
         return rows
 
     handler.__name__ = tool.name
@@ -374,7 +1218,11 @@ def make_query_handler(tool: PredefinedTool, *, report_timezone: str) -> Any:
 
 
 def register_predefined_tools(
-    mcp: MCPServer, tools: list[PredefinedTool], *, report_timezone: str
+    mcp: MCPServer,
+    tools: list[PredefinedTool],
+    *,
+    report_timezone: str,
+    spool_results: bool = False,
 ) -> None:
     """Attach each predefined tool to the MCP server."""
     annotations = ToolAnnotations(
@@ -385,5 +1233,11 @@ def register_predefined_tools(
     )
 
     for tool in tools:
-        handler = make_query_handler(tool, report_timezone=report_timezone)
-        mcp.tool(name=tool.name, description=tool.description, annotations=annotations)(handler)
+        handler = make_query_handler(
+            tool, report_timezone=report_timezone, spool_results=spool_results
+        )
+        # JSON Schema `required` cannot say "one of these", so advertise it in _meta.
+        meta = {ONE_OF_META_KEY: list(tool.one_of)} if tool.one_of else None
+        mcp.tool(name=tool.name, description=tool.description, annotations=annotations, meta=meta)(
+            handler
+        )
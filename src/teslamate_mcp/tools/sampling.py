@@ -0,0 +1,262 @@
+"""Approximate answers from `TABLESAMPLE SYSTEM` page samples.
+
+"What fraction of the time is my SoC above 80%?" needs an estimate within
+a percent, not a scan of every `positions` row in the window. A tool that
+declares a [sample] table in its sidecar gains an `approximate` argument.
+When it is true, the tool's SQL runs through its `/*[if sample_percent]*/`
+block, which puts `TABLESAMPLE SYSTEM (%(sample_percent)s) REPEATABLE
+(%(sample_seed)s)` on the scanned table.
+
+SYSTEM sampling reads its percent of the pages of the *whole* table, and it
+cannot use the `(car_id, date)` index, so it only pays off for windows that
+cover much of the table. The rate is sized so the sample holds about
+`APPROXIMATE_TARGET_ROWS` rows of the window: that many over the planner's
+row estimate for the window (an `EXPLAIN`, no scan). The call is answered
+exactly instead when the sample would read at least as many rows as the
+window holds (the rate times `pg_class.reltuples`), when the planner costs
+the sampled pages above the window's own indexed scan, or when the table has
+no statistics yet.
+
+SYSTEM sampling picks whole heap pages, and consecutive positions on a page
+are strongly correlated, so row-level standard errors would be far too
+narrow. The sample is instead drawn as `replicates` independent page samples
+(fixed seeds, so a repeated call gives the same answer), as many at a time
+as the pool has spare connections (see `chunked.chunk_count`). Each estimate is
+the mean over replicates, and its 95% interval comes from the spread between
+replicates (Student's t; the "random groups" method). This accounts for the
+clustering, whatever it is. Per group (`key`):
+
+- `totals` (counts) are scaled up by the sampling fraction;
+- `extremes` are the min/max seen in the sample: bounds, not estimates, and
+  they have no interval;
+- every other numeric column (averages, percentages) is a ratio estimate.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import re
+import statistics
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+from psycopg_pool import AsyncConnectionPool
+
+from .chunked import chunk_count, run_concurrently
+from .month_memo import Query, in_sql_order, parse_order_by
+
+if TYPE_CHECKING:
+    from .registry import PredefinedTool, ToolOutputColumn, ToolParam
+
+logger = logging.getLogger(__name__)
+
+# The user-facing argument, and the reserved params of one replicate.
+APPROXIMATE_PARAM = "approximate"
+SAMPLE_PERCENT_PARAM = "sample_percent"
+SAMPLE_SEED_PARAM = "sample_seed"
+_ALLOWED_SAMPLE_KEYS = frozenset(
+    {"table", "date_column", "window", "key", "order_by", "totals", "extremes", "replicates"}
+)
+_SAMPLE_TABLES = frozenset({"positions", "charges"})
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+# Two-sided 95% Student's t quantiles by degrees of freedom.
+_T95 = {1: 12.706, 2: 4.303, 3: 3.182, 4: 2.776, 5: 2.571, 6: 2.447, 7: 2.365, 8: 2.306, 9: 2.262}
+_NUMERIC_TYPES = frozenset({"integer", "number"})
+
+
+@dataclass(frozen=True)
+class SamplePolicy:
+    """Approximate mode from a .toml [sample] table; see the module docstring."""
+
+    table: str
+    date_column: str
+    window: str
+    key: tuple[str, ...]
+    order_by: tuple[tuple[str, bool], ...]
+    totals: frozenset[str] = frozenset()
+    extremes: tuple[tuple[str, str], ...] = ()  # (column, "min" | "max")
+    ratios: frozenset[str] = frozenset()
+    replicates: int = 5
+
+    def estimate_sql(self) -> str:
+        """The planner's rows and cost for the window's own scan, without running it."""
+        return (
+            f"EXPLAIN (FORMAT JSON) SELECT * FROM {self.table} WHERE {self.date_column} "
+            f">= CURRENT_DATE - make_interval(days => %({self.window})s::int)"
+        )
+
+    def table_sql(self) -> str:
+        """The table's size from its statistics: reltuples is -1 before the first ANALYZE."""
+        return (
+            "SELECT reltuples::float8 AS table_rows, relpages AS table_pages "
+            f"FROM pg_class WHERE oid = '{self.table}'::regclass"
+        )
+
+    def sample_cost_sql(self) -> str:
+        """The planner's cost of reading `%(sample_percent)s` of the table's pages."""
+        return (
+            f"EXPLAIN (FORMAT JSON) SELECT * FROM {self.table} "
+            f"TABLESAMPLE SYSTEM (%({SAMPLE_PERCENT_PARAM})s::real)"
+        )
+
+    def combine(
+        self, replicates: list[list[dict[str, Any]]], fraction: float
+    ) -> list[dict[str, Any]]:
+        """One row per group: estimates from the replicates, with their 95% intervals."""
+        groups: dict[tuple[Any, ...], list[dict[str, Any]]] = {}
+        for rows in replicates:
+            for row in rows:
+                groups.setdefault(tuple(row[c] for c in self.key), []).append(row)
+        estimates = []
+        for rows in groups.values():
+            out = dict(rows[0])
+            intervals: dict[str, list[float] | None] = {}
+            for column in self.totals:
+                # A replicate without the group saw none of its rows.
+                counts = [row[column] or 0 for row in rows]
+                counts += [0] * (len(replicates) - len(rows))
+                value, interval = _mean_interval([c / fraction for c in counts])
+                out[column] = round(value)
+                intervals[column] = interval and [max(0, round(interval[0])), round(interval[1])]
+            for column in self.ratios:
+                values = [float(row[column]) for row in rows if row[column] is not None]
+                if not values:
+                    out[column] = None
+                    continue
+                value, interval = _mean_interval(values)
+                out[column] = round(value, 3)
+                intervals[column] = interval and [round(interval[0], 3), round(interval[1], 3)]
+            for column, pick in self.extremes:
+                seen = [row[column] for row in rows if row[column] is not None]
+                out[column] = (min if pick == "min" else max)(seen) if seen else None
+            out["ci95"] = intervals
+            estimates.append(out)
+        return estimates
+
+
+def _mean_interval(values: list[float]) -> tuple[float, list[float] | None]:
+    mean = statistics.fmean(values)
+    if len(values) < 2:
+        return mean, None
+    t = _T95.get(len(values) - 1, 1.96)
+    half = t * statistics.stdev(values) / math.sqrt(len(values))
+    return mean, [mean - half, mean + half]
+
+
+def parse_sample(
+    raw: Any,
+    params: dict[str, ToolParam],
+    output: dict[str, ToolOutputColumn],
+    source: str,
+) -> SamplePolicy:
+    """Validate the optional [sample] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [sample] must be a table")
+    unknown = set(raw) - _ALLOWED_SAMPLE_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown sample key(s) {sorted(unknown)!r}")
+    for key in ("table", "date_column", "window", "key", "order_by"):
+        if key not in raw:
+            raise ValueError(f"{source}: [sample] is missing key {key!r}")
+    if raw["table"] not in _SAMPLE_TABLES:
+        raise ValueError(
+            f"{source}: sample table {raw['table']!r} is not one of {sorted(_SAMPLE_TABLES)}"
+        )
+    if not isinstance(raw["date_column"], str) or not _IDENTIFIER_RE.match(raw["date_column"]):
+        raise ValueError(f"{source}: sample date_column must be a column name")
+    window = params.get(raw["window"])
+    if window is None or window.type != "integer":
+        raise ValueError(f"{source}: sample window must name a declared integer param (days)")
+    key = raw["key"]
+    if not isinstance(key, list) or not key or any(name not in output for name in key):
+        raise ValueError(f"{source}: sample key must list the output columns of a group")
+    order_by = parse_order_by(raw["order_by"], output, "sample", source)
+    totals = raw.get("totals", [])
+    if not isinstance(totals, list) or any(output.get(n) is None for n in totals):
+        raise ValueError(f"{source}: sample totals must list output columns")
+    extremes = raw.get("extremes", {})
+    if (
+        not isinstance(extremes, dict)
+        or any(name not in output for name in extremes)
+        or any(pick not in ("min", "max") for pick in extremes.values())
+    ):
+        raise ValueError(f"{source}: sample extremes must map output columns to 'min' or 'max'")
+    replicates = raw.get("replicates", 5)
+    if not isinstance(replicates, int) or isinstance(replicates, bool) or not 2 <= replicates <= 10:
+        raise ValueError(f"{source}: sample replicates must be an integer from 2 to 10")
+    ratios = set(output) - set(key) - set(totals) - set(extremes)
+    not_numeric = sorted(name for name in ratios if output[name].type not in _NUMERIC_TYPES)
+    if not_numeric:
+        raise ValueError(f"{source}: sample cannot estimate non-numeric column(s) {not_numeric!r}")
+    return SamplePolicy(
+        table=raw["table"],
+        date_column=raw["date_column"],
+        window=window.name,
+        key=tuple(key),
+        order_by=order_by,
+        totals=frozenset(totals),
+        extremes=tuple(extremes.items()),
+        ratios=frozenset(ratios),
+        replicates=replicates,
+    )
+
+
+@dataclass(frozen=True)
+class Sampled:
+    """An approximate (or, for a small window, exact) result."""
+
+    rows: list[dict[str, Any]]
+    fraction: float  # share of the table's pages read; 1.0 when exact
+    replicates: int = 0
+
+
+async def query_sampled(
+    tool: PredefinedTool,
+    pool: AsyncConnectionPool,
+    bound: dict[str, Any],
+    query: Query,
+    target_rows: int,
+) -> Sampled:
+    """Run `tool` on `replicates` page samples holding about `target_rows` window rows."""
+    policy = tool.sample
+    assert policy is not None
+    (plan,) = await query(policy.estimate_sql(), bound)
+    window = plan["QUERY PLAN"][0]["Plan"]
+    window_rows = max(1, window["Plan Rows"])
+    (table,) = await query(policy.table_sql(), {})
+    percent = 100.0 * target_rows / window_rows
+    # Every row the sample reads, in the window or not.
+    sampled_rows = percent / 100 * table["table_rows"]
+    exact = table["table_rows"] <= 0 or sampled_rows >= window_rows
+    if not exact:
+        (sample_plan,) = await query(policy.sample_cost_sql(), {SAMPLE_PERCENT_PARAM: percent})
+        exact = sample_plan["QUERY PLAN"][0]["Plan"]["Total Cost"] >= window["Total Cost"]
+    if exact:
+        logger.info(
+            "%s: ~%d of ~%d rows in the window; answering exactly",
+            tool.name,
+            window_rows,
+            max(0, table["table_rows"]),
+        )
+        return Sampled(await query(tool.render(bound), bound), 1.0)
+    each = percent / policy.replicates
+    replicate_params = [
+        bound | {SAMPLE_PERCENT_PARAM: each, SAMPLE_SEED_PARAM: seed}
+        for seed in range(1, policy.replicates + 1)
+    ]
+    replicates = await run_concurrently(
+        (query(tool.render(p), p) for p in replicate_params),
+        limit=chunk_count(pool, policy.replicates),
+    )
+    logger.info(
+        "%s: sampled %.3f%% of %s (%d pages) in %d replicate(s) (~%d rows in the window)",
+        tool.name,
+        percent,
+        policy.table,
+        table["table_pages"],
+        policy.replicates,
+        window_rows,
+    )
+    rows = policy.combine(replicates, each / 100)
+    return Sampled(await in_sql_order(rows, policy.order_by, query), percent / 100, len(replicates))
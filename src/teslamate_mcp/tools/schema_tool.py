@@ -55,7 +55,9 @@ def register_schema_tool(mcp: MCPServer) -> None:
                 "Schema cache %s — querying information_schema",
                 "refresh requested" if refresh else "cold",
             )
-            lifespan_ctx.schema = await load_schema(lifespan_ctx.pool)
+            pool, breaker = lifespan_ctx.read_target()
+            async with breaker.guard():
+                lifespan_ctx.schema = await load_schema(pool)
         rows = lifespan_ctx.schema
 
         if table is None:
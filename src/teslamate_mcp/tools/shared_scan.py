@@ -0,0 +1,245 @@
+"""Shared scans of `positions` for tools requested together.
+
+A battery review calls `get_soc_hygiene`, `get_daily_battery_usage_patterns`,
+`get_tire_pressure_weekly_trends` and `get_battery_degradation_over_time`,
+often in one burst of parallel tool calls, and each of them scanned the
+same `positions` window on its own. A tool that declares a [scan] table in
+its sidecar instead waits `SHARED_SCAN_WINDOW_MS` (off by default: the wait
+is paid even when nothing else arrives) for compatible calls (same table and
+connection pool, no conflicting session setting, the same statement timeout)
+before it runs. When others arrive, the first call runs them all as one
+statement:
+
+    WITH positions AS MATERIALIZED (
+        SELECT <columns the batch reads> FROM positions
+        WHERE date >= <start of the widest window>
+    ),
+    scan_0 AS (<first tool's SQL>), scan_1 AS (<second tool's SQL>), ...
+    SELECT 0, (SELECT json_agg(s) FROM scan_0 s) UNION ALL ...
+
+The CTE named `positions` shadows the table inside the statement, so each
+tool's SQL runs unchanged (its placeholders renamed per member) against one
+materialized read of the table, and still applies its own window and
+filters. Each member's rows come back as one JSON array, in the order of
+its own ORDER BY, with `number` output columns made floats as they are on
+the plain path.
+
+A call that finds no company, or whose batch fails, runs on its own as
+before, as does a call with a client deadline, which bounds its own call only.
+Tools read only the [scan] `columns` from the shared CTE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+from collections.abc import Awaitable, Hashable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Protocol
+
+if TYPE_CHECKING:
+    from .registry import PredefinedTool, ToolParam
+
+logger = logging.getLogger(__name__)
+
+_ALLOWED_SCAN_KEYS = frozenset({"table", "date_column", "window", "columns"})
+_SCAN_TABLES = frozenset({"positions"})
+_IDENTIFIER_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+_PLACEHOLDER_RE = re.compile(r"%\((\w+)\)s")
+# The widest member window; member params are all prefixed, so it cannot clash.
+_SCAN_WINDOW_PARAM = "scan_days"
+_TIMEOUT_SETTING = "statement_timeout"
+
+
+class SessionQuery(Protocol):
+    """Runs a statement; `session` replaces the calling tool's session settings."""
+
+    def __call__(
+        self, sql: str, params: dict[str, Any], *, session: dict[str, str] | None = None
+    ) -> Awaitable[list[dict[str, Any]]]: ...
+
+
+@dataclass(frozen=True)
+class ScanPolicy:
+    """Shared scanning from a .toml [scan] table; see the module docstring."""
+
+    table: str
+    date_column: str
+    window: str
+    columns: frozenset[str]
+
+
+def parse_scan(raw: Any, params: dict[str, ToolParam], sql: str, source: str) -> ScanPolicy:
+    """Validate the optional [scan] table. All failures raise ValueError naming the file."""
+    if not isinstance(raw, dict):
+        raise ValueError(f"{source}: [scan] must be a table")
+    unknown = set(raw) - _ALLOWED_SCAN_KEYS
+    if unknown:
+        raise ValueError(f"{source}: unknown scan key(s) {sorted(unknown)!r}")
+    for key in ("table", "date_column", "window", "columns"):
+        if key not in raw:
+            raise ValueError(f"{source}: [scan] is missing key {key!r}")
+    if raw["table"] not in _SCAN_TABLES:
+        raise ValueError(
+            f"{source}: scan table {raw['table']!r} is not one of {sorted(_SCAN_TABLES)}"
+        )
+    if not re.search(rf"\bFROM\s+{raw['table']}\b", sql, re.IGNORECASE):
+        raise ValueError(f"{source}: scan table {raw['table']!r} is not read by the SQL")
+    window = params.get(raw["window"])
+    if window is None or window.type != "integer":
+        raise ValueError(f"{source}: scan window must name a declared integer param (days)")
+    columns = raw["columns"]
+    if (
+        not isinstance(columns, list)
+        or not all(isinstance(c, str) and _IDENTIFIER_RE.match(c) for c in columns)
+        or raw["date_column"] not in columns
+    ):
+        raise ValueError(
+            f"{source}: scan columns must list the table columns the SQL reads, "
+            "date_column included"
+        )
+    return ScanPolicy(
+        table=raw["table"],
+        date_column=raw["date_column"],
+        window=window.name,
+        columns=frozenset(columns),
+    )
+
+
+@dataclass
+class _Member:
+    tool: PredefinedTool
+    bound: dict[str, Any]
+    future: asyncio.Future[list[dict[str, Any]] | None]
+
+
+@dataclass
+class _Batch:
+    """Calls waiting to share one statement, and the session settings it runs with."""
+
+    members: list[_Member]
+    settings: dict[str, str]
+
+    def admits(self, settings: dict[str, str]) -> bool:
+        # Every member keeps its own statement timeout (or the pool's bound,
+        # when it sets none): a different one is a conflict, never loosened.
+        return settings.get(_TIMEOUT_SETTING) == self.settings.get(_TIMEOUT_SETTING) and all(
+            self.settings.get(name, value) == value for name, value in settings.items()
+        )
+
+    def add(self, member: _Member, settings: dict[str, str]) -> None:
+        self.members.append(member)
+        self.settings |= settings
+
+
+def fused_sql(members: list[tuple[PredefinedTool, dict[str, Any]]]) -> tuple[str, dict[str, Any]]:
+    """One statement answering every member from a single scan, and its params."""
+    policies = [tool.scan for tool, _ in members]
+    assert all(policies)
+    policy = policies[0]
+    columns = sorted(set().union(*(p.columns for p in policies)))
+    params: dict[str, Any] = {
+        _SCAN_WINDOW_PARAM: max(
+            bound[p.window] for p, (_, bound) in zip(policies, members, strict=True)
+        )
+    }
+    ctes = [
+        f"{policy.table} AS MATERIALIZED (\n"
+        f"    SELECT {', '.join(f't.{c}' for c in columns)}\n"
+        f"    FROM {policy.table} t\n"
+        f"    WHERE t.{policy.date_column} >= CURRENT_DATE - "
+        f"make_interval(days => %({_SCAN_WINDOW_PARAM})s::int)\n)"
+    ]
+    selects = []
+    for i, (tool, bound) in enumerate(members):
+        # A trailing line comment must not swallow the closing parenthesis.
+        sql = _PLACEHOLDER_RE.sub(rf"%(m{i}_\1)s", tool.render(bound).strip().rstrip(";"))
+        ctes.append(f"scan_{i} AS (\n{sql}\n)")
+        params |= {f"m{i}_{name}": value for name, value in bound.items()}
+        selects.append(f"SELECT {i} AS member, (SELECT json_agg(s) FROM scan_{i} s) AS rows")
+    return "WITH " + ",\n".join(ctes) + "\n" + "\nUNION ALL\n".join(selects), params
+
+
+def _as_plain(tool: PredefinedTool, rows: list[dict[str, Any]] | None) -> list[dict[str, Any]]:
+    # JSON drops the numeric/float distinction the plain path keeps (Decimal
+    # becomes float there): `number` columns are floats either way.
+    numbers = [c.name for c in tool.output if c.type == "number"]
+    for row in rows or ():
+        for name in numbers:
+            if row.get(name) is not None:
+                row[name] = float(row[name])
+    return rows or []
+
+
+class SharedScans:
+    """Coalesces concurrent calls of [scan] tools into fused statements."""
+
+    def __init__(self, window_ms: int, max_members: int = 8) -> None:
+        self._window_s = window_ms / 1000
+        self._max_members = max_members
+        self._open: dict[tuple[str, Hashable], _Batch] = {}
+
+    async def run(
+        self,
+        tool: PredefinedTool,
+        bound: dict[str, Any],
+        pool: Hashable,
+        settings: dict[str, str],
+        query: SessionQuery,
+    ) -> list[dict[str, Any]] | None:
+        """`tool`'s rows from a shared scan; None when it should run on its own.
+
+        Calls share a statement when they read the same table through the same
+        `pool`, with the same statement timeout, and no other session setting
+        they both make differs; the statement runs under all of their
+        settings. `query` runs it if this call leads the batch.
+        """
+        policy = tool.scan
+        assert policy is not None
+        key = (policy.table, pool)
+        member = _Member(tool, bound, asyncio.get_running_loop().create_future())
+        batch = self._open.get(key)
+        if batch is not None:
+            if not batch.admits(settings):
+                return None
+            batch.add(member, settings)
+            if len(batch.members) >= self._max_members:
+                del self._open[key]
+            return await member.future
+
+        batch = self._open[key] = _Batch([], {})
+        batch.add(member, settings)
+        results: dict[int, list[dict[str, Any]] | None] | None = None
+        try:
+            try:
+                await asyncio.sleep(self._window_s)
+            finally:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            if len(batch.members) == 1:
+                return None
+            sql, params = fused_sql([(m.tool, m.bound) for m in batch.members])
+            rows = await query(sql, params, session=dict(batch.settings))
+            results = {row["member"]: row["rows"] for row in rows}
+        except Exception:
+            logger.warning(
+                "Shared scan of %s for %d tool(s) failed; running them one by one",
+                policy.table,
+                len(batch.members),
+                exc_info=True,
+            )
+            return None
+        finally:
+            # Without results (a failure, or this call cancelled) followers
+            # run on their own rather than wait on a leader that is gone.
+            for i, other in enumerate(batch.members[1:], start=1):
+                if not other.future.done():
+                    shared = None if results is None else _as_plain(other.tool, results.get(i))
+                    other.future.set_result(shared)
+        logger.info(
+            "Shared scan of %s answered %s",
+            policy.table,
+            ", ".join(m.tool.name for m in batch.members),
+        )
+        return _as_plain(tool, results.get(0))
@@ -0,0 +1,173 @@
+"""Static performance lint for predefined .sql files.
+
+`_validate_sql_placeholders` keeps a query *correct*; nothing kept it *fast*.
+These rules flag patterns that have already cost the catalog full scans:
+
+- `or-join`: an OR inside a JOIN's ON condition. PostgreSQL can neither hash
+  nor merge such a join, and runs a nested loop over both sides.
+- `wrapped-column-filter`: a column wrapped in a function or cast and then
+  compared (`DATE(p.date) >= …`, `(d.start_date AT TIME ZONE …)::date <= …`).
+  An index on the bare column cannot serve it.
+- `positions-range-join`: `positions` joined to a drive by date range instead
+  of by `drive_id`, which reads every position of the car in that window.
+
+The check is lexical, on the SQL with comments, string literals and
+placeholders blanked out (offsets are kept, so line numbers stay right). A
+file opts out of a rule with a reason in its sidecar:
+
+    [lint]
+    allow = ["wrapped-column-filter"]  # converts to the report timezone
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+RULES: dict[str, str] = {
+    "or-join": "OR in a JOIN condition forces a nested loop; join twice or UNION the sides",
+    "wrapped-column-filter": (
+        "a column wrapped in a function or cast cannot use its index; "
+        "compare the bare column against a converted bound"
+    ),
+    "positions-range-join": (
+        "positions joined by date range instead of drive_id reads every position in the window"
+    ),
+}
+
+_MASKED = re.compile(r"--[^\n]*|/\*.*?\*/|'(?:''|[^'])*'|\"(?:\"\"|[^\"])*\"", re.DOTALL)
+_PLACEHOLDER = re.compile(r"%\(\w+\)s")
+# Where a WHERE or ON condition ends when not inside parentheses.
+_CLAUSE_END = re.compile(
+    r"\b(?:WHERE|GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|OFFSET|WINDOW|UNION|INTERSECT|EXCEPT|"
+    r"(?:LEFT|RIGHT|FULL|INNER|CROSS)(?:\s+OUTER)?\s+JOIN|JOIN)\b",
+    re.IGNORECASE,
+)
+_ON = re.compile(r"\bON\b", re.IGNORECASE)
+_WHERE = re.compile(r"\bWHERE\b", re.IGNORECASE)
+_OR = re.compile(r"\bOR\b", re.IGNORECASE)
+_COLUMN = re.compile(r"\b[a-z_]\w*\.[a-z_]\w*\b", re.IGNORECASE)
+_COMPARISON = r"(?:<=|>=|<>|!=|=|<|>|\bBETWEEN\b)"
+_COMPARED_AFTER = re.compile(r"\s*" + _COMPARISON, re.IGNORECASE)
+_COMPARED_BEFORE = re.compile(_COMPARISON + r"\s*$", re.IGNORECASE)
+_WRAPPER_FUNCTION = re.compile(
+    r"\b(?:DATE|DATE_TRUNC|TO_CHAR|EXTRACT|LOWER|UPPER|COALESCE|CAST|TIMEZONE)\s*\(",
+    re.IGNORECASE,
+)
+_CAST = re.compile(r"(\)|\b[a-z_]\w*\.[a-z_]\w*)\s*::\s*\w+", re.IGNORECASE)
+_POSITIONS_JOIN = re.compile(r"\bJOIN\s+positions\s+(?:AS\s+)?(\w+)\s+ON\b", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class LintFinding:
+    rule: str
+    source: str
+    line: int
+
+    def __str__(self) -> str:
+        return f"{self.source}:{self.line}: {self.rule}: {RULES[self.rule]}"
+
+
+def _mask(sql: str) -> str:
+    """Blank comments, literals and placeholders with same-length filler."""
+
+    def blank(match: re.Match[str]) -> str:
+        return re.sub(r"[^\n]", " ", match.group())
+
+    masked = _MASKED.sub(blank, sql)
+    return _PLACEHOLDER.sub(lambda m: "_" * len(m.group()), masked)
+
+
+def _condition_end(sql: str, start: int) -> int:
+    """Where the condition starting at `start` ends: a clause keyword at depth 0, or its `)`."""
+    depth = 0
+    for i in range(start, len(sql)):
+        char = sql[i]
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            if depth == 0:
+                return i
+            depth -= 1
+        elif depth == 0 and not _is_word_char(sql[i - 1]) and _CLAUSE_END.match(sql, i):
+            return i
+    return len(sql)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _open_paren(sql: str, close: int) -> int:
+    depth = 0
+    for i in range(close, -1, -1):
+        if sql[i] == ")":
+            depth += 1
+        elif sql[i] == "(":
+            depth -= 1
+            if depth == 0:
+                return i
+    return 0
+
+
+def _close_paren(sql: str, open_: int) -> int:
+    depth = 0
+    for i in range(open_, len(sql)):
+        if sql[i] == "(":
+            depth += 1
+        elif sql[i] == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+    return len(sql) - 1
+
+
+def _compared(sql: str, start: int, end: int) -> bool:
+    """Whether sql[start:end] is an operand of a comparison."""
+    return bool(_COMPARED_AFTER.match(sql, end) or _COMPARED_BEFORE.search(sql[:start]))
+
+
+def _wrapped_columns(sql: str, start: int, end: int) -> list[int]:
+    """Offsets of compared function/cast-wrapped column expressions in sql[start:end]."""
+    hits = []
+    for match in _WRAPPER_FUNCTION.finditer(sql, start, end):
+        close = _close_paren(sql, match.end() - 1)
+        if _COLUMN.search(sql, match.start(), close) and _compared(sql, match.start(), close + 1):
+            hits.append(match.start())
+    for match in _CAST.finditer(sql, start, end):
+        operand_start = _open_paren(sql, match.start(1)) if match.group(1) == ")" else match.start()
+        if _COLUMN.search(sql, operand_start, match.end(1)) and _compared(
+            sql, operand_start, match.end()
+        ):
+            hits.append(operand_start)
+    return hits
+
+
+def lint_sql(sql: str, source: str, allow: frozenset[str] = frozenset()) -> list[LintFinding]:
+    """Findings for one query, minus the rules its sidecar allows, in file order."""
+    masked = _mask(sql)
+
+    def line(offset: int) -> int:
+        return masked.count("\n", 0, offset) + 1
+
+    found: set[LintFinding] = set()
+    # `DISTINCT ON (…)` is not a join condition.
+    ons = [
+        m
+        for m in _ON.finditer(masked)
+        if not re.search(r"\bDISTINCT\s+$", masked[: m.start()], re.IGNORECASE)
+    ]
+    for m in ons:
+        if _OR.search(masked, m.end(), _condition_end(masked, m.end())):
+            found.add(LintFinding("or-join", source, line(m.start())))
+    for m in (*ons, *_WHERE.finditer(masked)):
+        for offset in _wrapped_columns(masked, m.end(), _condition_end(masked, m.end())):
+            found.add(LintFinding("wrapped-column-filter", source, line(offset)))
+    for m in _POSITIONS_JOIN.finditer(masked):
+        condition = masked[m.end() : _condition_end(masked, m.end())]
+        ranged = re.search(
+            rf"\b{re.escape(m.group(1))}\.date\s*(?:BETWEEN\b|>=|>)", condition, re.IGNORECASE
+        )
+        if ranged and not re.search(r"\bdrive_id\b", condition, re.IGNORECASE):
+            found.add(LintFinding("positions-range-join", source, line(m.start())))
+    return sorted((f for f in found if f.rule not in allow), key=lambda f: (f.line, f.rule))
@@ -0,0 +1,90 @@
+"""Tests for the in-process address index behind the search location filters."""
+
+from __future__ import annotations
+
+import logging
+
+import psycopg
+
+from teslamate_mcp.tools.address_index import AddressIndex
+
+
+def _index() -> AddressIndex:
+    index = AddressIndex(rebuild_s=900)
+    index.add(1, "Home Street 1", "Istanbul")
+    index.add(2, "Office Plaza", "ISTANBUL")
+    index.add(3, "Supercharger Edirne", None)
+    index.add(4, None, None)
+    return index
+
+
+def test_match_is_a_case_insensitive_substring_of_either_field() -> None:
+    index = _index()
+    assert index.match("ISTAN") == [1, 2]
+    assert index.match("stanbul") == [1, 2]
+    assert index.match("charger ed") == [3]
+    assert index.match("e") == [1, 2, 3]  # shorter than a trigram: every address is checked
+    assert index.match("") == [1, 2, 3]
+    assert index.match("istanbulhome") == []  # never across fields
+    assert index.match("zzz") == []
+
+
+def test_ilike_wildcards_and_non_ascii_text_are_left_to_the_sql() -> None:
+    assert AddressIndex.handles("Edirne")
+    assert not AddressIndex.handles("100%")
+    assert not AddressIndex.handles("a_b")
+    assert not AddressIndex.handles("back\\slash")
+    # PostgreSQL lowercases these by the database's locale, not as Python does.
+    assert not AddressIndex.handles("İstanbul")
+    assert not AddressIndex.handles("STRASSE ß")
+    assert _index().match("Çanakkale") is None
+
+
+def test_letters_a_non_ascii_address_may_fold_to_are_left_to_the_sql() -> None:
+    index = _index()
+    index.add(5, "İnönü Caddesi", "İzmir")  # "İ" lowercases to "i" in most locales
+    assert index.match("izmir") is None
+    assert index.match("ISTAN") is None
+    assert index.match("nonu") == []  # "ö" and "ü" never fold to ASCII letters
+    assert index.match("plaza") == [2]
+    assert index.match("caddes") == [5]
+
+
+async def test_index_answers_like_the_sql(mcp_session, seeded_database, caplog) -> None:
+    calls = [
+        ("search_drives", {"location": "edirne"}),
+        ("search_drives", {"location": "PLAZA", "limit": 1}),
+        ("search_drives", {"location": "nowhere"}),
+        ("search_charging_sessions", {"location": "istanbul"}),
+        ("search_charging_sessions", {"location": "o%"}),
+    ]
+    results: dict[str, list[object]] = {}
+    for rebuild_s in (0, 900):  # 0 leaves every location to ILIKE
+        async with mcp_session(address_index_rebuild_s=rebuild_s) as session:
+            for name, args in calls:
+                result = await session.call_tool(name, args)
+                assert not result.is_error, result
+                results.setdefault(name + repr(args), []).append(
+                    (result.structured_content, result.meta)
+                )
+    for in_sql, indexed in results.values():
+        assert indexed == in_sql
+    assert results["search_drives{'location': 'edirne'}"][0][0]["result"]
+    # Both drives touch the plaza: the cursor is the same either way.
+    assert results["search_drives{'location': 'PLAZA', 'limit': 1}"][0][1]["next_cursor"]
+
+    with caplog.at_level(logging.INFO, logger="teslamate_mcp.tools.address_index"):
+        async with mcp_session() as session:
+            before = await session.call_tool("search_drives", {"location": "kirklareli"})
+            async with await psycopg.AsyncConnection.connect(
+                seeded_database, autocommit=True
+            ) as conn:
+                await conn.execute(
+                    "INSERT INTO addresses (id, display_name, city) "
+                    "VALUES (4, 'Main Square', 'Kirklareli')"
+                )
+                await conn.execute("UPDATE drives SET end_address_id = 4 WHERE distance = 120")
+            after = await session.call_tool("search_drives", {"location": "kirklareli"})
+    assert before.structured_content["result"] == []
+    assert [r["distance_km"] for r in after.structured_content["result"]] == [120.0]
+    assert "1 new address(es), 4 in all" in caplog.text
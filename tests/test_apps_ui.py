@@ -52,7 +52,7 @@ async def test_app_tools_declare_ui_binding() -> None:
         assert _sans_title(tool.output_schema) == _sans_title(backing.output_schema), spec.tool_name
 
     curve = tools["show_charging_curve"]
-    assert curve.input_schema["required"] == ["charging_process_id"]
+    assert {"charging_process_id", "charging_process_ids"} <= set(curve.input_schema["properties"])
     assert curve.input_schema["properties"]["max_points"]["default"] == 120
 
 
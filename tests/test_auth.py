@@ -2,13 +2,15 @@
 
 from __future__ import annotations
 
+import asyncio
+
 import pytest
 from starlette.applications import Starlette
 from starlette.responses import PlainTextResponse
 from starlette.routing import Route
 from starlette.testclient import TestClient
 
-from teslamate_mcp.auth import BearerAuthMiddleware
+from teslamate_mcp.auth import BearerAuthMiddleware, parse_auth_tokens
 
 _TOKEN = "sekrit-token"
 
@@ -68,3 +70,60 @@ def test_trailing_slash_path_is_still_protected(client) -> None:
 def test_paths_outside_prefix_are_exempt(client) -> None:
     # /health is how the Docker HEALTHCHECK stays unauthenticated.
     assert client.get("/health").status_code == 200
+
+
+def test_any_configured_token_passes() -> None:
+    async def ok(request):
+        return PlainTextResponse("ok")
+
+    app = Starlette(routes=[Route("/mcp", ok)])
+    app.add_middleware(BearerAuthMiddleware, auth_token=("old-token", "new-token"))
+    client = TestClient(app)
+
+    assert client.get("/mcp", headers={"Authorization": "Bearer old-token"}).status_code == 200
+    assert client.get("/mcp", headers={"Authorization": "Bearer new-token"}).status_code == 200
+    assert client.get("/mcp", headers={"Authorization": "Bearer other"}).status_code == 401
+
+
+def test_empty_token_list_is_refused() -> None:
+    with pytest.raises(ValueError, match="non-empty token"):
+        BearerAuthMiddleware(None, auth_token=())
+    with pytest.raises(ValueError, match="non-empty token"):
+        BearerAuthMiddleware(None, auth_token="")
+
+
+def test_parse_auth_tokens_splits_on_commas() -> None:
+    assert parse_auth_tokens("a, b,,c ") == ("a", "b", "c")
+    assert parse_auth_tokens("") == ()
+
+
+async def test_streamed_body_passes_through_unbuffered() -> None:
+    """Regression: BaseHTTPMiddleware re-wrapped the body stream of SSE responses.
+
+    The first chunk must reach the client while the app is still streaming.
+    """
+    release = asyncio.Event()
+    sent: list[dict] = []
+
+    async def sse_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"data: 1\n\n", "more_body": True})
+        await release.wait()
+        await send({"type": "http.response.body", "body": b"data: 2\n\n", "more_body": False})
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = BearerAuthMiddleware(sse_app, auth_token=_TOKEN)
+    scope = {
+        "type": "http",
+        "path": "/mcp",
+        "headers": [(b"authorization", f"Bearer {_TOKEN}".encode())],
+    }
+    task = asyncio.create_task(middleware(scope, None, send))
+    await asyncio.sleep(0.05)
+
+    assert [m.get("body") for m in sent] == [None, b"data: 1\n\n"]
+    release.set()
+    await task
+    assert sent[-1]["body"] == b"data: 2\n\n"
@@ -0,0 +1,142 @@
+"""Tests for chunked parallel execution of long-window aggregates."""
+
+from __future__ import annotations
+
+import logging
+from decimal import Decimal
+from typing import Any
+
+import psycopg
+
+from teslamate_mcp.db import fetch_all
+from teslamate_mcp.tools.chunked import ChunkPolicy, Derived, chunk_count, query_in_chunks
+from teslamate_mcp.tools.registry import discover_predefined_tools
+
+# Five years of samples for both cars, every 3 days. Pressures are binary
+# fractions, so float averages do not depend on summation order.
+_HISTORY_SQL = """
+INSERT INTO positions (car_id, date, battery_level, usable_battery_level,
+    tpms_pressure_fl, tpms_pressure_fr, tpms_pressure_rl, tpms_pressure_rr)
+SELECT car_id, now() - make_interval(days => 3 * n, hours => 7 * car_id),
+    (n * 37 + car_id * 11) % 101, (n * 37 + car_id * 11) % 101,
+    2.5 + (n % 4) * 0.25, 2.75, 2.25 + (n % 2) * 0.25, 2.5
+FROM generate_series(1, 600) AS n, (VALUES (1), (2)) AS cars (car_id)
+"""
+
+
+class _Pool:
+    def __init__(self, **stats: int) -> None:
+        self.stats = {"pool_max": 10, "pool_size": 1, "pool_available": 1, "requests_waiting": 0}
+        self.stats |= stats
+
+    def get_stats(self) -> dict[str, int]:
+        return self.stats
+
+
+def test_chunk_count_follows_free_pool_capacity() -> None:
+    assert chunk_count(_Pool(), 4) == 4  # 10 free, one kept back
+    assert chunk_count(_Pool(pool_size=10, pool_available=3), 4) == 2
+    assert chunk_count(_Pool(pool_size=10, pool_available=0, requests_waiting=2), 4) == 1
+    assert chunk_count(_Pool(pool_max=1), 4) == 1
+
+
+def test_merged_partials_match_postgres_rounding() -> None:
+    policy = ChunkPolicy(
+        window="days",
+        order_by=(("car_name", False),),
+        key=("car_name",),
+        merge=(("samples", "sum"), ("soc_sum", "sum"), ("min_soc", "min")),
+        derive=(Derived("avg_soc", "soc_sum", "samples", scale=1),),
+        helpers=frozenset({"soc_sum"}),
+    )
+    rows = policy.combine(
+        [
+            [
+                {
+                    "car_name": "a",
+                    "samples": 2,
+                    "avg_soc": Decimal("20.5"),
+                    "min_soc": 20,
+                    "soc_sum": 41,
+                }
+            ],
+            [
+                {
+                    "car_name": "a",
+                    "samples": 2,
+                    "avg_soc": Decimal("50.0"),
+                    "min_soc": None,
+                    "soc_sum": 100,
+                }
+            ],
+            [
+                {
+                    "car_name": "b",
+                    "samples": 1,
+                    "avg_soc": Decimal("7.0"),
+                    "min_soc": 7,
+                    "soc_sum": 7,
+                }
+            ],
+        ]
+    )
+    # 141 / 4 = 35.25 rounds half away from zero, as ROUND(numeric, 1) does.
+    assert rows == [
+        {"car_name": "a", "samples": 4, "avg_soc": 35.3, "min_soc": 20},
+        {"car_name": "b", "samples": 1, "avg_soc": 7.0, "min_soc": 7},
+    ]
+    assert all(type(row["avg_soc"]) is float for row in rows)
+
+
+async def test_chunked_rows_have_the_serial_rows_types(pool) -> None:
+    async with pool.connection() as conn:
+        await conn.execute(_HISTORY_SQL)
+    tool = {t.name: t for t in discover_predefined_tools()}["get_soc_hygiene"]
+    bound = {p.name: p.default for p in tool.params} | {"days": 1825}
+
+    async def query(sql: str, params: dict[str, Any]) -> list[dict[str, Any]]:
+        return await fetch_all(pool, sql, params)
+
+    chunked = await query_in_chunks(tool, pool, bound, query)
+    serial = await query(tool.render(bound), bound)
+
+    assert chunked is not None and chunked == serial
+    for chunked_row, serial_row in zip(chunked, serial, strict=True):
+        assert {k: type(v) for k, v in chunked_row.items()} == {
+            k: type(v) for k, v in serial_row.items()
+        }
+
+
+async def test_chunked_results_match_a_serial_run(mcp_session, seeded_database, caplog) -> None:
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute(_HISTORY_SQL)
+    calls = [
+        ("get_soc_hygiene", {"days": 1825}),
+        ("get_soc_hygiene", {"days": 400, "car_name": "red"}),
+        ("get_tire_pressure_weekly_trends", {"days": 1825}),
+    ]
+    results = {}
+    # A one-connection pool has no room for chunks: every call runs serially.
+    for pool_max_size in (1, 10):
+        caplog.clear()
+        with caplog.at_level(logging.INFO, logger="teslamate_mcp.tools.chunked"):
+            async with mcp_session(pool_max_size=pool_max_size) as session:
+                for name, args in calls:
+                    result = await session.call_tool(name, args)
+                    assert not result.is_error, result
+                    results.setdefault(name + repr(args), []).append(
+                        result.structured_content["result"]
+                    )
+        chunked = [r.getMessage() for r in caplog.records if "chunk(s)" in r.getMessage()]
+        assert len(chunked) == (0 if pool_max_size == 1 else len(calls))
+    for serial, parallel in results.values():
+        assert serial and parallel == serial
+    assert len(results["get_tire_pressure_weekly_trends{'days': 1825}"][0]) > 400
+
+
+async def test_short_windows_run_serially(mcp_session, caplog) -> None:
+    with caplog.at_level(logging.INFO, logger="teslamate_mcp.tools.chunked"):
+        async with mcp_session() as session:
+            result = await session.call_tool("get_soc_hygiene", {"days": 30})
+    assert not result.is_error
+    assert not [r for r in caplog.records if "chunk(s)" in r.getMessage()]
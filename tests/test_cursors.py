@@ -0,0 +1,114 @@
+"""Integration tests for paged run_sql cursors (requires Docker)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import psycopg
+import pytest
+
+from teslamate_mcp.cursors import CursorError, CursorStore
+
+_SERIES = "SELECT n FROM generate_series(1, 5) AS n ORDER BY n"
+
+
+def _store(**overrides) -> CursorStore:
+    options = {
+        "page_size": 2,
+        "max_open": 2,
+        "idle_timeout_s": 30,
+        "max_age_s": 60,
+        "statement_timeout_ms": 2000,
+    } | overrides
+    return CursorStore(**options)
+
+
+async def test_single_page_result_holds_no_connection(pool) -> None:
+    store = _store(page_size=10)
+    page = await store.first_page(pool, _SERIES)
+    assert [r["n"] for r in page.rows] == [1, 2, 3, 4, 5]
+    assert page.next_cursor is None
+    assert store.open_count == 0
+
+
+async def test_pages_follow_until_exhausted(pool) -> None:
+    store = _store()
+    page = await store.first_page(pool, _SERIES)
+    seen = [r["n"] for r in page.rows]
+    while page.next_cursor is not None:
+        previous = page.next_cursor
+        page = await store.next_page(previous, _SERIES)
+        seen += [r["n"] for r in page.rows]
+        with pytest.raises(CursorError, match="Unknown or expired"):
+            await store.next_page(previous, _SERIES)  # tokens are single-use
+    assert seen == [1, 2, 3, 4, 5]
+    assert store.open_count == 0
+
+
+async def test_pages_come_from_the_first_calls_snapshot(pool, database_url) -> None:
+    """Rows committed between pages must not shift or appear in later pages."""
+    store = _store(page_size=1)
+    query = "SELECT name FROM demo_cars ORDER BY id"
+    page = await store.first_page(pool, query)
+    assert page.rows == [{"name": "Model 3"}]
+
+    async with await psycopg.AsyncConnection.connect(database_url, autocommit=True) as conn:
+        await conn.execute("DELETE FROM demo_cars WHERE name = 'Model Y'")
+        await conn.execute("INSERT INTO demo_cars (name) VALUES ('Cybertruck')")
+
+    page = await store.next_page(page.next_cursor, query)
+    assert page.rows == [{"name": "Model Y"}]
+    assert page.next_cursor is None
+
+
+async def test_full_store_signals_fallback(pool) -> None:
+    store = _store(max_open=1)
+    first = await store.first_page(pool, _SERIES)
+    assert first.next_cursor is not None
+    assert await store.first_page(pool, _SERIES) is None
+    await store.close_all()
+    assert store.open_count == 0
+
+
+async def test_cursor_is_tied_to_its_query(pool) -> None:
+    store = _store()
+    page = await store.first_page(pool, _SERIES)
+    with pytest.raises(CursorError, match="different query"):
+        await store.next_page(page.next_cursor, "SELECT 1")
+    # The mismatch does not burn the token.
+    assert (await store.next_page(page.next_cursor, _SERIES)).rows == [{"n": 3}, {"n": 4}]
+    await store.close_all()
+
+
+async def test_idle_cursors_expire(pool) -> None:
+    store = _store(idle_timeout_s=0.2)
+    page = await store.first_page(pool, _SERIES)
+    await asyncio.sleep(0.4)
+    with pytest.raises(CursorError, match="expired"):
+        await store.next_page(page.next_cursor, _SERIES)
+    assert store.open_count == 0
+
+
+async def test_a_cursor_fetching_its_next_page_still_counts_against_the_cap(pool) -> None:
+    store = _store(max_open=1)
+    slow = "SELECT n, pg_sleep(CASE WHEN n > 3 THEN 0.3 ELSE 0 END) FROM generate_series(1, 5) n"
+    page = await store.first_page(pool, slow)
+    fetching = asyncio.create_task(store.next_page(page.next_cursor, slow))
+    await asyncio.sleep(0.1)
+    assert store.open_count == 0  # out of the registry while it fetches
+    assert await store.first_page(pool, _SERIES) is None
+    assert [r["n"] for r in (await fetching).rows] == [3, 4]
+    await store.close_all()
+
+
+async def test_reaper_returns_expired_connections_without_another_call(pool) -> None:
+    store = _store(idle_timeout_s=0.2)
+    store.start()
+    try:
+        await store.first_page(pool, _SERIES)
+        assert pool.get_stats()["pool_available"] == pool.get_stats()["pool_size"] - 1
+        await asyncio.sleep(0.6)
+        assert store.open_count == 0
+        assert pool.get_stats()["pool_available"] == pool.get_stats()["pool_size"]
+    finally:
+        await store.stop()
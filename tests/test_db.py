@@ -2,12 +2,31 @@
 
 from __future__ import annotations
 
+import anyio
 import psycopg
 import pytest
 
 from teslamate_mcp.config import Settings
+from teslamate_mcp.cursors import CursorStore
 from teslamate_mcp.db import build_pool, fetch_all, fetch_readonly
 
+_SLOW = "SELECT pg_sleep(30) AS slow /* cancel-probe */"
+
+
+async def running_probes(pool) -> int:
+    """Backends still running a `cancel-probe` statement, once they settle."""
+    async with pool.connection() as conn:
+        for _ in range(20):
+            cur = await conn.execute(
+                "SELECT count(*) AS n FROM pg_stat_activity "
+                "WHERE query LIKE '%%cancel-probe%%' AND state = 'active' "
+                "AND pid <> pg_backend_pid()"
+            )
+            if (n := (await cur.fetchone())["n"]) == 0:
+                return 0
+            await anyio.sleep(0.1)
+    return n
+
 
 async def test_fetch_all_returns_jsonable_rows(pool) -> None:
     rows = await fetch_all(pool, "SELECT name, battery_kwh FROM demo_cars ORDER BY id")
@@ -53,6 +72,25 @@ async def test_predefined_path_is_bounded_by_the_pool_timeout(pool) -> None:
         await fetch_all(pool, "SELECT pg_sleep(60)")
 
 
+async def test_fetch_all_applies_settings_for_one_transaction_only(pool) -> None:
+    query = "SELECT current_setting('work_mem') AS work_mem, current_setting('jit') AS jit"
+    scoped = await fetch_all(pool, query, settings={"work_mem": "12MB", "jit": "off"})
+    after = await fetch_all(pool, query)
+
+    assert scoped == [{"work_mem": "12MB", "jit": "off"}]
+    assert after[0]["work_mem"] != "12MB"
+
+
+async def test_fetch_all_settings_can_tighten_the_timeout(pool) -> None:
+    with pytest.raises(psycopg.errors.QueryCanceled):
+        await fetch_all(pool, "SELECT pg_sleep(2)", settings={"statement_timeout": "200"})
+
+
+async def test_fetch_all_caps_rows(pool) -> None:
+    rows = await fetch_all(pool, "SELECT n FROM generate_series(1, 50) AS n", max_rows=3)
+    assert rows == [{"n": 1}, {"n": 2}, {"n": 3}]
+
+
 def test_build_pool_sets_a_statement_timeout() -> None:
     settings = Settings(  # type: ignore[call-arg]
         database_url="postgresql://u:p@localhost:5432/db",
@@ -67,3 +105,28 @@ def test_build_pool_defers_to_operator_supplied_options() -> None:
         database_url="postgresql://u:p@localhost:5432/db?options=-c%20statement_timeout%3D999",
     )
     assert "options" not in build_pool(settings).kwargs
+
+
+@pytest.mark.parametrize(
+    "run",
+    [
+        lambda pool: fetch_all(pool, _SLOW),
+        lambda pool: fetch_all(pool, _SLOW, settings={"jit": "off"}),
+        lambda pool: fetch_readonly(pool, _SLOW, statement_timeout_ms=60_000),
+        lambda pool: CursorStore(
+            page_size=10, max_open=1, idle_timeout_s=30, max_age_s=60, statement_timeout_ms=60_000
+        ).first_page(pool, _SLOW),
+    ],
+    ids=["fetch_all", "fetch_all_with_settings", "fetch_readonly", "cursor_first_page"],
+)
+async def test_cancelling_the_caller_cancels_the_backend_query(pool, run) -> None:
+    """The SDK cancels handlers through anyio scopes; the statement must not outlive them."""
+    with anyio.move_on_after(0.5) as scope:
+        await run(pool)
+    assert scope.cancelled_caught
+    assert await running_probes(pool) == 0
+    # The connection went back to the pool idle, not discarded while still busy.
+    stats = pool.get_stats()
+    assert stats["pool_available"] == stats["pool_size"]
+    assert stats.get("connections_lost", 0) == 0
+    assert await fetch_all(pool, "SELECT 1 AS one") == [{"one": 1}]
@@ -0,0 +1,81 @@
+"""Tests for `teslamate-mcp doctor`. The database checks need Docker."""
+
+from __future__ import annotations
+
+import psycopg
+from click.testing import CliRunner
+
+from teslamate_mcp import cli
+from teslamate_mcp.doctor import TableHealth, judge, run_doctor
+from teslamate_mcp.tools import discover_predefined_tools
+
+
+def _scan(node_type: str, relation: str, rows: int, **extra) -> dict:
+    return {"Node Type": node_type, "Relation Name": relation, "Plan Rows": rows, **extra}
+
+
+_TABLES = {
+    "positions": TableHealth("positions", 5_000_000, analyzed=True, modified_fraction=0.0),
+    "cars": TableHealth("cars", 2, analyzed=True, modified_fraction=0.0),
+}
+
+
+def test_a_sequential_scan_of_a_large_table_fails_the_tool():
+    plan = {
+        "Node Type": "Hash Join",
+        "Plan Rows": 10,
+        "Plans": [_scan("Seq Scan", "positions", 9000), _scan("Seq Scan", "cars", 2)],
+    }
+
+    verdict = judge("get_soc_hygiene", plan, _TABLES, large_table_rows=1_000_000)
+
+    assert verdict.verdict == "fail"
+    assert verdict.worst_node == "Seq Scan on positions"
+    assert verdict.estimated_rows == 9000
+    assert judge("get_soc_hygiene", plan, _TABLES, large_table_rows=10**7).verdict == "ok"
+
+
+def test_index_scans_pass_and_table_problems_warn():
+    plan = {
+        "Node Type": "Nested Loop",
+        "Plan Rows": 2,
+        "Plans": [
+            _scan("Seq Scan", "cars", 2),
+            _scan("Index Scan", "positions", 1, **{"Index Name": "positions_car_id_date"}),
+        ],
+    }
+    verdict = judge("get_current_car_status", plan, _TABLES, large_table_rows=1_000_000)
+    assert verdict.verdict == "ok"
+    assert verdict.worst_node == "Index Scan on positions using positions_car_id_date"
+
+    stale = dict(_TABLES, positions=TableHealth("positions", 5_000_000, True, 0.5))
+    verdict = judge("get_current_car_status", plan, stale, large_table_rows=1_000_000)
+    assert verdict.verdict == "warn"
+    assert verdict.notes == ["positions: 50% of rows changed since last ANALYZE"]
+
+
+def test_doctor_reports_missing_indexes_and_plans_every_tool(seeded_database):
+    tools = discover_predefined_tools()
+
+    report = run_doctor(seeded_database, tools, report_timezone="UTC", large_table_rows=10**6)
+
+    assert [v.tool for v in report.tools] == [t.name for t in tools]
+    assert not report.failed
+    # The test schema has primary keys only.
+    assert report.tables["positions"].missing_indexes == [("car_id", "date")]
+    with psycopg.connect(seeded_database, autocommit=True) as conn:
+        conn.execute("CREATE INDEX ON positions (car_id, date, battery_level)")
+    report = run_doctor(seeded_database, tools, report_timezone="UTC", large_table_rows=10**6)
+    assert report.tables["positions"].missing_indexes == []
+
+
+def test_doctor_command_exits_non_zero_on_large_sequential_scans(seeded_database, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", seeded_database)
+
+    passing = CliRunner().invoke(cli.main, ["doctor"])
+    failing = CliRunner().invoke(cli.main, ["doctor", "--large-table-rows", "1"])
+
+    assert passing.exit_code == 0, passing.output
+    assert "get_current_car_status" in passing.output
+    assert failing.exit_code == 1
+    assert "sequentially scan a large table" in failing.output
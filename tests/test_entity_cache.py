@@ -0,0 +1,119 @@
+"""Tests for the disk-backed cache of finished drives and charging sessions."""
+
+from __future__ import annotations
+
+import contextlib
+import sqlite3
+
+import psycopg
+
+from teslamate_mcp.entity_cache import EntityCache, variant_digest
+
+_VARIANT = variant_digest({"max_points": 200, "tz": "UTC"})
+
+
+def _rows(entity_id: int, n: int = 3) -> list[dict]:
+    return [{"drive_id": entity_id, "point_order": i, "label": "x" * 20} for i in range(1, n + 1)]
+
+
+async def test_entries_survive_a_reopen(tmp_path) -> None:
+    path = str(tmp_path / "cache" / "entities.sqlite3")
+    cache = EntityCache(path, max_bytes=1_000_000)
+    cache.open({"get_drive_route": "v1"})
+    await cache.put_many("get_drive_route", "v1", {1: _rows(1), 2: []}, _VARIANT)
+    cache.close()
+
+    reopened = EntityCache(path, max_bytes=1_000_000)
+    reopened.open({"get_drive_route": "v1"})
+    try:
+        assert await reopened.get_many("get_drive_route", "v1", [1, 2, 3], _VARIANT) == {
+            1: _rows(1),
+            2: [],
+        }
+        other = variant_digest({"max_points": 50, "tz": "UTC"})
+        assert await reopened.get_many("get_drive_route", "v1", [1], other) == {}
+    finally:
+        reopened.close()
+
+
+async def test_changed_queries_drop_their_entries_on_open(tmp_path) -> None:
+    path = str(tmp_path / "entities.sqlite3")
+    cache = EntityCache(path, max_bytes=1_000_000)
+    cache.open({"get_drive_route": "v1", "get_charging_curve": "c1"})
+    await cache.put_many("get_drive_route", "v1", {1: _rows(1)}, _VARIANT)
+    await cache.put_many("get_charging_curve", "c1", {7: _rows(7)}, _VARIANT)
+    cache.close()
+
+    cache.open({"get_drive_route": "v2", "get_charging_curve": "c1"})
+    try:
+        assert await cache.get_many("get_drive_route", "v1", [1], _VARIANT) == {}
+        assert await cache.get_many("get_charging_curve", "c1", [7], _VARIANT) == {7: _rows(7)}
+    finally:
+        cache.close()
+
+
+async def test_least_recently_read_entries_are_evicted_first(tmp_path) -> None:
+    probe = EntityCache(str(tmp_path / "probe.sqlite3"), max_bytes=1_000_000)
+    probe.open({})
+    await probe.put_many("t", "v", {1: _rows(1)}, _VARIANT)
+    size = probe.total_bytes
+    probe.close()
+
+    cache = EntityCache(str(tmp_path / "entities.sqlite3"), max_bytes=2 * size)
+    cache.open({"t": "v"})
+    try:
+        await cache.put_many("t", "v", {1: _rows(1)}, _VARIANT)
+        await cache.put_many("t", "v", {2: _rows(2)}, _VARIANT)
+        await cache.get_many("t", "v", [1], _VARIANT)  # 2 is now the least recently read
+        await cache.put_many("t", "v", {3: _rows(3)}, _VARIANT)
+
+        assert set(await cache.get_many("t", "v", [1, 2, 3], _VARIANT)) == {1, 3}
+        assert cache.total_bytes == 2 * size
+    finally:
+        cache.close()
+
+
+async def test_an_entry_larger_than_the_cache_is_not_admitted(tmp_path) -> None:
+    cache = EntityCache(str(tmp_path / "entities.sqlite3"), max_bytes=50)
+    cache.open({"t": "v"})
+    try:
+        await cache.put_many("t", "v", {1: _rows(1)}, _VARIANT)
+        assert await cache.get_many("t", "v", [1], _VARIANT) == {}
+        assert cache.total_bytes == 0
+    finally:
+        cache.close()
+
+
+async def test_finished_routes_are_cached_and_served_from_disk(
+    mcp_session, seeded_database, tmp_path
+) -> None:
+    path = str(tmp_path / "entities.sqlite3")
+    args = {"drive_ids": [4, 1], "max_points": 10}
+    async with mcp_session(entity_cache_path=path) as session:
+        first = await session.call_tool("get_drive_route", args)
+        assert not first.is_error
+    route = first.structured_content["result"]
+    assert {row["drive_id"] for row in route} == {4}  # drive 1 has no route points
+
+    # Remove the raw rows: a second server can only answer from the cache file.
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute("DELETE FROM positions WHERE date::date = DATE '2026-01-15'")
+    async with mcp_session(entity_cache_path=path) as session:
+        again = await session.call_tool("get_drive_route", args)
+        chart = await session.call_tool("show_drive_route", {"drive_id": 4, "max_points": 10})
+    assert again.structured_content["result"] == route
+    assert chart.structured_content["result"] == route
+
+
+async def test_unfinished_entities_are_not_cached(mcp_session, seeded_database, tmp_path) -> None:
+    path = str(tmp_path / "entities.sqlite3")
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute("UPDATE charging_processes SET end_date = NULL WHERE id = 2")
+    async with mcp_session(entity_cache_path=path) as session:
+        result = await session.call_tool("get_charging_curve", {"charging_process_ids": [2, 1]})
+    ids = [row["charging_process_id"] for row in result.structured_content["result"]]
+    assert ids == sorted(ids) and set(ids) == {1, 2}
+
+    with contextlib.closing(sqlite3.connect(path)) as db:
+        cached = {entity_id for (entity_id,) in db.execute("SELECT entity_id FROM entries")}
+    assert cached == {1}
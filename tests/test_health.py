@@ -0,0 +1,189 @@
+"""Tests for the database health monitor and circuit breaker. The e2e test needs Docker."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+import psycopg
+import pytest
+from mcp import Client
+from psycopg.rows import dict_row
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from teslamate_mcp.config import Settings
+from teslamate_mcp.health import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    DatabaseUnavailableError,
+    HealthMonitor,
+    ProbeTimeoutError,
+    is_connectivity_error,
+    is_saturation_error,
+)
+from teslamate_mcp.server import create_server
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _refused(detail: str) -> psycopg.OperationalError:
+    return psycopg.OperationalError(f"connection refused: {detail}")
+
+
+async def _fail(breaker: CircuitBreaker, exc: Exception) -> None:
+    with pytest.raises(type(exc)):
+        async with breaker.guard():
+            raise exc
+
+
+def test_connectivity_errors_are_told_apart_from_query_errors():
+    assert is_connectivity_error(psycopg.OperationalError("connection refused"))
+    assert is_connectivity_error(ConnectionRefusedError())
+    assert is_connectivity_error(ProbeTimeoutError("no answer within 3s"))
+    assert not is_connectivity_error(psycopg.errors.QueryCanceled("statement timeout"))
+    assert not is_connectivity_error(psycopg.errors.UndefinedTable("no such table"))
+    assert not is_connectivity_error(ValueError("bad input"))
+
+
+def test_waiting_too_long_is_saturation_not_an_outage():
+    for exc in (PoolTimeout("couldn't get a connection after 30.00 sec"), TimeoutError()):
+        assert is_saturation_error(exc)
+        assert not is_connectivity_error(exc)
+    assert not is_saturation_error(ProbeTimeoutError("no answer within 3s"))
+
+
+async def test_saturation_never_opens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10)
+    await _fail(breaker, PoolTimeout("couldn't get a connection after 30.00 sec"))
+    await _fail(breaker, TimeoutError())
+    assert breaker.state == CLOSED
+    assert breaker.saturations == 2
+    assert "30.00 sec" not in (breaker.last_error or "")
+    assert breaker.last_saturation == "TimeoutError"
+
+
+async def test_breaker_opens_after_consecutive_failures_and_fails_fast():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout_s=10, clock=clock)
+
+    await _fail(breaker, _refused("timed out"))
+    assert breaker.state == CLOSED
+    await _fail(breaker, _refused("timed out"))
+    assert breaker.state == OPEN
+
+    ran = False
+    with pytest.raises(DatabaseUnavailableError, match="timed out"):
+        async with breaker.guard():
+            ran = True
+    assert not ran
+
+
+async def test_query_errors_do_not_open_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10)
+    await _fail(breaker, psycopg.errors.QueryCanceled("statement timeout"))
+    await _fail(breaker, ValueError("no such session"))
+    assert breaker.state == CLOSED
+
+
+async def test_half_open_admits_one_trial_that_closes_the_circuit():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10, clock=clock)
+    await _fail(breaker, _refused("down"))
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+
+    async with breaker.guard():
+        # While the trial is in flight, everyone else still fails fast.
+        with pytest.raises(DatabaseUnavailableError):
+            async with breaker.guard():
+                pass
+    assert breaker.state == CLOSED
+
+
+async def test_failed_trial_reopens_for_a_full_reset_period():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout_s=10, clock=clock)
+    for _ in range(3):
+        await _fail(breaker, _refused("down"))
+    clock.now = 10
+    await _fail(breaker, _refused("still down"))  # one failure is enough once open
+    assert breaker.state == OPEN
+    clock.now = 19
+    assert breaker.state == OPEN
+    clock.now = 20
+    assert breaker.state == HALF_OPEN
+
+
+async def test_cancelled_trial_frees_the_slot():
+    clock = _Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout_s=10, clock=clock)
+    await _fail(breaker, _refused("down"))
+    clock.now = 10
+    with pytest.raises(asyncio.CancelledError):
+        async with breaker.guard():
+            raise asyncio.CancelledError
+    async with breaker.guard():
+        pass
+    assert breaker.state == CLOSED
+
+
+async def test_monitor_probes_in_the_background(pool):
+    monitor = HealthMonitor(
+        CircuitBreaker(failure_threshold=1, reset_timeout_s=10), interval_s=0.05
+    )
+    monitor.start(pool)
+    try:
+        await asyncio.sleep(0.2)
+    finally:
+        await monitor.stop()
+    assert monitor.snapshot is not None
+    assert monitor.snapshot.ok
+    assert monitor.snapshot.latency_ms is not None
+    assert time.time() - monitor.snapshot.checked_at < 1
+
+
+async def test_probe_does_not_wait_on_a_saturated_pool(database_url):
+    pool = AsyncConnectionPool(
+        database_url, min_size=1, max_size=1, kwargs={"row_factory": dict_row}, open=False
+    )
+    await pool.open()
+    monitor = HealthMonitor(
+        CircuitBreaker(failure_threshold=1, reset_timeout_s=60), interval_s=60, probe_timeout_s=1
+    )
+    try:
+        async with pool.connection():  # every pooled connection is taken
+            snapshot = await monitor.probe(pool)
+            again = await monitor.probe(pool)  # reuses the dedicated connection
+    finally:
+        await monitor.stop()
+        await pool.close()
+    assert snapshot.ok and again.ok
+    assert monitor.breaker.state == CLOSED
+
+
+async def test_tool_calls_fail_fast_while_the_circuit_is_open(seeded_database):
+    settings = Settings(database_url=seeded_database, circuit_reset_timeout_s=60)  # type: ignore[call-arg]
+    mcp = create_server(settings)
+    async with Client(mcp, raise_exceptions=False) as client:
+        breaker = mcp.teslamate_app_context.health.breaker  # type: ignore[attr-defined]
+        for _ in range(settings.circuit_failure_threshold):
+            breaker.record_failure("connection refused")
+
+        start = time.perf_counter()
+        result = await client.call_tool("get_current_car_status", {})
+        elapsed = time.perf_counter() - start
+
+        assert result.is_error
+        assert "unreachable" in result.content[0].text
+        assert elapsed < 1
+
+        breaker.record_success()
+        assert not (await client.call_tool("get_current_car_status", {})).is_error
@@ -0,0 +1,102 @@
+"""Unit tests for keyset pagination: cursors, SQL expansion, sidecar validation."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from teslamate_mcp.tools.keyset import (
+    KeysetCursorError,
+    SortKey,
+    decode_cursor,
+    encode_cursor,
+    expand_keyset,
+)
+from teslamate_mcp.tools.registry import discover_predefined_tools
+
+_SQL = "SELECT 1 FROM drives d WHERE TRUE /*[keyset]*/ ORDER BY /*[keyset_order]*/"
+
+
+def test_cursor_roundtrips_and_is_bound_to_order_and_filters():
+    token = encode_cursor("distance", 12.5, 42, "f1")
+
+    assert decode_cursor(token, "distance", "f1") == (12.5, 42)
+    with pytest.raises(KeysetCursorError, match="other filters"):
+        decode_cursor(token, "duration", "f1")
+    with pytest.raises(KeysetCursorError, match="other filters"):
+        decode_cursor(token, "distance", "f2")
+    with pytest.raises(KeysetCursorError, match="Malformed"):
+        decode_cursor("not-a-cursor", "distance", "f1")
+
+
+def test_expand_keyset_variants():
+    date = SortKey("d.start_date", "start_date")
+    distance = SortKey("d.distance", "distance_km", nullable=True)
+
+    assert expand_keyset(_SQL, date, "d.id", None) == (
+        "SELECT 1 FROM drives d WHERE TRUE  ORDER BY d.start_date DESC, d.id DESC"
+    )
+    assert "AND (d.start_date, d.id) < (%(_after_key)s, %(_after_id)s)" in expand_keyset(
+        _SQL, date, "d.id", "value"
+    )
+    nullable = expand_keyset(_SQL, distance, "d.id", "value")
+    assert "OR d.distance IS NULL)" in nullable
+    assert nullable.endswith("ORDER BY d.distance DESC NULLS LAST, d.id DESC")
+    assert "AND d.distance IS NULL AND d.id < %(_after_id)s" in expand_keyset(
+        _SQL, distance, "d.id", "null"
+    )
+
+
+def _write(directory: Path, sql: str, pagination: str) -> None:
+    (directory / "q.sql").write_text(sql, encoding="utf-8")
+    (directory / "q.toml").write_text(
+        'name = "x"\ndescription = "a perfectly valid description here"\n'
+        '[[params]]\nname = "limit"\ntype = "integer"\ndescription = "Rows."\n'
+        "default = 10\nmaximum = 100\n"
+        '[[output]]\nname = "id"\ntype = "integer"\n'
+        '[[output]]\nname = "start_date"\ntype = "string"\n' + pagination,
+        encoding="utf-8",
+    )
+
+
+_PAGINATION = (
+    '[pagination]\nid = "d.id"\nid_column = "id"\n'
+    '[pagination.keys.start_date]\nsql = "d.start_date"\ncolumn = "start_date"\n'
+)
+
+
+def test_paginated_sidecar_is_discovered(tmp_path: Path):
+    _write(tmp_path, _SQL + " LIMIT %(limit)s::int", _PAGINATION)
+    (tool,) = discover_predefined_tools(tmp_path)
+
+    assert tool.pagination is not None
+    assert tool.render({"limit": 10}).endswith("d.id DESC LIMIT %(limit)s::int")
+
+
+@pytest.mark.parametrize(
+    ("sql", "pagination", "message"),
+    [
+        ("SELECT 1 LIMIT %(limit)s::int", _PAGINATION, "exactly one"),
+        (_SQL + " LIMIT %(limit)s::int", "", "need a \\[pagination\\] table"),
+        (
+            _SQL + " LIMIT %(limit)s::int",
+            _PAGINATION.replace('column = "start_date"', 'column = "nope"'),
+            "'nope' is not in \\[\\[output\\]\\]",
+        ),
+        (
+            _SQL + " LIMIT %(limit)s::int",
+            _PAGINATION.replace('id = "d.id"', 'id = "id; DROP"'),
+            "qualified column",
+        ),
+        (
+            _SQL + " LIMIT %(limit)s::int",
+            _PAGINATION.replace("[pagination]\n", '[pagination]\norder_param = "order_by"\n'),
+            "one entry per 'order_by' enum value",
+        ),
+    ],
+)
+def test_bad_pagination_raises(tmp_path: Path, sql: str, pagination: str, message: str):
+    _write(tmp_path, sql, pagination)
+    with pytest.raises(ValueError, match=message):
+        discover_predefined_tools(tmp_path)
@@ -0,0 +1,100 @@
+"""Integration tests for the change feed behind the live car-state resources (requires Docker)."""
+
+from __future__ import annotations
+
+import json
+
+import anyio
+import psycopg
+import pytest
+
+from teslamate_mcp.live import ACTIVE_CHARGING_URI, ListenerCountingBus, car_status_uri
+
+_STATUS_URI = car_status_uri("Blue Thunder")
+
+
+async def _read(session, uri: str):
+    return json.loads((await session.read_resource(uri)).contents[0].text)
+
+
+def test_status_uri_escapes_the_car_name() -> None:
+    assert _STATUS_URI == "teslamate://cars/Blue%20Thunder/status"
+
+
+def test_bus_counts_listen_streams_once_each() -> None:
+    bus = ListenerCountingBus()
+    first, second = bus.subscribe(lambda _e: None), bus.subscribe(lambda _e: None)
+    assert bus.listeners == 2
+    first()
+    first()  # unsubscribe is idempotent
+    assert bus.listeners == 1
+    second()
+    assert bus.listeners == 0
+
+
+async def test_live_resources_read_the_latest_state(mcp_session) -> None:
+    async with mcp_session() as session:
+        status = await _read(session, _STATUS_URI)
+        assert (status["car_name"], status["battery_level"]) == ("Blue Thunder", 80)
+        assert (await _read(session, "teslamate://cars/blue%20thunder/status")) == status
+        assert await _read(session, ACTIVE_CHARGING_URI) == []
+
+        with pytest.raises(Exception, match="No car named"):
+            await session.read_resource(car_status_uri("Nope"))
+
+
+async def test_subscribers_are_notified_only_of_resources_that_changed(
+    mcp_session, seeded_database
+) -> None:
+    conn = await psycopg.AsyncConnection.connect(seeded_database, autocommit=True)
+    try:
+        async with (
+            mcp_session(live_poll_interval_s=1) as session,
+            session.listen(resource_subscriptions=[_STATUS_URI, ACTIVE_CHARGING_URI]) as sub,
+        ):
+
+            async def next_update() -> str:
+                with anyio.fail_after(10):
+                    async for event in sub:
+                        return event.uri
+                raise AssertionError("listen stream ended")
+
+            # The first poll only records a baseline: nothing is published for it.
+            await anyio.sleep(1.5)
+            await conn.execute(
+                "INSERT INTO positions (car_id, date, battery_level, usable_battery_level) "
+                "VALUES (1, now(), 79, 78)"
+            )
+            assert await next_update() == _STATUS_URI
+            assert (await _read(session, _STATUS_URI))["battery_level"] == 79
+
+            await conn.execute(
+                "INSERT INTO charging_processes (car_id, start_date, start_battery_level) "
+                "VALUES (2, now(), 60)"
+            )
+            assert await next_update() == ACTIVE_CHARGING_URI
+            (active,) = await _read(session, ACTIVE_CHARGING_URI)
+            assert (active["car_name"], active["start_battery_level"]) == ("Red Rocket", 60)
+
+            # New addresses and edited cars move a mark too, not just new samples.
+            await conn.execute(
+                "INSERT INTO positions (car_id, date, latitude, longitude, battery_level) "
+                "VALUES (1, now(), 10.5, 20.5, 79)"
+            )
+            assert await next_update() == _STATUS_URI
+            await conn.execute(
+                "INSERT INTO addresses (id, display_name, city, latitude, longitude) "
+                "VALUES (100, 'Harbour Gate', 'Portville', 10.5, 20.5)"
+            )
+            assert await next_update() == _STATUS_URI
+            assert (await _read(session, _STATUS_URI))["location"] == "Harbour Gate"
+            await conn.execute("UPDATE cars SET name = 'Blue Lightning' WHERE id = 1")
+            assert await next_update() == _STATUS_URI
+            with pytest.raises(Exception, match="No car named"):
+                await session.read_resource(_STATUS_URI)
+    finally:
+        await conn.execute("DELETE FROM positions WHERE date > now() - interval '1 minute'")
+        await conn.execute("DELETE FROM charging_processes WHERE end_date IS NULL")
+        await conn.execute("DELETE FROM addresses WHERE id = 100")
+        await conn.execute("UPDATE cars SET name = 'Blue Thunder' WHERE id = 1")
+        await conn.close()
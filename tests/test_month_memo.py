@@ -0,0 +1,98 @@
+"""Tests for memoized closed months in the monthly report tools."""
+
+from __future__ import annotations
+
+import logging
+
+import psycopg
+
+# Older months for both cars, so every tool has several closed groups.
+_HISTORY_SQL = """
+INSERT INTO drives (car_id, start_date, end_date, distance, duration_min, speed_max,
+    outside_temp_avg, start_address_id, end_address_id)
+SELECT car_id, start_date, start_date + interval '20 min', 10.0 * car_id + n, 20, 100, 12.0, 1, 2
+FROM generate_series(2, 5) AS n,
+    (VALUES (1), (2)) AS cars (car_id),
+    LATERAL (SELECT DATE_TRUNC('month', now()) - make_interval(months => n)
+        + make_interval(days => 3 + car_id) AS start_date) s;
+INSERT INTO charging_processes (car_id, start_date, end_date, charge_energy_added, duration_min,
+    cost, address_id, start_battery_level, end_battery_level)
+SELECT car_id, start_date, start_date + interval '40 min', 30.0 + n, 40, 5.0 * n, 1, 30, 70
+FROM generate_series(2, 5) AS n,
+    (VALUES (1), (2)) AS cars (car_id),
+    LATERAL (SELECT DATE_TRUNC('month', now()) - make_interval(months => n)
+        + make_interval(days => 5 + car_id) AS start_date) s;
+"""
+
+_CALLS = [
+    ("get_monthly_driving_summary", {}),
+    ("get_monthly_driving_summary", {"days": 100}),
+    ("get_efficiency_by_month_and_temperature", {"car_name": "blue"}),
+    ("get_battery_capacity_trend", {"min_soc_delta": 10}),
+    ("get_charging_costs", {"group_by": "month"}),
+    ("get_charging_costs", {"group_by": "month", "start_date": "2025-01-01"}),
+    ("get_charging_costs", {"group_by": "car"}),
+]
+
+
+async def _results(session) -> list:
+    results = []
+    for name, args in _CALLS:
+        result = await session.call_tool(name, args)
+        assert not result.is_error, result
+        results.append(result.structured_content["result"])
+    return results
+
+
+async def test_memoized_months_match_a_full_recompute(mcp_session, seeded_database, caplog) -> None:
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute(_HISTORY_SQL)
+    async with mcp_session(month_memo_max_entries=0) as session:
+        expected = await _results(session)
+
+    with caplog.at_level(logging.INFO, logger="teslamate_mcp.tools.month_memo"):
+        async with mcp_session() as session:
+            first = await _results(session)
+            caplog.clear()
+            second = await _results(session)
+    assert first == expected
+    assert second == expected
+    served = [r.getMessage() for r in caplog.records if "from the memo" in r.getMessage()]
+    # Six memoized calls (group_by=car is not), each served closed months.
+    assert len(served) == 6
+    assert all(" 0 month(s)" not in message for message in served)
+
+
+async def test_late_rows_and_updates_invalidate_their_month(
+    mcp_session, seeded_database, caplog
+) -> None:
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute(_HISTORY_SQL)
+        async with mcp_session() as session:
+            before = await _results(session)
+            # An imported drive and charge land in a closed month; an older
+            # drive's distance and a charge's cost are corrected.
+            await conn.execute(
+                "INSERT INTO drives (car_id, start_date, end_date, distance, duration_min,"
+                " speed_max, outside_temp_avg, start_address_id, end_address_id)"
+                " SELECT 1, DATE_TRUNC('month', now()) - interval '3 months' + interval '20 days',"
+                " DATE_TRUNC('month', now()) - interval '3 months' + interval '20 days 1 hour',"
+                " 99.0, 60, 150, 5.0, 1, 2"
+            )
+            await conn.execute(
+                "INSERT INTO charging_processes (car_id, start_date, end_date, charge_energy_added,"
+                " duration_min, cost, address_id, start_battery_level, end_battery_level)"
+                " SELECT 2, DATE_TRUNC('month', now()) - interval '4 months' + interval '20 days',"
+                " DATE_TRUNC('month', now()) - interval '4 months' + interval '20 days 1 hour',"
+                " 40.0, 60, 9.0, 1, 20, 80"
+            )
+            await conn.execute(
+                "UPDATE drives SET distance = distance + 1 WHERE start_date"
+                " < DATE_TRUNC('month', now()) - interval '4 months'"
+            )
+            await conn.execute("UPDATE cars SET name = 'Blue Lightning' WHERE id = 1")
+            after = await _results(session)
+    async with mcp_session(month_memo_max_entries=0) as session:
+        expected = await _results(session)
+    assert after == expected
+    assert after != before
@@ -105,8 +105,12 @@ async def test_parameterized_tool_schemas() -> None:
     assert search.get("required", []) == []
 
     details = tools["get_drive_details"].input_schema
-    assert details["required"] == ["drive_id"]
-    assert details["properties"]["drive_id"]["type"] == "integer"
+    assert details.get("required", []) == []
+    assert {"type": "integer"} in details["properties"]["drive_id"]["anyOf"]
+    batch = next(s for s in details["properties"]["drive_ids"]["anyOf"] if s["type"] == "array")
+    assert batch["items"] == {"type": "integer"}
+    assert (batch["minItems"], batch["maxItems"]) == (1, 100)
+    assert tools["get_drive_details"].meta == {"teslamate/one_of": ["drive_id", "drive_ids"]}
 
     degradation = tools["get_battery_degradation_over_time"].input_schema
     assert degradation["properties"]["days"]["default"] == 730
@@ -120,7 +124,7 @@ async def test_parameterized_tool_schemas() -> None:
     assert vampire.get("required", []) == []
 
     route = tools["get_drive_route"].input_schema
-    assert route["required"] == ["drive_id"]
+    assert "drive_ids" in route["properties"]
     assert route["properties"]["max_points"]["default"] == 200
 
     comparison = tools["get_period_comparison"].input_schema
@@ -186,3 +190,104 @@ def test_output_contract_violations_raise(tmp_path: Path) -> None:
     )
     with pytest.raises(ValueError, match="unknown output key"):
         discover_predefined_tools(tmp_path)
+
+
+def _write_conditional_query(directory: Path, sql: str) -> None:
+    (directory / "q.sql").write_text(sql, encoding="utf-8")
+    (directory / "q.toml").write_text(
+        'name = "x"\ndescription = "a perfectly valid description here"\n'
+        '[[params]]\nname = "car_name"\ntype = "string"\ndescription = "Car."\n'
+        '[[params]]\nname = "days"\ntype = "integer"\ndescription = "Days."\n'
+        '[[params]]\nname = "drive_id"\ntype = "integer"\ndescription = "Drive."\n'
+        "required = true\n",
+        encoding="utf-8",
+    )
+
+
+def test_conditional_blocks_are_dropped_when_their_param_is_none(tmp_path: Path) -> None:
+    _write_conditional_query(
+        tmp_path,
+        "SELECT 1 FROM drives d WHERE d.id = %(drive_id)s"
+        "/*[if car_name]*/ AND d.name = %(car_name)s/*[end]*/"
+        "/*[if days]*/ AND d.days < %(days)s/*[end]*/",
+    )
+    (tool,) = discover_predefined_tools(tmp_path)
+
+    assert tool.conditions == ("car_name", "days")
+    assert tool.render({"drive_id": 1, "car_name": None, "days": None}) == (
+        "SELECT 1 FROM drives d WHERE d.id = %(drive_id)s"
+    )
+    assert tool.render({"drive_id": 1, "car_name": None, "days": 0}) == (
+        "SELECT 1 FROM drives d WHERE d.id = %(drive_id)s AND d.days < %(days)s"
+    )
+    # Same active set, same (cached) string: prepared statements keep matching.
+    assert tool.render({"days": 1}) is tool.render({"days": 2})
+
+
+def test_bundled_optional_filters_vanish_from_the_executed_sql() -> None:
+    tools = {t.name: t for t in discover_predefined_tools()}
+    search = tools["search_charging_sessions"]
+
+    assert "%(car_name)s" not in search.render({"car_name": None})
+    assert "ILIKE" not in search.render({})
+    assert "%(location)s" in search.render({"location": "edirne"})
+
+
+@pytest.mark.parametrize(
+    ("sql", "message"),
+    [
+        ("SELECT %(drive_id)s /*[if car_name]*/ %(car_name)s %(days)s", "never closed"),
+        ("SELECT %(drive_id)s %(car_name)s %(days)s /*[end]*/", "without a matching"),
+        (
+            "SELECT %(drive_id)s /*[if car_name]*/%(car_name)s /*[if days]*/%(days)s/*[end]*/",
+            "nested",
+        ),
+        ("SELECT %(drive_id)s, %(car_name)s, %(days)s /*[if nope]*/1/*[end]*/", "declared"),
+        ("SELECT %(car_name)s, %(days)s /*[if drive_id]*/%(drive_id)s/*[end]*/", "required"),
+        (
+            "SELECT %(drive_id)s, %(car_name)s WHERE (TRUE /*[if days]*/AND %(days)s > 1)/*[end]*/",
+            r"unbalanced parentheses with conditional blocks \[\] kept",
+        ),
+    ],
+)
+def test_malformed_conditional_blocks_raise(tmp_path: Path, sql: str, message: str) -> None:
+    _write_conditional_query(tmp_path, sql)
+    with pytest.raises(ValueError, match=message):
+        discover_predefined_tools(tmp_path)
+
+
+def test_array_param_contract(tmp_path: Path) -> None:
+    (tmp_path / "q.sql").write_text("SELECT %(ids)s::int[] AS ids", encoding="utf-8")
+    base = 'name = "x"\ndescription = "a perfectly valid description here"\n'
+    param = '[[params]]\nname = "ids"\ntype = "integer[]"\ndescription = "Ids."\n'
+
+    (tmp_path / "q.toml").write_text(base + param + "max_items = 5\n", encoding="utf-8")
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.params[0].max_items == 5
+
+    for extra, message in [
+        ("max_items = 0\n", "positive integer"),
+        ("default = [1, true]\n", "does not match type"),
+        ("minimum = 1\n", "only apply to numeric"),
+    ]:
+        (tmp_path / "q.toml").write_text(base + param + extra, encoding="utf-8")
+        with pytest.raises(ValueError, match=message):
+            discover_predefined_tools(tmp_path)
+
+    scalar = param.replace("integer[]", "integer")
+    (tmp_path / "q.toml").write_text(base + scalar + "max_items = 5\n", encoding="utf-8")
+    with pytest.raises(ValueError, match="only applies to array types"):
+        discover_predefined_tools(tmp_path)
+
+
+def test_one_of_must_name_optional_params(tmp_path: Path) -> None:
+    (tmp_path / "q.sql").write_text("SELECT %(a)s::int, %(b)s::int", encoding="utf-8")
+    base = 'name = "x"\ndescription = "a perfectly valid description here"\n'
+    params = (
+        '[[params]]\nname = "a"\ntype = "integer"\ndescription = "A."\nrequired = true\n'
+        '[[params]]\nname = "b"\ntype = "integer"\ndescription = "B."\n'
+    )
+    for one_of, message in [('["a", "b"]', "must be optional"), ('["b", "c"]', "undeclared")]:
+        (tmp_path / "q.toml").write_text(base + f"one_of = {one_of}\n" + params, encoding="utf-8")
+        with pytest.raises(ValueError, match=message):
+            discover_predefined_tools(tmp_path)
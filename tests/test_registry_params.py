@@ -152,3 +152,348 @@ def test_params_must_be_a_list(tmp_path: Path) -> None:
     (tmp_path / "q.toml").write_text(_BASE + "params = 3\n", encoding="utf-8")
     with pytest.raises(ValueError, match="array of tables"):
         discover_predefined_tools(tmp_path)
+
+
+def test_execution_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(
+        tmp_path,
+        "SELECT 1",
+        _BASE
+        + """
+[execution]
+timeout_ms = 1000
+max_rows = 10
+work_mem = "64MB"
+jit = false
+max_parallel_workers_per_gather = 0
+""",
+    )
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.execution.max_rows == 10
+    assert tool.execution.settings() == {
+        "statement_timeout": "1000",
+        "work_mem": "64MB",
+        "jit": "off",
+        "max_parallel_workers_per_gather": "0",
+    }
+
+
+def test_execution_table_is_optional(tmp_path: Path) -> None:
+    _write_pair(tmp_path, "SELECT 1", _BASE)
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.execution.settings() == {}
+    assert tool.execution.max_rows is None
+
+
+@pytest.mark.parametrize(
+    ("execution_toml", "match"),
+    [
+        ("timeout_ms = 0", "timeout_ms must be an integer >= 1"),
+        ("max_rows = true", "max_rows must be an integer"),
+        ('work_mem = "lots"', "not a size"),
+        ('jit = "off"', "jit must be a boolean"),
+        ("max_parallel_workers_per_gather = -1", "must be an integer >= 0"),
+        ("search_path = 'x'", "unknown execution key"),
+    ],
+)
+def test_bad_execution_table_raises(tmp_path: Path, execution_toml: str, match: str) -> None:
+    _write_pair(tmp_path, "SELECT 1", _BASE + "[execution]\n" + execution_toml + "\n")
+    with pytest.raises(ValueError, match=match):
+        discover_predefined_tools(tmp_path)
+
+
+_CACHED_SQL = (
+    "SELECT id AS drive_id FROM drives WHERE id = ANY(COALESCE(%(ids)s::int[], ARRAY[%(id)s::int]))"
+)
+_CACHED_PARAMS = """
+[[params]]
+name = "id"
+type = "integer"
+description = "One drive."
+
+[[params]]
+name = "ids"
+type = "integer[]"
+description = "Several drives."
+
+[[output]]
+name = "drive_id"
+type = "integer"
+"""
+
+
+def test_cache_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(
+        tmp_path,
+        _CACHED_SQL,
+        _BASE
+        + _CACHED_PARAMS
+        + '[cache]\nentity = "drives"\nid_param = "id"\nids_param = "ids"\nid_column = "drive_id"\n',
+    )
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.cache is not None
+    assert (tool.cache.entity, tool.cache.id_column) == ("drives", "drive_id")
+    assert "FROM drives" in tool.cache.finished_sql()
+
+
+@pytest.mark.parametrize(
+    ("cache_toml", "match"),
+    [
+        ('entity = "positions"', "is not one of"),
+        ('id_param = "ids"', "id_param must name a declared integer param"),
+        ('ids_param = "id"', "ids_param must name a declared integer\\[\\] param"),
+        ('id_column = "id"', "is not an output column"),
+    ],
+)
+def test_bad_cache_table_raises(tmp_path: Path, cache_toml: str, match: str) -> None:
+    keys = {
+        "entity": '"drives"',
+        "id_param": '"id"',
+        "ids_param": '"ids"',
+        "id_column": '"drive_id"',
+    }
+    key, _, value = cache_toml.partition(" = ")
+    keys[key] = value
+    table = "".join(f"{k} = {v}\n" for k, v in keys.items())
+    _write_pair(tmp_path, _CACHED_SQL, _BASE + _CACHED_PARAMS + "[cache]\n" + table)
+    with pytest.raises(ValueError, match=match):
+        discover_predefined_tools(tmp_path)
+
+
+_MEMO_SQL = (
+    "SELECT TO_CHAR(DATE_TRUNC('month', start_date AT TIME ZONE %(tz)s::text), 'YYYY-MM') AS month"
+    " FROM drives WHERE start_date >= CURRENT_DATE - %(days)s::int"
+    " /*[if memo_skip]*/AND TO_CHAR(start_date, 'YYYY-MM') <> ALL(%(memo_skip)s::text[])/*[end]*/"
+    " GROUP BY 1 ORDER BY 1"
+)
+_MEMO_PARAMS = """
+[[params]]
+name = "days"
+type = "integer"
+description = "Window."
+default = 365
+
+[[output]]
+name = "month"
+type = "string"
+"""
+_MEMO_TABLE = """[memo]
+table = "drives"
+date_column = "start_date"
+month_column = "month"
+order_by = ["month"]
+window = ["days"]
+inside = "month_start >= CURRENT_DATE - %(days)s::int"
+"""
+
+
+def test_memo_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(tmp_path, _MEMO_SQL, _BASE + _MEMO_PARAMS + _MEMO_TABLE)
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.memo is not None
+    assert tool.memo.order_by == (("month", False),)
+    assert tool.memo.window == frozenset({"days"})
+    assert "memo_skip" in tool.conditions
+    assert "FROM drives" in tool.memo.state_sql()
+
+
+@pytest.mark.parametrize(
+    ("sql", "memo_toml", "match"),
+    [
+        (_MEMO_SQL, 'table = "positions"', "is not one of"),
+        (_MEMO_SQL, 'order_by = ["-days"]', "must name a string output column"),
+        (_MEMO_SQL, 'window = ["car_name"]', "window must list declared params"),
+        (_MEMO_SQL, 'inside = "%(car_name)s IS NULL"', "undeclared placeholder"),
+        (_MEMO_SQL.split(" /*[if")[0], 'table = "drives"', "needs a /\\*\\[if memo_skip\\]\\*/"),
+    ],
+)
+def test_bad_memo_table_raises(tmp_path: Path, sql: str, memo_toml: str, match: str) -> None:
+    key = memo_toml.partition(" = ")[0]
+    table = "".join(
+        line + "\n" if not line.startswith(key + " ") else memo_toml + "\n"
+        for line in _MEMO_TABLE.splitlines()
+    )
+    _write_pair(tmp_path, sql, _BASE + _MEMO_PARAMS + table)
+    with pytest.raises(ValueError, match=match):
+        discover_predefined_tools(tmp_path)
+
+
+def test_memo_skip_is_not_declarable_without_memo(tmp_path: Path) -> None:
+    _write_pair(tmp_path, _MEMO_SQL, _BASE + _MEMO_PARAMS)
+    with pytest.raises(ValueError, match="memo_skip"):
+        discover_predefined_tools(tmp_path)
+
+
+_CHUNKED_SQL = (
+    "SELECT name AS car_name, COUNT(*) AS samples /*[if chunk_start]*/, 1 AS extra/*[end]*/"
+    " FROM positions WHERE date >= CURRENT_DATE - %(days)s::int"
+    " /*[if chunk_start]*/AND date >= %(chunk_start)s::timestamp"
+    " AND date < %(chunk_end)s::timestamp/*[end]*/ GROUP BY 1 ORDER BY 1"
+)
+_CHUNKED_PARAMS = """
+[[params]]
+name = "days"
+type = "integer"
+description = "Window."
+default = 30
+
+[[output]]
+name = "car_name"
+type = "string"
+
+[[output]]
+name = "samples"
+type = "integer"
+"""
+
+
+def test_chunks_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(
+        tmp_path,
+        _CHUNKED_SQL,
+        _BASE
+        + _CHUNKED_PARAMS
+        + '[chunks]\nwindow = "days"\nkey = ["car_name"]\norder_by = ["car_name"]\n'
+        + '[chunks.merge]\nsamples = "sum"\nextra = "max"\n',
+    )
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.chunks is not None
+    assert tool.chunks.helpers == frozenset({"extra"})
+    assert "generate_series" in tool.chunks.edges_sql()
+
+
+@pytest.mark.parametrize(
+    ("chunks_toml", "match"),
+    [
+        ('window = "car_name"\norder_by = ["car_name"]', "window must name a declared integer"),
+        ('window = "days"\norder_by = ["car_name"]\nkey = ["car_name"]', "no merge or derive"),
+        ('window = "days"\norder_by = ["car_name"]\nalign = "week"', "align needs the SQL"),
+        ('window = "days"\norder_by = ["car_name"]\nmax_chunks = 1', "max_chunks must be"),
+    ],
+)
+def test_bad_chunks_table_raises(tmp_path: Path, chunks_toml: str, match: str) -> None:
+    _write_pair(tmp_path, _CHUNKED_SQL, _BASE + _CHUNKED_PARAMS + "[chunks]\n" + chunks_toml + "\n")
+    with pytest.raises(ValueError, match=match):
+        discover_predefined_tools(tmp_path)
+
+
+_SAMPLED_SQL = (
+    "SELECT name AS car_name, COUNT(*) AS samples, AVG(battery_level) AS avg_soc"
+    " FROM positions p /*[if sample_percent]*/TABLESAMPLE SYSTEM (%(sample_percent)s::real)"
+    " REPEATABLE (%(sample_seed)s::int)/*[end]*/"
+    " WHERE date >= CURRENT_DATE - %(days)s::int GROUP BY 1 ORDER BY 1"
+)
+_SAMPLED_TABLE = """[sample]
+table = "positions"
+date_column = "date"
+window = "days"
+key = ["car_name"]
+order_by = ["car_name"]
+totals = ["samples"]
+"""
+
+
+def test_sample_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(
+        tmp_path,
+        _SAMPLED_SQL,
+        _BASE
+        + _CHUNKED_PARAMS
+        + '[[output]]\nname = "avg_soc"\ntype = "number"\n'
+        + _SAMPLED_TABLE,
+    )
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.sample is not None
+    assert tool.sample.ratios == frozenset({"avg_soc"})
+    assert "EXPLAIN" in tool.sample.estimate_sql()
+
+
+@pytest.mark.parametrize(
+    ("sql", "extra", "match"),
+    [
+        (_SAMPLED_SQL, 'extremes = { samples = "median" }\n', "extremes must map"),
+        (_SAMPLED_SQL, "replicates = 1\n", "replicates must be"),
+        (_SAMPLED_SQL.replace("car_name, COUNT", "car_name, 'x' AS label, COUNT"), "", "label"),
+        (
+            _SAMPLED_SQL.split(" /*[if")[0] + " WHERE date >= CURRENT_DATE - %(days)s::int",
+            "",
+            "needs a /\\*\\[if sample_percent\\]\\*/",
+        ),
+    ],
+)
+def test_bad_sample_table_raises(tmp_path: Path, sql: str, extra: str, match: str) -> None:
+    output = '[[output]]\nname = "avg_soc"\ntype = "number"\n'
+    if "label" in sql:
+        output += '[[output]]\nname = "label"\ntype = "string"\n'
+    _write_pair(tmp_path, sql, _BASE + _CHUNKED_PARAMS + output + _SAMPLED_TABLE + extra)
+    with pytest.raises(ValueError, match=match):
+        discover_predefined_tools(tmp_path)
+
+
+_SCANNED_SQL = (
+    "SELECT name AS car_name, COUNT(*) AS samples FROM positions p JOIN cars c ON p.car_id = c.id"
+    " WHERE p.date >= CURRENT_DATE - %(days)s::int GROUP BY 1 ORDER BY 1;"
+)
+_SCANNED_TABLE = """[scan]
+table = "positions"
+date_column = "date"
+window = "days"
+columns = ["car_id", "date"]
+"""
+
+
+def test_scan_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(tmp_path, _SCANNED_SQL, _BASE + _CHUNKED_PARAMS + _SCANNED_TABLE)
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.scan is not None
+    assert tool.scan.columns == frozenset({"car_id", "date"})
+
+
+@pytest.mark.parametrize(
+    ("sql", "extra", "match"),
+    [
+        (_SCANNED_SQL.replace("FROM positions", "FROM drives"), "", "is not read by the SQL"),
+        (_SCANNED_SQL, "[execution]\nmax_rows = 10\n", "cannot be combined with execution"),
+    ],
+)
+def test_bad_scan_table_raises(tmp_path: Path, sql: str, extra: str, match: str) -> None:
+    _write_pair(tmp_path, sql, _BASE + _CHUNKED_PARAMS + _SCANNED_TABLE + extra)
+    with pytest.raises(ValueError, match=match):
+        discover_predefined_tools(tmp_path)
+
+
+def test_scan_columns_must_include_the_date_column(tmp_path: Path) -> None:
+    table = _SCANNED_TABLE.replace('["car_id", "date"]', '["car_id"]')
+    _write_pair(tmp_path, _SCANNED_SQL, _BASE + _CHUNKED_PARAMS + table)
+    with pytest.raises(ValueError, match="date_column included"):
+        discover_predefined_tools(tmp_path)
+
+
+_LOCATED_SQL = (
+    "SELECT d.id FROM drives d LEFT JOIN addresses a ON d.start_address_id = a.id WHERE TRUE"
+    " /*[if location]*/AND a.city ILIKE '%%' || %(location)s::text || '%%'/*[end]*/"
+    " /*[if address_ids]*/AND d.start_address_id = ANY(%(address_ids)s::bigint[])/*[end]*/"
+)
+_LOCATED_PARAMS = """
+[[params]]
+name = "location"
+type = "string"
+description = "Place."
+
+[address_index]
+param = "location"
+"""
+
+
+def test_address_index_table_roundtrips(tmp_path: Path) -> None:
+    _write_pair(tmp_path, _LOCATED_SQL, _BASE + _LOCATED_PARAMS)
+    (tool,) = discover_predefined_tools(tmp_path)
+    assert tool.address_index == "location"
+    assert "ANY" in tool.render({"location": None, "address_ids": [1]})
+    assert "ILIKE" not in tool.render({"location": None, "address_ids": [1]})
+
+
+def test_address_index_needs_an_address_ids_block(tmp_path: Path) -> None:
+    _write_pair(tmp_path, _LOCATED_SQL.split(" /*[if address_ids]")[0], _BASE + _LOCATED_PARAMS)
+    with pytest.raises(ValueError, match=r"needs a /\*\[if location\]\*/ block"):
+        discover_predefined_tools(tmp_path)
@@ -0,0 +1,112 @@
+"""Tests for approximate (TABLESAMPLE) answers with confidence intervals."""
+
+from __future__ import annotations
+
+import asyncio
+
+import psycopg
+
+from teslamate_mcp.tools.chunked import run_concurrently
+from teslamate_mcp.tools.sampling import SamplePolicy
+
+# Five years of positions for both cars, one every 15 minutes, with a
+# pseudo-random SoC. ANALYZE gives the planner the row estimate sampling sizes on.
+_HISTORY_SQL = """
+INSERT INTO positions (car_id, date, battery_level, usable_battery_level)
+SELECT car_id, now() - make_interval(mins => 15 * n), (n * 7919 + car_id * 31) % 101,
+    (n * 7919 + car_id * 31) % 101
+FROM generate_series(1, 60000) AS n, (VALUES (1), (2)) AS cars (car_id);
+ANALYZE positions;
+"""
+
+
+def test_replicates_combine_into_estimates_with_intervals() -> None:
+    policy = SamplePolicy(
+        table="positions",
+        date_column="date",
+        window="days",
+        key=("car_name",),
+        order_by=(("car_name", False),),
+        totals=frozenset({"samples"}),
+        extremes=(("max_soc", "max"),),
+        ratios=frozenset({"avg_soc"}),
+        replicates=3,
+    )
+    rows = policy.combine(
+        [
+            [{"car_name": "a", "samples": 10, "avg_soc": 50, "max_soc": 90}],
+            [{"car_name": "a", "samples": 12, "avg_soc": 54, "max_soc": 95}],
+            [],  # this replicate's pages held none of the group's rows
+        ],
+        fraction=0.01,
+    )
+    (row,) = rows
+    assert row["samples"] == 733  # mean of 1000, 1200 and 0
+    assert row["avg_soc"] == 52.0
+    assert row["max_soc"] == 95
+    low, high = row["ci95"]["avg_soc"]
+    assert low < 52 < high
+    assert row["ci95"]["samples"][0] == 0  # clipped: a count cannot be negative
+
+
+async def test_approximate_answers_bracket_the_exact_ones(mcp_session, seeded_database) -> None:
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute(_HISTORY_SQL)
+    args = {"days": 1825}
+    async with mcp_session(approximate_target_rows=5000) as session:
+        exact = await session.call_tool("get_soc_hygiene", args)
+        approximate = await session.call_tool("get_soc_hygiene", args | {"approximate": True})
+    assert not exact.is_error and not approximate.is_error, approximate
+    assert 0 < approximate.meta["approximate"]["sample_fraction"] < 0.2
+    assert "Approximate" in approximate.content[0].text
+
+    by_car = {row["car_name"]: row for row in exact.structured_content["result"]}
+    estimates = approximate.structured_content["result"]
+    assert [row["car_name"] for row in estimates] == sorted(by_car)
+    for row in estimates:
+        truth = by_car[row["car_name"]]
+        for column in ("samples", "avg_soc", "pct_above_80", "pct_below_20"):
+            low, high = row["ci95"][column]
+            assert low <= float(truth[column]) <= high, (column, row, truth)
+        assert truth["min_soc"] <= row["min_soc"] and row["max_soc"] <= truth["max_soc"]
+
+
+async def test_short_windows_of_a_long_table_are_answered_exactly(
+    mcp_session, seeded_database
+) -> None:
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute(_HISTORY_SQL)
+    # ~11500 window rows: a sample holding 5000 of them would read ~40% of the
+    # table's pages, far more than the indexed scan of the window.
+    args = {"days": 60}
+    async with mcp_session(approximate_target_rows=5000) as session:
+        exact = await session.call_tool("get_soc_hygiene", args)
+        approximate = await session.call_tool("get_soc_hygiene", args | {"approximate": True})
+    assert approximate.meta["approximate"]["sample_fraction"] == 1.0
+    assert approximate.structured_content["result"] == exact.structured_content["result"]
+
+
+async def test_replicates_run_no_wider_than_the_limit() -> None:
+    running = peak = 0
+
+    async def replicate(i: int) -> int:
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return i
+
+    assert await run_concurrently((replicate(i) for i in range(5)), limit=2) == [0, 1, 2, 3, 4]
+    assert peak == 2
+
+
+async def test_small_windows_are_answered_exactly(mcp_session) -> None:
+    async with mcp_session() as session:
+        tools = {tool.name: tool for tool in (await session.list_tools()).tools}
+        exact = await session.call_tool("get_soc_hygiene", {"days": 30})
+        approximate = await session.call_tool("get_soc_hygiene", {"days": 30, "approximate": True})
+    assert "approximate" in tools["get_soc_hygiene"].input_schema["properties"]
+    assert "approximate" not in tools["get_drive_summary_per_day"].input_schema["properties"]
+    assert approximate.meta["approximate"]["sample_fraction"] == 1.0
+    assert approximate.structured_content["result"] == exact.structured_content["result"]
@@ -0,0 +1,118 @@
+"""Tests for shared scans of positions across concurrently called tools."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+
+import psycopg
+
+from teslamate_mcp.tools.registry import discover_predefined_tools
+from teslamate_mcp.tools.shared_scan import SharedScans, fused_sql
+
+# Two years of samples for both cars, every 2 days. Pressures and ranges are
+# binary fractions, so float averages do not depend on summation order.
+_HISTORY_SQL = """
+INSERT INTO positions (car_id, date, battery_level, usable_battery_level,
+    rated_battery_range_km, tpms_pressure_fl, tpms_pressure_fr, tpms_pressure_rl,
+    tpms_pressure_rr)
+SELECT car_id, now() - make_interval(days => 2 * n, hours => 5 * car_id),
+    CASE WHEN n % 5 = 0 THEN 100 ELSE (n * 37 + car_id * 11) % 101 END,
+    (n * 37 + car_id * 11) % 101,
+    400 + (n % 8) * 0.25, 2.5 + (n % 4) * 0.25, 2.75, 2.25 + (n % 2) * 0.25, 2.5
+FROM generate_series(1, 365) AS n, (VALUES (1), (2)) AS cars (car_id)
+"""
+
+_CALLS = [
+    ("get_soc_hygiene", {"days": 90}),
+    ("get_daily_battery_usage_patterns", {"days": 60, "car_name": "red"}),
+    ("get_tire_pressure_weekly_trends", {"days": 120}),
+    ("get_battery_degradation_over_time", {"days": 730}),
+]
+
+
+def test_fused_sql_reads_the_widest_window_once() -> None:
+    tools = {t.name: t for t in discover_predefined_tools()}
+    members = []
+    for name, args in _CALLS:
+        tool = tools[name]
+        bound = {p.name: args.get(p.name, p.default) for p in tool.params} | {"tz": "UTC"}
+        members.append((tool, bound))
+    sql, params = fused_sql(members)
+    assert sql.count("FROM positions t") == 1
+    assert params["scan_days"] == 730
+    assert params["m1_car_name"] == "red" and params["m1_days"] == 60
+    assert "%(days)s" not in sql and "%(m3_days)s" in sql
+    assert "t.rated_battery_range_km" in sql and "t.tpms_pressure_rr" in sql
+
+
+async def test_batch_runs_under_all_member_settings() -> None:
+    tools = {t.name: t for t in discover_predefined_tools()}
+    sessions = []
+
+    async def query(sql, params, *, session=None):
+        sessions.append(session)
+        return [{"member": 0, "rows": [{"samples": 1}]}, {"member": 1, "rows": None}]
+
+    scans = SharedScans(window_ms=50)
+    pool = object()
+    bound = {"days": 30, "car_name": None, "min_swing_pct": 5, "tz": "UTC"}
+    soc, usage, conflicting, other_timeout, no_timeout = await asyncio.gather(
+        scans.run(tools["get_soc_hygiene"], bound, pool, {"statement_timeout": "5000"}, query),
+        scans.run(
+            tools["get_daily_battery_usage_patterns"],
+            bound,
+            pool,
+            {"statement_timeout": "5000", "work_mem": "64MB"},
+            query,
+        ),
+        scans.run(
+            tools["get_soc_hygiene"],
+            bound,
+            pool,
+            {"statement_timeout": "5000", "work_mem": "4MB"},
+            query,
+        ),
+        scans.run(tools["get_soc_hygiene"], bound, pool, {"statement_timeout": "20000"}, query),
+        scans.run(tools["get_soc_hygiene"], bound, pool, {}, query),
+    )
+    assert sessions == [{"statement_timeout": "5000", "work_mem": "64MB"}]
+    assert soc == [{"samples": 1}] and usage == []
+    # A conflicting setting, or any other statement timeout (the pool's bound
+    # included), runs on its own under its own policy.
+    assert conflicting is None and other_timeout is None and no_timeout is None
+
+
+async def test_concurrent_calls_share_one_scan(mcp_session, seeded_database, caplog) -> None:
+    async with await psycopg.AsyncConnection.connect(seeded_database, autocommit=True) as conn:
+        await conn.execute(_HISTORY_SQL)
+    alone = {}
+    async with mcp_session(shared_scan_window_ms=0) as session:
+        for name, args in _CALLS:
+            result = await session.call_tool(name, args)
+            assert not result.is_error, result
+            alone[name] = result.structured_content["result"]
+
+    with caplog.at_level(logging.INFO, logger="teslamate_mcp.tools.shared_scan"):
+        async with mcp_session(shared_scan_window_ms=200) as session:
+            results = await asyncio.gather(
+                *(session.call_tool(name, args) for name, args in _CALLS)
+            )
+    shared = [r.getMessage() for r in caplog.records if "Shared scan" in r.getMessage()]
+    assert len(shared) == 1 and "failed" not in shared[0]
+    # The tire trend's 20 s [execution] timeout keeps it out of the batch.
+    assert [name for name, _ in _CALLS if name in shared[0]] == [
+        name for name, _ in _CALLS if name != "get_tire_pressure_weekly_trends"
+    ]
+    for (name, _), result in zip(_CALLS, results, strict=True):
+        assert not result.is_error, result
+        assert alone[name] and result.structured_content["result"] == alone[name]
+
+
+async def test_calls_one_at_a_time_run_alone(mcp_session, caplog) -> None:
+    with caplog.at_level(logging.INFO, logger="teslamate_mcp.tools.shared_scan"):
+        async with mcp_session() as session:
+            for name, args in _CALLS[:2]:
+                result = await session.call_tool(name, args)
+                assert not result.is_error
+    assert not [r for r in caplog.records if "Shared scan" in r.getMessage()]
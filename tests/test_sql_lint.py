@@ -0,0 +1,103 @@
+"""Unit tests for the static SQL performance lint."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from teslamate_mcp import cli
+from teslamate_mcp.tools.registry import discover_predefined_tools
+from teslamate_mcp.tools.sql_lint import lint_sql
+
+
+def _rules(sql: str, allow: frozenset[str] = frozenset()) -> list[tuple[str, int]]:
+    return [(f.rule, f.line) for f in lint_sql(sql, "q.sql", allow)]
+
+
+def test_or_in_a_join_condition_is_flagged():
+    sql = """SELECT a.id
+FROM drives d
+    JOIN addresses a ON (
+        d.start_address_id = a.id
+        OR d.end_address_id = a.id
+    )
+WHERE d.distance > 1 OR d.duration_min > 1"""
+    assert _rules(sql) == [("or-join", 3)]
+
+
+def test_wrapped_columns_are_flagged_only_when_compared():
+    sql = """SELECT DATE(p.date) AS day
+FROM positions p
+WHERE DATE(p.date) >= %(start)s::date
+    AND (%(end)s::date IS NULL OR ((p.date AT TIME ZONE 'UTC') AT TIME ZONE %(tz)s)::date <= %(end)s::date)
+    AND p.date >= CURRENT_DATE - make_interval(days => %(days)s::int)
+GROUP BY DATE(p.date)"""
+    assert _rules(sql) == [("wrapped-column-filter", 3), ("wrapped-column-filter", 4)]
+
+
+def test_positions_joined_by_date_range_is_flagged_unless_by_drive_id():
+    ranged = """SELECT p.speed FROM drives d
+    JOIN positions p ON p.car_id = d.car_id
+        AND p.date BETWEEN d.start_date AND d.end_date"""
+    by_drive = "SELECT p.speed FROM drives d JOIN positions p ON p.drive_id = d.id"
+    assert _rules(ranged) == [("positions-range-join", 2)]
+    assert _rules(by_drive) == []
+
+
+def test_comments_literals_and_distinct_on_do_not_trigger_rules():
+    sql = """-- JOIN x ON a OR b
+SELECT DISTINCT ON (c.id) c.name, 'JOIN y ON p OR q' AS note
+FROM cars c
+    JOIN car_settings s ON s.id = c.settings_id /* OR later */
+WHERE c.name ILIKE '%%' || %(car_name)s || '%%'"""
+    assert _rules(sql) == []
+
+
+def test_allowed_rules_are_suppressed():
+    sql = "SELECT 1 FROM drives d JOIN addresses a ON a.id = d.start_address_id OR a.id = 0"
+    assert _rules(sql, frozenset({"or-join"})) == []
+
+
+def _write_query(directory: Path, sql: str, lint: str = "") -> None:
+    (directory / "q.sql").write_text(sql, encoding="utf-8")
+    (directory / "q.toml").write_text(
+        f'name = "q"\ndescription = "A query."\n{lint}', encoding="utf-8"
+    )
+
+
+def test_strict_discovery_raises_on_findings_not_allowed_by_the_sidecar(tmp_path: Path):
+    _write_query(tmp_path, "SELECT 1 FROM drives d WHERE DATE(d.start_date) = CURRENT_DATE")
+    assert discover_predefined_tools(tmp_path)  # lint only runs in strict mode
+    with pytest.raises(ValueError, match=r"q\.sql:1: wrapped-column-filter"):
+        discover_predefined_tools(tmp_path, strict=True)
+
+    _write_query(
+        tmp_path,
+        "SELECT 1 FROM drives d WHERE DATE(d.start_date) = CURRENT_DATE",
+        '[lint]\nallow = ["wrapped-column-filter"]\n',
+    )
+    (tool,) = discover_predefined_tools(tmp_path, strict=True)
+    assert tool.lint_allow == {"wrapped-column-filter"}
+
+
+def test_unknown_lint_rule_in_sidecar_raises(tmp_path: Path):
+    _write_query(tmp_path, "SELECT 1", '[lint]\nallow = ["no-such-rule"]\n')
+    with pytest.raises(ValueError, match="unknown lint rule"):
+        discover_predefined_tools(tmp_path)
+
+
+def test_bundled_catalog_passes_strict_lint():
+    assert len(discover_predefined_tools(strict=True)) == 30
+
+
+def test_lint_sql_command_reports_findings_and_exits_non_zero(tmp_path: Path):
+    _write_query(tmp_path, "SELECT 1 FROM drives d JOIN addresses a ON a.id = 1 OR a.id = 2")
+
+    result = CliRunner().invoke(cli.main, ["lint-sql", str(tmp_path)])
+    bundled = CliRunner().invoke(cli.main, ["lint-sql"])
+
+    assert result.exit_code == 1
+    assert "q.sql:1: or-join" in result.output
+    assert bundled.exit_code == 0, bundled.output
@@ -10,6 +10,7 @@ from __future__ import annotations
 import json
 from typing import Any
 
+import anyio
 import psycopg
 from mcp import Client
 
@@ -33,7 +34,11 @@ def rows_from(result) -> list[dict[str, Any]]:
 async def test_every_predefined_tool_runs_with_defaults(mcp_session) -> None:
     async with mcp_session() as session:
         for tool in discover_predefined_tools():
-            args = {p.name: _REQUIRED_ARG_SEEDS[p.name] for p in tool.params if p.required}
+            args = {
+                p.name: _REQUIRED_ARG_SEEDS[p.name]
+                for p in tool.params
+                if p.required or p.name in tool.one_of[:1]
+            }
             result = await session.call_tool(tool.name, args)
             assert not result.is_error, (
                 tool.name,
@@ -96,6 +101,45 @@ async def test_limit_param(mcp_session) -> None:
         assert rows[0]["distance_km"] == 120.0
 
 
+async def test_search_drives_keyset_pages_match_one_big_page(mcp_session) -> None:
+    async with mcp_session() as session:
+        for order_by in ("start_date", "distance", "duration"):
+            whole = rows_from(
+                await session.call_tool("search_drives", {"order_by": order_by, "limit": 500})
+            )
+            paged, cursor = [], None
+            while True:
+                args = {"order_by": order_by, "limit": 2}
+                result = await session.call_tool(
+                    "search_drives", args | ({"cursor": cursor} if cursor else {})
+                )
+                paged += rows_from(result)
+                cursor = (result.meta or {}).get("next_cursor")
+                if cursor is None:
+                    break
+            assert [r["drive_id"] for r in paged] == [r["drive_id"] for r in whole], order_by
+
+
+async def test_search_cursor_is_rejected_for_other_filters(mcp_session) -> None:
+    async with mcp_session() as session:
+        first = await session.call_tool("search_charging_sessions", {"limit": 1})
+        cursor = first.meta["next_cursor"]
+        assert "cursor=" in first.content[-1].text
+
+        resumed = await session.call_tool(
+            "search_charging_sessions", {"limit": 1, "cursor": cursor}
+        )
+        other = await session.call_tool(
+            "search_charging_sessions", {"limit": 1, "car_name": "blue", "cursor": cursor}
+        )
+
+    assert (
+        rows_from(resumed)[0]["charging_process_id"] != rows_from(first)[0]["charging_process_id"]
+    )
+    assert other.is_error
+    assert "other filters" in other.content[0].text
+
+
 async def test_get_drive_details(mcp_session) -> None:
     async with mcp_session() as session:
         rows = rows_from(
@@ -110,6 +154,25 @@ async def test_missing_required_arg_errors(mcp_session) -> None:
     async with mcp_session() as session:
         result = await session.call_tool("get_drive_details", {})
         assert result.is_error
+        assert "drive_id, drive_ids" in result.content[0].text
+
+
+async def test_batched_lookups_by_id_array(mcp_session) -> None:
+    async with mcp_session() as session:
+        details = rows_from(
+            await session.call_tool("get_drive_details", {"drive_ids": [4, 1, 999]})
+        )
+        curves = rows_from(
+            await session.call_tool(
+                "get_charging_curve", {"charging_process_ids": [1, 2], "max_points": 10}
+            )
+        )
+        too_many = await session.call_tool("get_drive_route", {"drive_ids": list(range(21))})
+
+    assert sorted(r["drive_id"] for r in details) == [1, 4]
+    assert {r["charging_process_id"] for r in curves} == {1, 2}
+    assert sum(r["charging_process_id"] == 1 for r in curves) == 10  # max_points per session
+    assert too_many.is_error  # max_items = 20
 
 
 async def test_charging_curve_downsamples(mcp_session) -> None:
@@ -323,3 +386,73 @@ async def test_schema_refresh_picks_up_live_ddl(mcp_session, seeded_database) ->
         finally:
             await conn.execute("DROP TABLE IF EXISTS post_boot_table")
             await conn.close()
+
+
+async def test_run_sql_pages_with_a_continuation_cursor(mcp_session) -> None:
+    query = "SELECT n FROM generate_series(1, 5) AS n ORDER BY n"
+    async with mcp_session(custom_sql_row_limit=2) as session:
+        result = await session.call_tool("run_sql", {"query": query})
+        seen = [r["n"] for r in rows_from(result)]
+        while result.meta and result.meta.get("next_cursor"):
+            cursor = result.meta["next_cursor"]
+            assert cursor in result.content[-1].text  # the model sees the token too
+            result = await session.call_tool("run_sql", {"query": query, "cursor": cursor})
+            seen += [r["n"] for r in rows_from(result)]
+        assert seen == [1, 2, 3, 4, 5]
+
+        stale = await session.call_tool("run_sql", {"query": query, "cursor": "not-a-cursor"})
+        assert stale.is_error
+
+
+async def test_run_sql_falls_back_to_the_row_cap_without_cursor_slots(mcp_session) -> None:
+    query = "SELECT n FROM generate_series(1, 5) AS n"
+    async with mcp_session(custom_sql_row_limit=2, custom_sql_max_cursors=0) as session:
+        result = await session.call_tool("run_sql", {"query": query})
+        assert len(rows_from(result)) == 2
+        assert not (result.meta or {}).get("next_cursor")
+
+
+async def test_cancelled_tool_call_stops_its_backend_query(mcp_session, seeded_database) -> None:
+    query = "SELECT pg_sleep(30) AS slow /* e2e-cancel-probe */"
+    async with mcp_session() as session:
+        with anyio.move_on_after(1):
+            await session.call_tool("run_sql", {"query": query})
+
+        async with await psycopg.AsyncConnection.connect(seeded_database) as conn:
+            for _ in range(30):
+                cur = await conn.execute(
+                    "SELECT count(*) FROM pg_stat_activity "
+                    "WHERE query LIKE '%e2e-cancel-probe%' AND state = 'active' "
+                    "AND pid <> pg_backend_pid()"
+                )
+                if (await cur.fetchone())[0] == 0:
+                    break
+                await anyio.sleep(0.1)
+            else:
+                raise AssertionError("the cancelled query is still running")
+
+        # The pool is intact: the next call runs normally.
+        assert rows_from(await session.call_tool("run_sql", {"query": "SELECT 1 AS one"})) == [
+            {"one": 1}
+        ]
+
+
+async def test_client_timeout_meta_tightens_the_statement_timeout(mcp_session) -> None:
+    async with mcp_session() as session:
+        result = await session.call_tool(
+            "run_sql", {"query": "SELECT pg_sleep(5)"}, meta={"teslamate/timeout_ms": 200}
+        )
+        assert result.is_error
+        assert "within the requested 200 ms" in result.content[0].text
+
+        # Looser than the server's own bound: it cannot extend it, and is ignored.
+        loose = await session.call_tool(
+            "get_basic_car_information", {}, meta={"teslamate/timeout_ms": 10_000_000}
+        )
+        assert rows_from(loose)
+
+        bad = await session.call_tool(
+            "get_basic_car_information", {}, meta={"teslamate/timeout_ms": "soon"}
+        )
+        assert bad.is_error
+        assert "teslamate/timeout_ms" in bad.content[0].text